@@ -0,0 +1,77 @@
+"""Guard the API's cold-start import cost.
+
+    cd Backend && python -m benchmarks.import_time_benchmark [--budget-ms 1000] [--runs 5] [--top 15]
+
+Imports ``src.main`` in fresh interpreters under ``python -X importtime``
+and fails (exit code 1) when the fastest run exceeds the budget or when a
+module that should load lazily was imported. Chat, storage and their
+dependencies belong in first use or the app lifespan, not at import.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+TARGET = "src.main"
+# Loaded on first use or in the lifespan; importing any of these from src.main is a regression
+LAZY_MODULES = (
+    "src.bot",
+    "langchain_core",
+    "langchain_google_genai",
+    "azure.storage.blob",
+    "numpy"
+)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """Map each imported module to its (self, cumulative) import time in microseconds."""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def measure_once() -> Dict[str, Tuple[int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {TARGET} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the import time of the API against a budget")
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    fastest = min(runs, key=lambda modules: modules[TARGET][1])
+    total_ms = fastest[TARGET][1] / 1000
+
+    print(f"{TARGET}: {total_ms:.0f}ms (fastest of {args.runs}, budget {args.budget_ms:.0f}ms)")
+    print(f"{'self ms':>9}{'cumulative ms':>15}  module")
+    slowest: List[Tuple[str, Tuple[int, int]]] = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:args.top]:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>15.1f}  {name}")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in fastest]
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
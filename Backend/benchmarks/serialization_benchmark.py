@@ -0,0 +1,137 @@
+"""Compare response serialization paths on 10k-document payloads.
+
+    cd Backend && python -m benchmarks.serialization_benchmark [--documents 10000] [--rounds 5]
+
+For each payload shape this times the path endpoints used to take
+(``jsonable_encoder`` followed by ``json.dumps``, plus ``DatasetSchema``
+validation for /dataset-click), a pydantic TypeAdapter over the output
+model, and the orjson encoder behind ``FastJSONResponse``.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from src.models.dataset_models import DatasetSchema
+from src.models.response_models import (
+    CommunityMessage,
+    DatasetPayload,
+    DatasetSummary,
+    PromptSummary,
+    dataset_payload,
+    dataset_summary,
+    prompt_summary
+)
+from src.utils.serialization import dumps
+
+def _timestamps(count: int) -> List[datetime]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [start + timedelta(minutes=i) for i in range(count)]
+
+def make_datasets(count: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "dataset_id": f"dataset-{i}",
+            "dataset_info": {
+                "name": f"dataset_{i}",
+                "description": "Sentence embeddings for product reviews " * 4,
+                "datasetId": f"dataset-{i}",
+                "domain": "Retail",
+                "license": "MIT",
+                "file_type": "csv",
+                "dimensions": 768,
+                "vector_database": "pinecone",
+                "model_name": "all-mpnet-base-v2",
+                "username": "benchmarkuser"
+            },
+            "upload_type": "both",
+            "timestamp": created_at,
+            "files": {
+                "raw": [f"https://vecem.blob.core.windows.net/datasets/cas/{i:064x}"],
+                "vectorized": [f"https://vecem.blob.core.windows.net/datasets/cas/{i + count:064x}"]
+            },
+            "uid": "u" * 28
+        }
+        for i, created_at in enumerate(_timestamps(count))
+    ]
+
+def make_prompts(count: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "prompt_name": f"prompt_{i}",
+            "description": "Summarise a support ticket",
+            "domain": "Support",
+            "prompt": "You are a helpful assistant. " * 20,
+            "username": "benchmarkuser",
+            "createdAt": created_at
+        }
+        for i, created_at in enumerate(_timestamps(count))
+    ]
+
+def make_messages(count: int) -> List[dict]:
+    return [
+        {
+            "id": str(ObjectId()),
+            "content": "Uploads over 1GB stall at 99% for me, anyone else? " * 3,
+            "userId": "u" * 28,
+            "userName": "Benchmark User",
+            "userAvatar": "/avatars/default.png",
+            "timestamp": created_at,
+            "tag": "issue",
+            "replies": []
+        }
+        for created_at in _timestamps(count)
+    ]
+
+def legacy(payload, **encoder_options) -> bytes:
+    # Endpoints called jsonable_encoder, then FastAPI encoded the result again before json.dumps
+    return json.dumps(jsonable_encoder(jsonable_encoder(payload, **encoder_options))).encode("utf-8")
+
+def legacy_dataset_click(datasets: List[dict]) -> bytes:
+    # What /dataset-click did per document: validate into DatasetSchema, then encode
+    return legacy([DatasetSchema(**{**dataset, "_id": str(dataset["_id"])}) for dataset in datasets])
+
+def measure(fn: Callable[[], bytes], rounds: int) -> float:
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark response serialization")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    datasets = make_datasets(args.documents)
+    summaries = [dataset_summary(dataset) for dataset in datasets]
+    payloads = [dataset_payload(dataset, "benchmarkuser") for dataset in datasets]
+    prompts = [prompt_summary(prompt) for prompt in make_prompts(args.documents)]
+    messages = make_messages(args.documents)
+
+    cases = [
+        ("profile datasets", summaries, TypeAdapter(List[DatasetSummary]), lambda: legacy(summaries)),
+        ("profile prompts", prompts, TypeAdapter(List[PromptSummary]), lambda: legacy(prompts)),
+        ("community messages", messages, TypeAdapter(List[CommunityMessage]), lambda: legacy(messages)),
+        ("dataset payloads", payloads, TypeAdapter(List[DatasetPayload]), lambda: legacy_dataset_click(datasets)),
+        ("raw dataset documents", datasets, None, lambda: legacy(datasets, custom_encoder={ObjectId: str}))
+    ]
+
+    print(f"{args.documents} documents, best of {args.rounds} rounds (ms)")
+    print(f"{'payload':<24}{'legacy':>10}{'adapter':>10}{'orjson':>10}{'speedup':>10}")
+    for name, payload, adapter, legacy_fn in cases:
+        legacy_ms = measure(legacy_fn, args.rounds)
+        adapter_ms = measure(lambda: adapter.dump_json(payload), args.rounds) if adapter else float("nan")
+        orjson_ms = measure(lambda: dumps(payload), args.rounds)
+        print(f"{name:<24}{legacy_ms:>10.1f}{adapter_ms:>10.1f}{orjson_ms:>10.1f}{legacy_ms / orjson_ms:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
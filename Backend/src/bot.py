@@ -1,21 +1,52 @@
 import os
+import time
+import asyncio
+import hashlib
 import uuid
 from src.utils.logger import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict
+from cachetools import LRUCache
 from dotenv import load_dotenv
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from src.config import settings
 from src.database.mongodb import user_profile_collection
+from src.utils.chat_history import MongoChatMessageHistory
+from src.utils.llm_limiter import LLMOverloadedError, llm_limiter
+from src.utils.response_cache import ResponseCache, normalize_message, response_cache
 
 # Load environment variables
 load_dotenv()
 
+MODEL_NAME = "gemini-1.5-pro"
+EMBEDDING_MODEL_NAME = "models/text-embedding-004"
+SYSTEM_PROMPT = """Vecora is an expert prompt engineer specializing in generating tailored system messages for AI agents.
+
+When greeted or asked a general question, Vecora responds in a friendly, helpful, and informative tone.
+
+When given a specific agent type or context, Vecora crafts a precise, context-driven system message suited to the user's needs.
+
+Unless the user specifies otherwise, Vecora provides concise prompts instead of lengthy ones.
+                """
+CACHE_SCOPE = ResponseCache.scope(MODEL_NAME, SYSTEM_PROMPT)
+
+def coalescing_key(history: List[BaseMessage], message: str) -> str:
+    """Identify a generation by everything that goes into the prompt."""
+    digest = hashlib.sha256(CACHE_SCOPE.encode("utf-8"))
+    for earlier in history:
+        digest.update(f"\x00{earlier.type}\x00{earlier.content}".encode("utf-8"))
+    digest.update(f"\x01{normalize_message(message)}".encode("utf-8"))
+    return digest.hexdigest()
+
+def clean_reply(text: str) -> str:
+    """Strip markdown emphasis and collapse whitespace in a complete reply."""
+    return " ".join(text.replace("*", "").split())
+
 class FRIDAY:
     def __init__(self, uid: str = None):
         if not uid:
@@ -24,69 +55,161 @@ class FRIDAY:
         self.uid = uid
         self.api_key = None
         self.model = None
-        self.chat_history = ChatMessageHistory()
+        self.embeddings = None
+        self.chain = None
+        self.histories = LRUCache(maxsize=settings.CHAT_HISTORY_SESSIONS_PER_USER)
         self.output_parser = StrOutputParser()
     
-    async def initialize(self):
-        # Fetch API key from user profile every time
-        user = await user_profile_collection.find_one({"uid": self.uid})
-        if not user or not user.get("api_key"):
-            raise ValueError("API key not found for user")
+    async def initialize(self, api_key: Optional[str] = None):
+        """Build the model client and chain once; history survives re-initialization."""
+        if api_key is None:
+            user = await user_profile_collection.find_one({"uid": self.uid}, {"api_key": 1})
+            if not user or not user.get("api_key"):
+                raise ValueError("API key not found for user")
+            api_key = user["api_key"]
         
-        self.api_key = user["api_key"]
+        self.api_key = api_key
         self.model = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
+            model=MODEL_NAME,
             api_key=self.api_key,
             temperature=0.7
         )
+        if settings.CHAT_CACHE_SEMANTIC_ENABLED:
+            self.embeddings = GoogleGenerativeAIEmbeddings(
+                model=EMBEDDING_MODEL_NAME,
+                google_api_key=self.api_key
+            )
+        self.chain = RunnableWithMessageHistory(
+            self.setup_chain(),
+            self.get_session_history,
+            input_messages_key="input",
+            history_messages_key="history"
+        )
+
+    def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
+        """Return the cached history for a session, creating it on first use."""
+        history = self.histories.get(session_id)
+        if history is None:
+            history = MongoChatMessageHistory(
+                self.uid,
+                session_id,
+                max_turns=settings.CHAT_HISTORY_MAX_TURNS,
+                token_budget=settings.CHAT_HISTORY_TOKEN_BUDGET,
+                max_stored_messages=settings.CHAT_HISTORY_MAX_STORED_MESSAGES,
+                summarizer=self.summarize_history if settings.CHAT_HISTORY_SUMMARIZE else None
+            )
+            self.histories[session_id] = history
+        return history
+
+    async def summarize_history(self, summary: str, messages: List[BaseMessage]) -> str:
+        """Fold turns that left the history window into the running summary."""
+        transcript = "\n".join(f"{m.type}: {m.content}" for m in messages)
+        async with llm_limiter.slot(self.uid):
+            result = await self.model.ainvoke(
+                "Update the summary of this conversation between a user and Vecora, "
+                "keeping facts and requirements the user stated. Reply with the summary only.\n\n"
+                f"Current summary: {summary or 'None'}\n\nNew turns:\n{transcript}"
+            )
+        return self.output_parser.parse(result.content).strip()
 
     def setup_chain(self) -> RunnableWithMessageHistory:
         """Set up the prompt and chain with the model."""
         try:
             prompt = ChatPromptTemplate.from_messages([
-                ("system", """Vecora is an expert prompt engineer specializing in generating tailored system messages for AI agents.
-
-When greeted or asked a general question, Vecora responds in a friendly, helpful, and informative tone.
-
-When given a specific agent type or context, Vecora crafts a precise, context-driven system message suited to the user's needs.
-
-Unless the user specifies otherwise, Vecora provides concise prompts instead of lengthy ones.
-                """),
-                MessagesPlaceholder(variable_name="thinking")
+                ("system", SYSTEM_PROMPT),
+                MessagesPlaceholder(variable_name="history"),
+                ("human", "{input}")
             ])
             return prompt | self.model
         except Exception as e:
             logging.error(f"Error setting up chain: {str(e)}")
             raise
 
-    async def get_response(self, message: str) -> str:
-        """Handle a single message and return the response."""
-        try:
-            # Re-initialize to get fresh API key for each request
+    async def lookup_cached_reply(self, message: str):
+        """Return (cache key, cached reply or None, query embedding or None)."""
+        key = response_cache.make_key(CACHE_SCOPE, message)
+        cached = response_cache.get(key)
+        embedding = None
+
+        if cached is None and self.embeddings is not None:
+            try:
+                embedding = await self.embeddings.aembed_query(normalize_message(message))
+                cached = response_cache.get_similar(CACHE_SCOPE, embedding)
+            except Exception as e:
+                logging.warning(f"Semantic cache lookup failed: {str(e)}")
+
+        if cached is None:
+            response_cache.record_miss()
+        return key, cached, embedding
+
+    async def stream_response(self, message: str, session_id: str = "default") -> AsyncIterator[str]:
+        """Yield response deltas as the model produces them.
+
+        Deltas are passed through untouched, since tokens carry their own
+        spacing; only the joined reply is cleaned before it is cached.
+        """
+        # Sessions are normally initialized by the session manager
+        if self.chain is None:
             await self.initialize()
 
-            if not self.api_key:
-                raise ValueError("API key not initialized. Please ensure you have set up your API key.")
+        if not self.api_key:
+            raise ValueError("API key not initialized. Please ensure you have set up your API key.")
 
-            chain = self.setup_chain()
-            with_message_history = RunnableWithMessageHistory(
-                chain,
-                lambda _: self.chat_history
-            )
+        # A cached reply is only valid when there are no earlier turns it should depend on
+        history = self.get_session_history(session_id)
+        earlier = await history.aget_messages()
+        use_cache = settings.CHAT_CACHE_ENABLED and not earlier
+        cached = None
+        if use_cache:
+            cache_key, cached, embedding = await self.lookup_cached_reply(message)
+
+        # Piggyback on an identical request (same history and message) that is already generating
+        shared_key = coalescing_key(earlier, message)
+        shared_reply = llm_limiter.join(shared_key) if cached is None else None
+        if shared_reply is not None:
+            cached = await asyncio.shield(shared_reply)
+            if cached is None:
+                # The leader failed, most likely shed or timed out; let the client retry
+                raise LLMOverloadedError(llm_limiter.retry_after)
 
-            config = {"configurable": {"session_id": "temp"}}
-            response_text = ""
+        if cached is not None:
+            await history.aadd_messages([HumanMessage(content=message), AIMessage(content=cached)])
+            yield cached
+            return
 
-            async for chunk in with_message_history.astream(
-                [HumanMessage(content=message)],
-                config=config
-            ):
-                parsed_output = self.output_parser.parse(chunk.content)
-                cleaned_output = parsed_output.replace("*", "").replace("\n", " ").strip()
-                response_text += cleaned_output + " "
+        shared_reply = llm_limiter.lead(shared_key)
 
-            return response_text.strip()
+        config = {"configurable": {"session_id": session_id}}
+        chunks = []
+        reply = None
 
+        try:
+            async with llm_limiter.slot(self.uid):
+                started = time.perf_counter()
+                async for chunk in self.chain.astream(
+                    {"input": message},
+                    config=config
+                ):
+                    delta = self.output_parser.parse(chunk.content)
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+                latency = time.perf_counter() - started
+
+            reply = clean_reply("".join(chunks))
+            if use_cache and reply:
+                response_cache.put(cache_key, CACHE_SCOPE, reply, latency, embedding)
+        finally:
+            llm_limiter.finish(shared_key, shared_reply, reply)
+
+    async def get_response(self, message: str, session_id: str = "default") -> str:
+        """Handle a single message and return the response."""
+        try:
+            chunks = [chunk async for chunk in self.stream_response(message, session_id)]
+            return clean_reply("".join(chunks))
+
+        except LLMOverloadedError:
+            raise
         except ValueError as ve:
             logging.error(f"API key error: {str(ve)}")
             return "I apologize, but there seems to be an issue with your API key. Please check your API key settings."
@@ -98,12 +221,8 @@ Unless the user specifies otherwise, Vecora provides concise prompts instead of
         """Main chat loop with error handling."""
         bot_name = "FRIDAY"
         try:
-            chain = self.setup_chain()
+            await self.initialize()
             session_id = str(uuid.uuid4())
-            with_message_history = RunnableWithMessageHistory(
-                chain,
-                lambda _: self.chat_history
-            )
             logging.info("Chat session started")
             print(f"{bot_name}: Hey, how can I help you today?\n")
 
@@ -120,14 +239,11 @@ Unless the user specifies otherwise, Vecora provides concise prompts instead of
                     config = {"configurable": {"session_id": session_id}}
                     print(f"{bot_name}: ", end="", flush=True)
 
-                    async for chunk in with_message_history.astream(
-                        [HumanMessage(content=user_input)],
+                    async for chunk in self.chain.astream(
+                        {"input": user_input},
                         config=config
                     ):
-                        parsed_output = self.output_parser.parse(chunk.content)
-                        cleaned_output = parsed_output.replace("*", "").replace("\n", " ").strip()
-                        structured_output = " ".join(cleaned_output.split())
-                        print(structured_output, end=" ", flush=True)
+                        print(self.output_parser.parse(chunk.content).replace("*", ""), end="", flush=True)
                     print()
 
                 except Exception as e:
@@ -139,7 +255,6 @@ Unless the user specifies otherwise, Vecora provides concise prompts instead of
             print(f"{bot_name}: I'm sorry, but I'm experiencing technical difficulties.")
 
 if __name__ == "__main__":
-    import asyncio
     try:
         bot = FRIDAY()
         asyncio.run(bot.chat())
@@ -6,6 +6,20 @@ class Settings(BaseSettings):
     # MongoDB Configuration
     MONGODB_URL: Optional[str] = None
     DATABASE_NAME: str = "vecem"
+    MONGODB_MAX_POOL_SIZE: int = 100  # connections per worker, per client
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 10000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 10000
+    MONGODB_SOCKET_TIMEOUT_MS: Optional[int] = None  # unset waits as long as an operation runs
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # unset waits for a free pooled connection
+    MONGODB_COMPRESSORS: str = "zstd,zlib"  # negotiated in order; snappy needs python-snappy
+    
+    # MongoDB Read Configuration
+    MONGODB_READ_URL: Optional[str] = None  # defaults to MONGODB_URL
+    MONGODB_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_READ_MAX_STALENESS_SECONDS: Optional[int] = None  # at least 90 when set
+    MONGODB_READ_MAX_POOL_SIZE: int = 100
     
     # Azure Storage Configuration
     AZURE_STORAGE_CONNECTION_STRING: Optional[str] = None
@@ -15,6 +29,83 @@ class Settings(BaseSettings):
     PORT: int = 5000
     ENV: str = "development"
     
+    # Chat Session Configuration
+    CHAT_SESSION_MAX_SIZE: int = 1000
+    CHAT_SESSION_TTL: int = 1800  # seconds an idle session stays pooled
+    CHAT_API_KEY_TTL: int = 300  # seconds before a cached API key is re-read
+    
+    # Chat History Configuration
+    CHAT_HISTORY_MAX_TURNS: int = 10  # recent turns kept verbatim and cached in memory
+    CHAT_HISTORY_TOKEN_BUDGET: int = 4000  # approximate prompt tokens reserved for history
+    CHAT_HISTORY_MAX_STORED_MESSAGES: int = 200
+    CHAT_HISTORY_SESSIONS_PER_USER: int = 8
+    CHAT_HISTORY_SUMMARIZE: bool = True
+    
+    # Chat Response Cache Configuration
+    CHAT_CACHE_ENABLED: bool = True
+    CHAT_CACHE_MAX_SIZE: int = 1000
+    CHAT_CACHE_TTL: int = 3600
+    CHAT_CACHE_SEMANTIC_ENABLED: bool = False  # embeds each first-turn message to match near-duplicates
+    CHAT_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    
+    # Community Stream Configuration
+    COMMUNITY_REDIS_URL: Optional[str] = None  # set to fan out across workers through Redis pub/sub
+    COMMUNITY_STREAM_QUEUE_SIZE: int = 100  # events buffered per client before it is dropped
+    COMMUNITY_STREAM_KEEPALIVE: float = 15
+    
+    # LLM Concurrency Configuration
+    LLM_MAX_IN_FLIGHT: int = 16  # concurrent model calls per worker process
+    LLM_MAX_QUEUE: int = 64  # waiting calls before requests are shed with 429
+    LLM_MAX_IN_FLIGHT_PER_USER: int = 2
+    LLM_QUEUE_TIMEOUT: float = 30
+    
+    # Catalog Search Configuration
+    SEARCH_FACET_CACHE_TTL: float = 60  # seconds totals and facet counts are reused per query
+    SEARCH_FACET_CACHE_SIZE: int = 1024
+    
+    # Dataset Feed Configuration
+    DATASET_FEED_TTL: float = 5  # seconds a worker serves its in-memory feed snapshot
+    
+    # Popularity Configuration
+    POPULARITY_FLUSH_INTERVAL: float = 5  # seconds between bulk counter flushes
+    TRENDING_RECOMPUTE_INTERVAL: float = 300
+    TRENDING_HALF_LIFE_HOURS: float = 24
+    TRENDING_WINDOW_DAYS: int = 7
+    
+    # Job Queue Configuration
+    JOB_WORKERS: int = 2  # worker tasks per API process
+    JOB_POLL_INTERVAL: float = 2
+    JOB_LEASE_SECONDS: int = 300  # a job whose worker stops renewing this is picked up again
+    JOB_MAX_ATTEMPTS: int = 3
+    UPLOAD_SPOOL_DIR: Optional[str] = None  # defaults to uploads/spool in the project root
+    
+    # Upload Admission Configuration
+    UPLOAD_BYTE_BUDGET: int = 4 * 1024 ** 3  # bytes of uploads being received or waiting in the spool
+    UPLOAD_MAX_REQUEST_BYTES: int = 2 * 1024 ** 3
+    UPLOAD_MAX_CONCURRENT_PER_USER: int = 2
+    UPLOAD_QUEUE_TIMEOUT: float = 30  # seconds an upload waits for budget before a 503
+    UPLOAD_MIN_FREE_BYTES: int = 1024 ** 3  # free space kept on the spool disk
+    UPLOAD_SPOOL_ORPHAN_AGE: int = 21600  # seconds before another host's leftover spool is swept
+    
+    # Dataset Deletion Configuration
+    DELETED_DATASET_RETENTION: int = 30 * 24 * 3600  # seconds a purged tombstone is kept before the TTL drops it
+
+    # Archive Configuration
+    ARCHIVE_WORKERS: int = 2  # processes compressing dataset archives
+    ARCHIVE_CODEC: str = "deflate"  # store, deflate, bzip2 or lzma
+    ARCHIVE_COMPRESSION_LEVEL: int = 6
+
+    # Shard Layout Configuration
+    SHARD_SIZE: int = 256 * 1024 ** 2  # target bytes per shard
+    SHARD_MIN_DATASET_SIZE: int = 256 * 1024 ** 2  # smaller file sets are only served as one archive
+    
+    # Download Configuration
+    DOWNLOAD_URL_TTL: int = 900  # seconds a download SAS URL stays valid
+    
+    # Response Compression Configuration
+    GZIP_MINIMUM_SIZE: int = 1024  # bytes; smaller bodies are sent as-is
+    GZIP_COMPRESS_LEVEL: int = 5
+    
     # Logging Configuration
     LOG_LEVEL: str = "INFO"
     
@@ -51,9 +142,16 @@ class Settings(BaseSettings):
             raise ValueError(error_message)
 
 settings = Settings()
-try:
-    settings.validate_settings()
-except ValueError as e:
-    print("\033[91mConfiguration Error:\033[0m")  # Red color for error
-    print(str(e))
-    raise SystemExit(1)
\ No newline at end of file
+
+def check_settings() -> None:
+    """Exit with a readable error when required settings are missing.
+
+    Called when the app or a CLI starts rather than on import, so tooling
+    can import the app without production credentials.
+    """
+    try:
+        settings.validate_settings()
+    except ValueError as e:
+        print("\033[91mConfiguration Error:\033[0m")  # Red color for error
+        print(str(e))
+        raise SystemExit(1)
@@ -0,0 +1,214 @@
+"""Online, batched data migrations.
+
+Older write paths stored community and prompt timestamps as formatted IST
+strings and dataset timestamps as ISO strings, which sort lexically and
+cannot back range queries or TTL indexes; they also left author details
+out of community posts, and copied deleted datasets to deleteddatasets
+instead of tombstoning them. This tool rewrites those documents in place,
+in batches, while the API keeps serving traffic:
+
+    python -m src.database.migrations [--batch-size 500] [--pause 0.1] [--dry-run]
+
+Each document is updated only if the field still holds the value that
+was read, so a concurrent write is never overwritten. The tool can be
+re-run at any time; converted documents no longer match.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from src.config import check_settings
+from src.database.mongodb import (
+    close_db_client,
+    datasets_collection,
+    deleted_datasets_collection,
+    general_collection,
+    issues_collection,
+    replies_collection,
+    prompts_collection
+)
+from src.utils.community_authors import COMMUNITY_COLLECTIONS, resolve_missing_authors
+from src.utils.dataset_gc import schedule_collection
+from src.utils.logger import logging
+
+# India has no daylight saving, so IST is a fixed offset
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
+
+# Formats written by earlier versions, with the zone their naive values were in
+LEGACY_FORMATS = [
+    ("%Y-%m-%d %H:%M:%S IST", IST),
+    ("%Y-%m-%d %H:%M:%S", IST),
+    ("%m-%d-%Y", IST)
+]
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse a legacy timestamp string into an aware UTC datetime, or None if unrecognised."""
+    value = value.strip()
+    for fmt, zone in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=zone).astimezone(timezone.utc)
+        except ValueError:
+            continue
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # isoformat() strings came from naive datetime.now() on UTC hosts
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+# (collection, field) pairs holding one timestamp per document
+FIELDS = [
+    (general_collection, "created_at"),
+    (issues_collection, "created_at"),
+    (replies_collection, "created_at"),
+    (prompts_collection, "createdAt"),
+    (prompts_collection, "updatedAt"),
+    (datasets_collection, "timestamp")
+]
+
+async def migrate_field(collection, field: str, batch_size: int, pause: float, dry_run: bool) -> dict:
+    stats = {"converted": 0, "unparsed": 0}
+    last_id = None
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {field: 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return stats
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for doc in batch:
+            parsed = parse_timestamp(doc[field])
+            if parsed is None:
+                stats["unparsed"] += 1
+                logging.warning(f"Unrecognised {collection.name}.{field} on {doc['_id']}: {doc[field]!r}")
+                continue
+            operations.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parsed}}))
+
+        if operations and not dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+        else:
+            stats["converted"] += len(operations)
+        # Yield to live traffic between batches
+        await asyncio.sleep(pause)
+
+async def migrate_dataset_versions(batch_size: int, pause: float, dry_run: bool) -> dict:
+    """Dataset version history keeps its timestamps inside an array."""
+    stats = {"converted": 0, "unparsed": 0}
+    last_id = None
+    while True:
+        query = {"versions.created_at": {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await datasets_collection.find(query, {"versions": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return stats
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for doc in batch:
+            versions: List[dict] = []
+            for version in doc["versions"]:
+                created_at = version.get("created_at")
+                if isinstance(created_at, str):
+                    parsed = parse_timestamp(created_at)
+                    if parsed is None:
+                        stats["unparsed"] += 1
+                    else:
+                        version = {**version, "created_at": parsed}
+                versions.append(version)
+            operations.append(UpdateOne({"_id": doc["_id"], "versions": doc["versions"]}, {"$set": {"versions": versions}}))
+
+        if operations and not dry_run:
+            result = await datasets_collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+        else:
+            stats["converted"] += len(operations)
+        await asyncio.sleep(pause)
+
+async def backfill_authors(collection, batch_size: int, pause: float, dry_run: bool) -> int:
+    """Embed author snapshots in posts written before they were stored with the post."""
+    converted = 0
+    last_id = None
+    while True:
+        query = {"author": {"$exists": False}, "uid": {"$ne": None}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await collection.find(query, {"uid": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return converted
+        last_id = batch[-1]["_id"]
+
+        authors = await resolve_missing_authors(batch)
+        operations = [
+            UpdateOne({"_id": doc["_id"], "author": {"$exists": False}}, {"$set": {"author": authors.get(doc["uid"])}})
+            for doc in batch
+        ]
+        if not dry_run:
+            result = await collection.bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        else:
+            converted += len(operations)
+        await asyncio.sleep(pause)
+
+async def migrate_deleted_datasets(batch_size: int, pause: float, dry_run: bool) -> int:
+    """Turn datasets copied to deleteddatasets back into tombstones and schedule their collection.
+
+    Their blobs were never deleted; the API's job workers collect them.
+    """
+    moved = 0
+    last_id = None
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        batch = await deleted_datasets_collection.find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            return moved
+        last_id = batch[-1]["_id"]
+
+        if not dry_run:
+            for legacy in batch:
+                try:
+                    await datasets_collection.insert_one({**legacy, "deleted_at": legacy.get("deleted_at") or datetime.now(timezone.utc)})
+                except DuplicateKeyError:
+                    pass
+                await schedule_collection(legacy["_id"], legacy.get("uid"))
+            await deleted_datasets_collection.delete_many({"_id": {"$in": [legacy["_id"] for legacy in batch]}})
+        moved += len(batch)
+        await asyncio.sleep(pause)
+
+async def run_migrations(batch_size: int = 500, pause: float = 0.1, dry_run: bool = False) -> None:
+    for collection, field in FIELDS:
+        stats = await migrate_field(collection, field, batch_size, pause, dry_run)
+        logging.info(f"{collection.name}.{field}: {stats['converted']} converted, {stats['unparsed']} unrecognised")
+    stats = await migrate_dataset_versions(batch_size, pause, dry_run)
+    logging.info(f"datasets.versions: {stats['converted']} document(s) converted, {stats['unparsed']} unrecognised")
+    for collection in COMMUNITY_COLLECTIONS:
+        converted = await backfill_authors(collection, batch_size, pause, dry_run)
+        logging.info(f"{collection.name}.author: {converted} post(s) backfilled")
+    moved = await migrate_deleted_datasets(batch_size, pause, dry_run)
+    logging.info(f"deleteddatasets: {moved} dataset(s) moved to tombstones")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run online data migrations")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to wait between batches")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change without writing")
+    args = parser.parse_args()
+    check_settings()
+    asyncio.run(_run(args.batch_size, args.pause, args.dry_run))
+
+async def _run(batch_size: int, pause: float, dry_run: bool) -> None:
+    try:
+        await run_migrations(batch_size, pause, dry_run)
+    finally:
+        await close_db_client()
+
+if __name__ == "__main__":
+    main()
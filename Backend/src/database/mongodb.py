@@ -1,17 +1,112 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from src.utils.logger import logging
 from pymongo.errors import PyMongoError
 from src.config import settings
 
-client = AsyncIOMotorClient(settings.MONGODB_URL)
-db = client[settings.DATABASE_NAME]
-user_profile_collection = db.userprofile
-datasets_collection = db.datasets
-deleted_datasets_collection = db.deleteddatasets
-general_collection = db.general
-issues_collection = db.issues
-replies_collection = db.replies
-prompts_collection = db.prompts
+def _client_options(max_pool_size: int) -> dict:
+    options = {
+        # tz_aware so stored datetimes come back as UTC and serialize with an offset
+        "tz_aware": True,
+        "appname": "vecem-api",
+        "maxPoolSize": max_pool_size,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGODB_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    }
+    if settings.MONGODB_SOCKET_TIMEOUT_MS is not None:
+        options["socketTimeoutMS"] = settings.MONGODB_SOCKET_TIMEOUT_MS
+    if settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGODB_COMPRESSORS:
+        options["compressors"] = settings.MONGODB_COMPRESSORS
+    return options
+
+# Created by open_db_clients() from the app lifespan, or on first use by jobs and CLIs
+client: Optional[AsyncIOMotorClient] = None
+db: Optional[AsyncIOMotorDatabase] = None
+read_client: Optional[AsyncIOMotorClient] = None
+read_db: Optional[AsyncIOMotorDatabase] = None
+
+def _open_clients() -> None:
+    global client, db, read_client, read_db
+    if client is not None:
+        return
+    primary = AsyncIOMotorClient(settings.MONGODB_URL, **_client_options(settings.MONGODB_MAX_POOL_SIZE))
+    # Heavy read endpoints (catalog, profiles, community) use a separate client that
+    # may read from secondaries. Its results can lag the primary by the replication
+    # delay, so anything that reads back its own write uses the primary collections.
+    read_options = _client_options(settings.MONGODB_READ_MAX_POOL_SIZE)
+    read_options["readPreference"] = settings.MONGODB_READ_PREFERENCE
+    if settings.MONGODB_READ_MAX_STALENESS_SECONDS is not None:
+        read_options["maxStalenessSeconds"] = settings.MONGODB_READ_MAX_STALENESS_SECONDS
+    read_client = AsyncIOMotorClient(settings.MONGODB_READ_URL or settings.MONGODB_URL, **read_options)
+    read_db = read_client[settings.DATABASE_NAME]
+    db = primary[settings.DATABASE_NAME]
+    client = primary
+
+def get_client() -> AsyncIOMotorClient:
+    if client is None:
+        _open_clients()
+    return client
+
+def get_read_client() -> AsyncIOMotorClient:
+    if read_client is None:
+        _open_clients()
+    return read_client
+
+class _Collection:
+    """A named collection on the primary or read client, looked up on each use.
+
+    Modules import these at load time, before the clients exist, so the
+    client behind them is only created once something actually queries.
+    """
+
+    def __init__(self, name: str, read: bool = False):
+        self.name = name
+        self._read = read
+
+    def __getattr__(self, attr):
+        if self._read:
+            get_read_client()
+            database = read_db
+        else:
+            get_client()
+            database = db
+        return getattr(database[self.name], attr)
+
+    def __repr__(self) -> str:
+        return f"_Collection({self.name!r}, read={self._read})"
+
+user_profile_collection = _Collection("userprofile")
+datasets_collection = _Collection("datasets")
+deleted_datasets_collection = _Collection("deleteddatasets")
+general_collection = _Collection("general")
+issues_collection = _Collection("issues")
+replies_collection = _Collection("replies")
+prompts_collection = _Collection("prompts")
+chat_history_collection = _Collection("chathistory")
+dataset_feeds_collection = _Collection("datasetfeeds")
+popularity_collection = _Collection("popularity")
+blobs_collection = _Collection("blobs")
+manifests_collection = _Collection("manifests")
+jobs_collection = _Collection("jobs")
+
+user_profile_read_collection = _Collection("userprofile", read=True)
+datasets_read_collection = _Collection("datasets", read=True)
+general_read_collection = _Collection("general", read=True)
+issues_read_collection = _Collection("issues", read=True)
+replies_read_collection = _Collection("replies", read=True)
+prompts_read_collection = _Collection("prompts", read=True)
+dataset_feeds_read_collection = _Collection("datasetfeeds", read=True)
+popularity_read_collection = _Collection("popularity", read=True)
+
+# Deleted datasets stay in the collection as tombstones until the purge TTL;
+# every read of live datasets filters on this
+ACTIVE_DATASETS = {"deleted_at": None}
 
 async def save_userprofile(userprofile: dict) -> str:
     try:
@@ -31,35 +126,27 @@ async def save_metadata(metadata: dict) -> str:
         logging.error(f"MongoDB error: {str(e)}")
         raise
 
-async def save_metadata_and_update_user(metadata: dict) -> str:
+# Recent datasets already added to a profile's counters, so a retried upload is not counted twice
+COUNTED_UPLOADS_KEPT = 20
+
+async def count_user_upload(metadata: dict) -> None:
+    """Add a saved dataset to its owner's dataset counters, once per dataset."""
+    uid = metadata["uid"]
+    dataset_id = str(metadata["_id"])
+    update = {
+        "$inc": {
+            "number_of_raw_datasets": 1 if metadata["upload_type"] in ["raw", "both"] else 0,
+            "number_of_vectorized_datasets": 1 if metadata["upload_type"] in ["vectorized", "both"] else 0
+        },
+        "$push": {"counted_uploads": {"$each": [dataset_id], "$slice": -COUNTED_UPLOADS_KEPT}},
+        "$set": {"updatedAt": datetime.now(timezone.utc)}
+    }
     try:
-        # Save to datasets collection
-        dataset_id = await save_metadata(metadata)
-        
-        # Update user profile with dataset reference
-        uid = metadata["uid"]
-        # dataset_summary = {
-        #     "dataset_id": metadata["dataset_id"],
-        #     "name": metadata["dataset_info"]["name"],
-        #     "upload_type": metadata["upload_type"],
-        #     "timestamp": metadata["timestamp"]
-        # }
-                
-
-        update_result = await user_profile_collection.update_one(
-            {"uid": uid},
-            {
-                # "$push": {"datasets": dataset_summary},
-                "$inc": {
-                    "number_of_raw_datasets": 1 if metadata["upload_type"] in ["raw", "both"] else 0,
-                    "number_of_vectorized_datasets": 1 if metadata["upload_type"] in ["vectorized", "both"] else 0
-                }
-            },
-            upsert=True
-        )
-        
+        result = await user_profile_collection.update_one({"uid": uid, "counted_uploads": {"$ne": dataset_id}}, update)
+        if result.matched_count == 0 and not await user_profile_collection.find_one({"uid": uid}, {"_id": 1}):
+            # Uploads by users without a profile document still create one
+            await user_profile_collection.update_one({"uid": uid}, update, upsert=True)
         logging.info(f"Updated user profile for UID {uid} with dataset {dataset_id}")
-        return dataset_id
     except Exception as e:
         logging.error(f"MongoDB error: {str(e)}")
         raise
@@ -80,6 +167,7 @@ async def update_user_profile(uid: str, new_bio: str, new_profile_picture: str,
             "name": new_name,
             "githubUrl": new_github_url,
             "username": new_username,
+            "updatedAt": datetime.now(timezone.utc),
             **set_has_changed
         }
 
@@ -98,26 +186,11 @@ async def update_user_profile(uid: str, new_bio: str, new_profile_picture: str,
         logging.error(f"MongoDB error: {str(e)}")
         raise
 
-async def delete_user_account(uid: str) -> bool:
-    try:
-        # Delete user profile
-        profile_result = await user_profile_collection.delete_one({"uid": uid})
-        
-        # Delete all user datasets
-        datasets_result = await datasets_collection.delete_many({"uid": uid})
-        
-        logging.info(f"Deleted user account {uid}: {profile_result.deleted_count} profile(s), {datasets_result.deleted_count} dataset(s)")
-        
-        return profile_result.deleted_count > 0
-    except Exception as e:
-        logging.error(f"MongoDB error during account deletion: {str(e)}")
-        raise
-
 async def save_api_key(uid: str, api_key: str) -> bool:
     try:
         result = await user_profile_collection.update_one(
             {"uid": uid},
-            {"$set": {"api_key": api_key}},
+            {"$set": {"api_key": api_key, "updatedAt": datetime.now(timezone.utc)}},
             upsert=True
         )
         return result.modified_count > 0 or result.upserted_id is not None
@@ -136,5 +209,104 @@ async def check_api_key_exists(uid: str) -> bool:
         logging.error(f"MongoDB error checking API key: {str(e)}")
         raise
 
+async def touch_user_profile(query: dict) -> None:
+    """Mark a profile page as changed after a write to something it lists.
+
+    Profile ETags are derived from ``updatedAt``, so this must run after
+    the write it reflects, never before.
+    """
+    try:
+        await user_profile_collection.update_one(query, {"$set": {"updatedAt": datetime.now(timezone.utc)}})
+    except PyMongoError as e:
+        logging.error(f"MongoDB error touching user profile: {str(e)}")
+
+async def profile_version(query: dict) -> Optional[dict]:
+    """A profile's ``_id`` and ``updatedAt``, without loading the rest of it.
+
+    Read from the primary: a secondary may not have a profile edit yet, and
+    a stale version would answer the editor's next request with a 304.
+    """
+    profile = await user_profile_collection.find_one(query, {"updatedAt": 1})
+    if profile is not None and "updatedAt" not in profile:
+        # Profiles written before updatedAt was tracked are stamped on first read
+        await user_profile_collection.update_one(
+            {"_id": profile["_id"], "updatedAt": {"$exists": False}},
+            {"$set": {"updatedAt": datetime.now(timezone.utc)}}
+        )
+        profile = await user_profile_collection.find_one({"_id": profile["_id"]}, {"updatedAt": 1})
+    return profile
+
+async def ensure_indexes():
+    try:
+        await chat_history_collection.create_index([("uid", 1), ("session_id", 1)], unique=True)
+        # Profile pages and their ETag checks look profiles up by uid or username
+        await user_profile_collection.create_index("uid")
+        await user_profile_collection.create_index("username")
+        # Catalog search; Mongo keeps the text index current on every insert, update and delete
+        await datasets_collection.create_index(
+            [
+                ("dataset_info.name", "text"),
+                ("dataset_info.description", "text"),
+                ("dataset_info.domain", "text"),
+                ("dataset_info.file_type", "text"),
+                ("dataset_info.model_name", "text"),
+                ("dataset_info.vector_database", "text")
+            ],
+            name="dataset_search",
+            weights={
+                "dataset_info.name": 10,
+                "dataset_info.domain": 5,
+                "dataset_info.file_type": 3,
+                "dataset_info.model_name": 3,
+                "dataset_info.vector_database": 3,
+                "dataset_info.description": 1
+            },
+            default_language="english"
+        )
+        await datasets_collection.create_index([("dataset_info.file_type", 1), ("timestamp", -1)])
+        await datasets_collection.create_index([("dataset_info.domain", 1), ("timestamp", -1)])
+        await datasets_collection.create_index([("timestamp", -1)])
+        await datasets_collection.create_index([("uid", 1), ("dataset_info.name", 1)])
+        await general_collection.create_index([("created_at", 1)])
+        await issues_collection.create_index([("created_at", 1)])
+        await replies_collection.create_index([("issue_id", 1), ("created_at", 1)])
+        # Author fan-out and account deletion find a user's posts by uid
+        await general_collection.create_index("uid")
+        await issues_collection.create_index("uid")
+        await replies_collection.create_index("uid")
+        await prompts_collection.create_index([("createdAt", -1)])
+        await prompts_collection.create_index([("username", 1), ("prompt_name", 1)])
+        await popularity_collection.create_index([("kind", 1), ("trending_score", -1)])
+        await popularity_collection.create_index([("last_event_at", -1)])
+        await jobs_collection.create_index([("status", 1), ("run_after", 1), ("created_at", 1)])
+        # Finished jobs stay queryable for a week, then expire
+        await jobs_collection.create_index("finished_at", expireAfterSeconds=7 * 24 * 3600)
+        # Tombstones are dropped once their blobs are collected and the retention period has passed
+        await datasets_collection.create_index(
+            "purged_at",
+            expireAfterSeconds=settings.DELETED_DATASET_RETENTION
+        )
+        # {"deleted_at": None} matches missing fields too, which a sparse index cannot serve
+        await datasets_collection.create_index([("deleted_at", 1), ("timestamp", -1)])
+        if "deleted_at_1" in await datasets_collection.index_information():
+            await datasets_collection.drop_index("deleted_at_1")
+        logging.info("MongoDB indexes ensured")
+    except PyMongoError as e:
+        logging.error(f"MongoDB error creating indexes: {str(e)}")
+
+async def _ping(name: str, mongo_client: AsyncIOMotorClient) -> None:
+    try:
+        await mongo_client.admin.command("ping")
+    except PyMongoError as e:
+        logging.error(f"MongoDB {name} client could not connect: {str(e)}")
+
+async def open_db_clients():
+    """Create both clients and connect them at startup so the first requests don't pay for it."""
+    await asyncio.gather(_ping("primary", get_client()), _ping("read", get_read_client()))
+
 async def close_db_client():
-    client.close()
+    global client, db, read_client, read_db
+    if client is not None:
+        client.close()
+        read_client.close()
+    client = db = read_client = read_db = None
@@ -1,32 +1,90 @@
 import sys
+import json
+import asyncio
 import uuid
 import base64
-from datetime import datetime, timedelta
-import pytz
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import FastAPI, HTTPException, Depends, Body
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Depends, Body, Request
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from src.routes.upload_router import router as upload_router
-from src.database.mongodb import close_db_client, user_profile_collection, update_user_profile,datasets_collection, delete_user_account,deleted_datasets_collection,replies_collection,issues_collection,general_collection,prompts_collection
+from src.routes.search_router import router as search_router
+from src.routes.download_router import router as download_router
+from src.routes.jobs_router import router as jobs_router
+from src.database.mongodb import close_db_client, user_profile_collection, update_user_profile,datasets_collection,replies_collection,ACTIVE_DATASETS,issues_collection,general_collection,prompts_collection,touch_user_profile,profile_version,open_db_clients
+from src.database.mongodb import user_profile_read_collection,datasets_read_collection,prompts_read_collection,general_read_collection,issues_read_collection,replies_read_collection
 from src.models.models import UserProfile,UidRequest,SettingProfile,Prompts
-from fastapi.encoders import jsonable_encoder
 from src.utils.exception import CustomException
 from src.utils.logger import logging
 from src.routes import users
-from src.bot import FRIDAY
+from src.utils.chat_sessions import chat_sessions
+from src.utils.response_cache import response_cache
+from src.utils.llm_limiter import LLMOverloadedError, llm_limiter
+from src.utils.dataset_feeds import dataset_feeds
+from src.utils.popularity import popularity
+from src.utils.jobs import jobs
+from src.utils.archiver import archiver
+from src.utils.upload_admission import upload_admission, sweep_spool
+from src.utils.dataset_gc import tombstone_dataset, requeue_pending
+from src.utils.account_deletion import request_account_deletion
+from src.utils.community_authors import author_snapshot, resolve_missing_authors, schedule_author_fanout
+from src.utils.community_stream import community_stream, format_message, format_reply, TAGS as COMMUNITY_TAGS
 from typing import Optional 
 from src.models.chat_models import General, Issue, IssueReply
 from src.database import mongodb
-from src.models.dataset_models import DatasetSchema, DatasetInfo, Files
-from src.config import settings
+from src.models.response_models import (
+    DATASET_SUMMARY_PROJECTION,
+    PROMPT_SUMMARY_PROJECTION,
+    dataset_summary,
+    prompt_summary,
+    dataset_payload
+)
+from src.utils.serialization import FastJSONResponse
+from src.utils.etags import make_etag, etag_matches, etag_headers, not_modified
+from src.config import settings, check_settings
 from src.middleware.error_handler import error_handler
+from src.utils.azure_storage import open_storage, close_storage, get_blob_service_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients and background workers start here rather than at import, so
+    # importing the app stays cheap; the chat bot loads on the first /chat
+    logging.info("Operation: lifespan() startup")
+    check_settings()
+    open_storage()
+    await open_db_clients()
+    await mongodb.ensure_indexes()
+    await sweep_spool(settings.UPLOAD_SPOOL_ORPHAN_AGE)
+    popularity.start()
+    jobs.start()
+    requeue = asyncio.create_task(requeue_pending())
+    await community_stream.start()
+    try:
+        yield
+    finally:
+        logging.info("Operation: lifespan() shutdown")
+        requeue.cancel()
+        await asyncio.gather(requeue, return_exceptions=True)
+        await community_stream.stop()
+        await jobs.stop()
+        archiver.shutdown()
+        await popularity.stop()
+        close_storage()
+        await close_db_client()
 
 app = FastAPI(
     title="Vecem API",
     version="1.0.0",
     description="Vecem API for managing datasets and user profiles",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -46,11 +104,21 @@ app.middleware("http")(SecurityMiddleware(
     allowed_hosts=settings.ALLOWED_HOSTS if hasattr(settings, 'ALLOWED_HOSTS') else []
 ))
 
+# Add upload admission middleware
+from src.middleware.upload_admission import UploadAdmissionMiddleware
+app.add_middleware(UploadAdmissionMiddleware, admission=upload_admission, paths=["/upload", "/upload/edit"])
+
 # Add error handler middleware
 app.middleware("http")(error_handler)
 
+# Compress large responses; GZipMiddleware leaves text/event-stream unbuffered and uncompressed
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE, compresslevel=settings.GZIP_COMPRESS_LEVEL)
+
 # Include routers
 app.include_router(upload_router)
+app.include_router(search_router)
+app.include_router(download_router)
+app.include_router(jobs_router)
 app.include_router(users.router)
 
 @app.get("/")
@@ -73,7 +141,7 @@ async def register_uid(uid_request: UidRequest):
         user_profile = await user_profile_collection.find_one({"uid": uid})
         if user_profile:
             logging.info("User profile exists for UID: {uid, email,name}")
-            return jsonable_encoder(user_profile_serializer(user_profile))
+            return FastJSONResponse(user_profile_serializer(user_profile))
         else:
             unique_id = str("vecem" + base64.urlsafe_b64encode(uuid.uuid4().bytes).decode('utf-8').rstrip('=\n')[:6])
             username = f"{name.replace(' ', '')}{unique_id}"
@@ -86,70 +154,63 @@ async def register_uid(uid_request: UidRequest):
                 hasChangedUsername=False,
                 profilePicture="/avatars/default.png"  # Add default avatar path
             )
-            await user_profile_collection.insert_one(new_user_profile.dict())
+            await user_profile_collection.insert_one({**new_user_profile.dict(), "updatedAt": datetime.now(timezone.utc)})
             logging.info(f"New user profile created for UID: {uid,email,name} with username: {username}")
-            return jsonable_encoder(new_user_profile.dict())
+            return FastJSONResponse(new_user_profile.dict())
     except Exception as e:
         CustomException(e,sys)
 
+async def profile_page(version: dict) -> Optional[dict]:
+    """The profile page that ``version`` names, with the user's datasets and prompts.
+
+    Served from a secondary once it has the version's updatedAt, and from
+    the primary until then, so the body always matches the ETag.
+    """
+    user_profile = await user_profile_read_collection.find_one({"_id": version["_id"]})
+    if user_profile is not None and user_profile.get("updatedAt") == version["updatedAt"]:
+        datasets_source, prompts_source = datasets_read_collection, prompts_read_collection
+    else:
+        user_profile = await user_profile_collection.find_one({"_id": version["_id"]})
+        datasets_source, prompts_source = datasets_collection, prompts_collection
+    if not user_profile:
+        return None
+
+    # Get user's datasets
+    datasets = await datasets_source.find(
+        {"uid": user_profile["uid"], **ACTIVE_DATASETS},
+        DATASET_SUMMARY_PROJECTION
+    ).to_list(None)
+
+    # Get user's prompts
+    prompts = await prompts_source.find(
+        {"username": user_profile["username"]},
+        PROMPT_SUMMARY_PROJECTION
+    ).to_list(None)
+
+    # Add datasets and prompts to user profile
+    user_profile_data = user_profile_serializer(user_profile)
+    user_profile_data["datasets"] = [dataset_summary(dataset) for dataset in datasets]
+    user_profile_data["prompts"] = [prompt_summary(prompt) for prompt in prompts]
+    return user_profile_data
+
 @app.get("/user-profile/{uid}")
-async def get_user_profile(uid: str):
+async def get_user_profile(uid: str, request: Request):
     logging.info(f"Endpoint called: get_user_profile() for UID: {uid}")
     try:
-        user_profile = await user_profile_collection.find_one({"uid": uid})
-        if not user_profile:
+        # Every write to what this page lists touches updatedAt, so it versions the whole response
+        version = await profile_version({"uid": uid})
+        if not version:
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        # Get user's datasets
-        datasets = await datasets_collection.find(
-            {"uid": uid},
-            {
-                "dataset_id": 1,
-                "dataset_info.name": 1,
-                "dataset_info.description": 1,
-                "upload_type": 1,
-                "timestamp": 1
-            }
-        ).to_list(None)
-
-        # Get user's prompts
-        prompts = await prompts_collection.find(
-            {"username": user_profile["username"]}
-        ).to_list(None)
-
-        # Format datasets
-        formatted_datasets = [
-            {
-                "id": str(dataset["_id"]),
-                "name": dataset.get("dataset_info", {}).get("name", "Untitled"),
-                "description": dataset.get("dataset_info", {}).get("description", ""),
-                "upload_type": dataset.get("upload_type", "unknown"),
-                "updatedAt": dataset.get("timestamp", ""),
-                "timestamp": dataset.get("timestamp", "")
-            }
-            for dataset in datasets
-        ]
-
-        # Format prompts
-        formatted_prompts = [
-            {
-                "id": str(prompt["_id"]),
-                "name": prompt.get("prompt_name", "Untitled"),
-                "description": prompt.get("description", ""),
-                "domain": prompt.get("domain", "General"),
-                "prompt": prompt.get("prompt", ""),
-                "createdAt": prompt.get("createdAt", ""),
-                "updatedAt": prompt.get("updatedAt", prompt.get("createdAt", ""))
-            }
-            for prompt in prompts
-        ]
+        etag = make_etag("profile", version["_id"], version["updatedAt"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-        # Add datasets and prompts to user profile
-        user_profile_data = user_profile_serializer(user_profile)
-        user_profile_data["datasets"] = formatted_datasets
-        user_profile_data["prompts"] = formatted_prompts
+        user_profile_data = await profile_page(version)
+        if not user_profile_data:
+            raise HTTPException(status_code=404, detail="User profile not found")
 
-        return jsonable_encoder(user_profile_data)
+        return FastJSONResponse(user_profile_data, headers=etag_headers(etag))
         
     except HTTPException as he:
         raise he
@@ -158,56 +219,22 @@ async def get_user_profile(uid: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/user-profile/username/{username}")
-async def get_user_profile_by_username(username: str):
+async def get_user_profile_by_username(username: str, request: Request):
     logging.info(f"Endpoint called: get_user_profile_by_username() for username: {username}")
     try:
-        user_profile = await user_profile_collection.find_one({"username": username})
-        if not user_profile:
+        version = await profile_version({"username": username})
+        if not version:
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        # Get user's datasets
-        datasets = await datasets_collection.find(
-            {"uid": user_profile["uid"]}
-        ).to_list(None)
-
-        # Get user's prompts
-        prompts = await prompts_collection.find(
-            {"username": username}
-        ).to_list(None)
-
-        # Format datasets
-        formatted_datasets = [
-            {
-                "id": str(dataset["_id"]),
-                "name": dataset.get("dataset_info", {}).get("name", "Untitled"),
-                "description": dataset.get("dataset_info", {}).get("description", ""),
-                "upload_type": dataset.get("upload_type", "unknown"),
-                "updatedAt": dataset.get("timestamp", ""),
-                "timestamp": dataset.get("timestamp", "")
-            }
-            for dataset in datasets
-        ]
-
-        # Format prompts
-        formatted_prompts = [
-            {
-                "id": str(prompt["_id"]),
-                "name": prompt.get("prompt_name", "Untitled"),
-                "description": prompt.get("description", ""),
-                "domain": prompt.get("domain", "General"),
-                "prompt": prompt.get("prompt", ""),
-                "createdAt": prompt.get("createdAt", ""),
-                "updatedAt": prompt.get("updatedAt", prompt.get("createdAt", ""))
-            }
-            for prompt in prompts
-        ]
+        etag = make_etag("profile", version["_id"], version["updatedAt"])
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-        # Add datasets and prompts to user profile
-        user_profile_data = user_profile_serializer(user_profile)
-        user_profile_data["datasets"] = formatted_datasets
-        user_profile_data["prompts"] = formatted_prompts
+        user_profile_data = await profile_page(version)
+        if not user_profile_data:
+            raise HTTPException(status_code=404, detail="User profile not found")
 
-        return jsonable_encoder(user_profile_data)
+        return FastJSONResponse(user_profile_data, headers=etag_headers(etag))
 
     except HTTPException as he:
         raise he
@@ -243,8 +270,8 @@ async def update_profile(user: SettingProfile):
         if existing_user:
             raise HTTPException(status_code=400, detail="Username already taken")
 
-        # Update document directly
-        update_result = await user_profile_collection.update_one(
+        # Update document directly, keeping the previous name and avatar to detect changes
+        previous = await user_profile_collection.find_one_and_update(
             {"uid": user.uid},
             {"$set": {
                 "name": user.displayName,
@@ -253,11 +280,17 @@ async def update_profile(user: SettingProfile):
                 "githubUrl": user.githubUrl,
                 "username": user.username,
                 "hasChangedUsername": user.hasChangedUsername,
-                "api_key": user.apiKey  # Add API key update
-            }}
+                "api_key": user.apiKey,  # Add API key update
+                "updatedAt": datetime.now(timezone.utc)
+            }},
+            projection={"name": 1, "profilePicture": 1}
         )
 
-        if update_result.modified_count > 0:
+        if previous is not None:
+            chat_sessions.invalidate(user.uid)
+            if (previous.get("name"), previous.get("profilePicture")) != (user.displayName, user.photoURL):
+                # Posts embed the author's name and avatar; refresh them in the background
+                await schedule_author_fanout(user.uid, {"name": user.displayName, "profilePicture": user.photoURL})
             logging.info(f"Profile updated successfully for UID: {user.uid}")
             return {"message": "Profile updated successfully"}
         else:
@@ -272,15 +305,19 @@ async def update_profile(user: SettingProfile):
 async def delete_account(uid: str):
     logging.info(f"Endpoint called: delete_account() for UID: {uid}")
     try:
-        # Delete user account from database
-        success = await delete_user_account(uid)
+        # Everything the account owns is removed by a background job; poll /jobs/{job_id}
+        job_id = await request_account_deletion(uid)
         
-        if not success:
+        if not job_id:
             raise HTTPException(status_code=404, detail="User profile not found")
-            
-        return {"message": "Account deleted successfully"}
+
+        chat_sessions.invalidate(uid)
+        return {"message": "Account deletion started", "job_id": job_id}
+    except HTTPException as he:
+        raise he
     except Exception as e:
-        CustomException(e,sys)
+        logging.error(f"Error deleting account: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/dataset-click")
 async def log_dataset_click(data: dict):
@@ -291,22 +328,28 @@ async def log_dataset_click(data: dict):
         if not username or not dataset_name:
             raise ValueError("Username or datasetName is missing")
             
-        user = await user_profile_collection.find_one({"username": username})
+        user = await user_profile_read_collection.find_one({"username": username})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
             
-        dataset = await datasets_collection.find_one({
+        dataset = await datasets_read_collection.find_one({
             "uid": user["uid"],
-            "dataset_info.name": dataset_name
+            "dataset_info.name": dataset_name,
+            **ACTIVE_DATASETS
         })
         
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        # Convert to DatasetSchema format    
-        dataset["_id"] = str(dataset["_id"])
-        dataset["username"] = username
-        return jsonable_encoder(DatasetSchema(**dataset))
+        popularity.record(
+            "dataset",
+            str(dataset["_id"]),
+            "clicks",
+            {"username": username, "name": dataset_name}
+        )
+
+        # Stored URLs were validated on upload; no need to parse them again here
+        return FastJSONResponse(dataset_payload(dataset, username))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -324,15 +367,13 @@ async def log_dataset_edit(data: dict):
         # Query the dataset and include dataset type information
         dataset = await datasets_collection.find_one({
             "uid": uid,
-            "dataset_info.name": dataset_name
+            "dataset_info.name": dataset_name,
+            **ACTIVE_DATASETS
         })
         
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        # Convert ObjectId to string for JSON serialization
-        dataset["_id"] = str(dataset["_id"])
-        
         # Add dataset type information
         dataset_type = "Both"
         if dataset.get("files"):
@@ -351,7 +392,7 @@ async def log_dataset_edit(data: dict):
         # Log the edit action
         logging.info(f"Dataset edit clicked - UID: {uid}, Dataset: {dataset_name}, Type: {dataset_type}")
         
-        return jsonable_encoder(dataset)
+        return FastJSONResponse(dataset)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -367,7 +408,8 @@ async def update_dataset(dataset_id: str, updated_data: dict):
             
         dataset = await datasets_collection.find_one({
             "_id": object_id,
-            "uid": updated_data["userId"]
+            "uid": updated_data["userId"],
+            **ACTIVE_DATASETS
         })
         
         if not dataset:
@@ -396,16 +438,19 @@ async def update_dataset(dataset_id: str, updated_data: dict):
                 "datasetId": dataset["dataset_id"]  # Preserve dataset_id
             },
             "upload_type": upload_type,
-            "timestamp": datetime.now()
+            "timestamp": datetime.now(timezone.utc)
         }
         
         result = await datasets_collection.update_one(
-            {"_id": object_id},
+            {"_id": object_id, **ACTIVE_DATASETS},
             {"$set": update_dict}
         )
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Failed to update dataset")
+
+        await touch_user_profile({"uid": dataset.get("uid")})
+        await dataset_feeds.refresh(dataset["dataset_info"].get("file_type"), updated_data.get("fileType"))
             
         return {"message": "Dataset updated successfully", "status": "success"}
         
@@ -434,26 +479,14 @@ async def delete_dataset(dataset_id: str, delete_req: DatasetDeleteRequest = Bod
             logging.error(f"Invalid ObjectId format: {dataset_id} - {str(e)}")
             raise HTTPException(status_code=400, detail=f"Invalid dataset ID format: {dataset_id}")
         
-        # Find the dataset document first
-        dataset_doc = await datasets_collection.find_one({"_id": object_id, "uid": uid})
+        # Tombstone in one atomic update; blobs are collected in the background
+        dataset_doc = await tombstone_dataset({"_id": object_id, "uid": uid})
         
         if not dataset_doc:
             logging.error(f"Dataset not found with _id: {object_id} and uid: {uid}")
             raise HTTPException(status_code=404, detail="Dataset not found or you don't have permission to delete it")
-            
-        # Mark the document as deleted
-        dataset_doc["deleted_at"] = datetime.now()
 
-        # Insert into deleted_datasets collection
-        await deleted_datasets_collection.insert_one(dataset_doc)
-        logging.info(f"Dataset added to deleted_datasets_collection")
-
-        # Delete from original collection
-        result = await datasets_collection.delete_one({"_id": object_id})
-        
-        if result.deleted_count == 0:
-            logging.error(f"Failed to delete dataset from collection")
-            raise HTTPException(status_code=500, detail="Failed to delete dataset")
+        await dataset_feeds.refresh(dataset_doc.get("dataset_info", {}).get("file_type"))
             
         logging.info(f"Dataset successfully deleted - UserID: {uid}, Dataset Name: {dataset_name}")
         return {"message": "Dataset deleted successfully"}
@@ -468,7 +501,7 @@ async def delete_dataset(dataset_id: str, delete_req: DatasetDeleteRequest = Bod
 async def get_user_avatar(uid: str):
     logging.info(f"Endpoint called: get_user_avatar() for UID: {uid}")
     try:
-        user_profile = await user_profile_collection.find_one(
+        user_profile = await user_profile_read_collection.find_one(
             {"uid": uid},
             {"profilePicture": 1}
         )
@@ -486,7 +519,8 @@ async def check_dataset_name_availability(uid: str, dataset_name: str):
         # Check if dataset name exists for this user
         existing_dataset = await datasets_collection.find_one({
             "uid": uid,
-            "dataset_info.name": dataset_name
+            "dataset_info.name": dataset_name,
+            **ACTIVE_DATASETS
         })
         return {
             "available": existing_dataset is None,
@@ -495,6 +529,14 @@ async def check_dataset_name_availability(uid: str, dataset_name: str):
     except Exception as e:
         CustomException(e, sys)
 
+def category_payload(category: str, datasets: list) -> dict:
+    return {
+        "status": "success",
+        "message": f"Category {category} selected",
+        "category": category,
+        "datasets": datasets
+    }
+
 @app.post("/dataset-category")
 async def log_dataset_category(data: dict):
     logging.info(f"Endpoint called: log_dataset_category() for category: {data.get('category')}")
@@ -503,48 +545,42 @@ async def log_dataset_category(data: dict):
         if not category:
             raise ValueError("Category is missing")
 
-        # Base query
-        query = {}
-        if category != "all":
-            query["dataset_info.file_type"] = category
-
-        # Fetch 16 most recent datasets
-        datasets = await datasets_collection.find(query).sort("timestamp", -1).limit(16).to_list(None)
-        
-        # Process datasets
-        processed_datasets = []
-        for dataset in datasets:
-            dataset["_id"] = str(dataset["_id"])
-            if "dataset_info" not in dataset:
-                dataset["dataset_info"] = {}
-            dataset["dataset_info"]["file_type"] = dataset.get("dataset_info", {}).get("file_type", "unknown")
-            dataset["dataset_info"]["name"] = dataset.get("dataset_info", {}).get("name", "Untitled")
-            dataset["dataset_info"]["description"] = dataset.get("dataset_info", {}).get("description", "")
-            dataset["dataset_info"]["domain"] = dataset.get("dataset_info", {}).get("domain", "")
-            processed_datasets.append(dataset)
+        # 16 most recent datasets, served from the materialized feed
+        _, datasets = await dataset_feeds.feed(category)
 
-        return {
-            "status": "success",
-            "message": f"Category {category} selected",
-            "category": category,
-            "datasets": jsonable_encoder(processed_datasets)
-        }
+        return FastJSONResponse(category_payload(category, datasets))
     except Exception as e:
         logging.error(f"Error in log_dataset_category: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/dataset-category/{category}")
+async def get_dataset_category(category: str, request: Request):
+    logging.info(f"Endpoint called: get_dataset_category() for category: {category}")
+    try:
+        # Validated against the feed's in-process snapshot; usually no database round trip
+        updated_at, datasets = await dataset_feeds.feed(category)
+        etag = make_etag("feed", category, updated_at)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        return FastJSONResponse(category_payload(category, datasets), headers=etag_headers(etag))
+    except Exception as e:
+        logging.error(f"Error in get_dataset_category: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/community/general")
 async def create_general_message(message: dict):
     try:
-        ist = pytz.timezone('Asia/Kolkata')
         message_doc = {
             "title": message.get("title"),
             "description": message.get("description"),
             "uid": message.get("uid"),
-            "created_at": datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S %Z')
+            "author": await author_snapshot(message.get("uid")),
+            "created_at": datetime.now(timezone.utc)
         }
         result = await general_collection.insert_one(message_doc)
         message_id = str(result.inserted_id)
+        await community_stream.publish("general", "message", format_message(message_doc, "general", {}))
         return {"id": message_id, "status": "success"}
     except Exception as e:
         logging.error(f"Error creating general message: {str(e)}")
@@ -553,15 +589,16 @@ async def create_general_message(message: dict):
 @app.post("/community/issue")
 async def create_issue_message(message: dict):
     try:
-        ist = pytz.timezone('Asia/Kolkata')
         message_doc = {
             "title": message.get("title"),
             "description": message.get("description"),
             "uid": message.get("uid"),
-            "created_at": datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S %Z')
+            "author": await author_snapshot(message.get("uid")),
+            "created_at": datetime.now(timezone.utc)
         }
         result = await issues_collection.insert_one(message_doc)
         message_id = str(result.inserted_id)
+        await community_stream.publish("issue", "message", format_message(message_doc, "issue", {}))
         return {"id": message_id, "status": "success"}
     except Exception as e:
         logging.error(f"Error creating issue message: {str(e)}")
@@ -570,16 +607,17 @@ async def create_issue_message(message: dict):
 @app.post("/community/reply")
 async def create_reply_message(message: dict):
     try:
-        ist = pytz.timezone('Asia/Kolkata')
         message_doc = {
             "issue_id": message.get("issue_id"),
             "title": message.get("title"),
             "description": message.get("description"),
             "uid": message.get("uid"),
-            "created_at": datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S %Z')
+            "author": await author_snapshot(message.get("uid")),
+            "created_at": datetime.now(timezone.utc)
         }
         result = await replies_collection.insert_one(message_doc)
         message_id = str(result.inserted_id)
+        await community_stream.publish("issue", "reply", format_reply(message_doc, "issue", {}))
         return {"id": message_id, "status": "success"}
     except Exception as e:
         logging.error(f"Error creating reply message: {str(e)}")
@@ -588,85 +626,127 @@ async def create_reply_message(message: dict):
 @app.get("/community/messages/{tag}")
 async def get_messages(tag: str):
     try:
-        collection = general_collection if tag == "general" else issues_collection
+        collection = general_read_collection if tag == "general" else issues_read_collection
         messages = await collection.find({}).sort("created_at", 1).to_list(None)
+
+        # Replies for every issue in one query instead of one per issue
+        replies_by_issue = defaultdict(list)
+        if tag == "issue" and messages:
+            replies_cursor = replies_read_collection.find(
+                {"issue_id": {"$in": [str(msg["_id"]) for msg in messages]}}
+            ).sort("created_at", 1)
+            async for reply in replies_cursor:
+                replies_by_issue[reply["issue_id"]].append(reply)
+
+        # Authors are embedded in each post; only older posts need a profile lookup
+        fallback_authors = await resolve_missing_authors(
+            messages + [reply for replies in replies_by_issue.values() for reply in replies]
+        )
         
-        ist = pytz.timezone('Asia/Kolkata')
-        processed_messages = []
-        for msg in messages:
-            # Handle cases where user might not exist
-            user = await user_profile_collection.find_one({"uid": msg.get("uid")})
-            user_name = "Anonymous"
-            user_avatar = ""
-            
-            if user:
-                user_name = user.get("name", "Anonymous")
-                user_avatar = user.get("profilePicture", "")
-            
-            # Get replies for issues
-            replies = []
-            if tag == "issue":
-                replies_cursor = await replies_collection.find(
-                    {"issue_id": str(msg["_id"])}
-                ).sort("created_at", 1).to_list(None)
-                
-                for reply in replies_cursor:
-                    reply_user = await user_profile_collection.find_one({"uid": reply.get("uid")})
-                    reply_name = "Anonymous"
-                    reply_avatar = ""
-                    
-                    if reply_user:
-                        reply_name = reply_user.get("name", "Anonymous")
-                        reply_avatar = reply_user.get("profilePicture", "")
-                        
-                    replies.append({
-                        "id": str(reply["_id"]),
-                        "content": reply.get("description", ""),
-                        "userId": reply.get("uid", ""),
-                        "userName": reply_name,
-                        "userAvatar": reply_avatar,
-                        "timestamp": reply.get("created_at", datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S %Z')),
-                        "tag": tag
-                    })
-
-            processed_msg = {
-                "id": str(msg["_id"]),
-                "content": msg.get("description", ""),
-                "userId": msg.get("uid", ""),
-                "userName": user_name,
-                "userAvatar": user_avatar,
-                "timestamp": msg.get("created_at", datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S %Z')),
-                "tag": tag,
-                "replies": replies
-            }
-            processed_messages.append(processed_msg)
+        processed_messages = [
+            format_message(
+                msg,
+                tag,
+                fallback_authors,
+                replies=[format_reply(reply, tag, fallback_authors) for reply in replies_by_issue.get(str(msg["_id"]), [])]
+            )
+            for msg in messages
+        ]
         
-        return jsonable_encoder(processed_messages)
+        return FastJSONResponse(processed_messages)
     except Exception as e:
         logging.error(f"Error fetching {tag} messages: {str(e)}")
         return []  # Return empty list instead of raising error
 
-# Initialize the chatbot
-bot = None
+@app.get("/community/stream/{tag}")
+async def stream_messages(tag: str, request: Request, since: Optional[str] = None):
+    """Server-sent events for new messages and replies.
+
+    Load the thread once from /community/messages/{tag}, then pass the
+    newest id as ``since``; on reconnect the browser sends Last-Event-ID
+    and only posts created after it are replayed.
+    """
+    logging.info(f"Endpoint called: stream_messages() for tag: {tag}")
+    if tag not in COMMUNITY_TAGS:
+        raise HTTPException(status_code=404, detail="Unknown community tag")
+
+    cursor = request.headers.get("last-event-id") or since
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid since cursor")
+
+    return StreamingResponse(
+        community_stream.stream(tag, ObjectId(cursor) if cursor else None, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 class ChatMessage(BaseModel):
     message: str
     uid: str
+    session_id: Optional[str] = None
+
+def chat_session_id(chat_message: ChatMessage) -> str:
+    # Each conversation gets its own history; clients send the returned id back
+    return chat_message.session_id or uuid.uuid4().hex
 
 @app.post("/chat")
 async def chat_endpoint(chat_message: ChatMessage):
     try:
-        # Create new bot instance for each message to ensure fresh API key
-        bot = FRIDAY(chat_message.uid)
-        await bot.initialize()  # This will fetch the latest API key
-        response = await bot.get_response(chat_message.message)
-        return {"response": response}
+        # Reuse the pooled session so history and the model client carry over
+        bot = await chat_sessions.get_session(chat_message.uid)
+        session_id = chat_session_id(chat_message)
+        response = await bot.get_response(chat_message.message, session_id)
+        return {"response": response, "session_id": session_id}
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage, request: Request):
+    """Stream the bot reply as server-sent events while the model generates it."""
+    try:
+        bot = await chat_sessions.get_session(chat_message.uid)
+        session_id = chat_session_id(chat_message)
+        chunks = bot.stream_response(chat_message.message, session_id)
+        # Wait for the first chunk so admission and key errors still get a proper status
+        first_chunk = await anext(chunks, None)
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream():
+        try:
+            if first_chunk is not None:
+                yield f"data: {json.dumps({'text': first_chunk})}\n\n"
+            async for chunk in chunks:
+                if await request.is_disconnected():
+                    logging.info(f"Chat stream client disconnected for UID: {chat_message.uid}")
+                    return
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        except Exception as e:
+            logging.error(f"Error in chat stream: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Failed to generate response'})}\n\n"
+        finally:
+            # Closing the generator cancels the upstream model stream
+            await chunks.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/chat/metrics")
+async def chat_metrics():
+    logging.info("Endpoint called: chat_metrics()")
+    return {"response_cache": response_cache.stats(), "llm_limiter": llm_limiter.stats()}
+
 # Add these new endpoints before the shutdown event
 @app.post("/prompt-click")
 async def log_prompt_click(data: dict):
@@ -678,7 +758,8 @@ async def log_prompt_click(data: dict):
         if not uid or not prompt_name:
             raise HTTPException(status_code=400, detail="UID and promptName are required")
             
-        # Log the click (you can add more detailed logging if needed)
+        # Buffered in memory and flushed to the popularity counters in bulk
+        popularity.record("prompt", f"{uid}:{prompt_name}", "clicks", {"uid": uid, "prompt_name": prompt_name})
         logging.info(f"Prompt click logged - UID: {uid}, Prompt: {prompt_name}")
         
         return {"status": "success", "message": "Prompt click logged successfully"}
@@ -687,24 +768,67 @@ async def log_prompt_click(data: dict):
         logging.error(f"Error logging prompt click: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Datasets recently seen to exist, so repeated download pings skip the lookup
+_live_dataset_ids = TTLCache(maxsize=10000, ttl=300)
+
+async def is_live_dataset(dataset_id: str) -> bool:
+    if dataset_id in _live_dataset_ids:
+        return True
+    found = await datasets_read_collection.find_one({"_id": ObjectId(dataset_id), **ACTIVE_DATASETS}, {"_id": 1})
+    if found is not None:
+        _live_dataset_ids[dataset_id] = True
+    return found is not None
+
+@app.post("/dataset-download")
+async def log_dataset_download(data: dict):
+    logging.info(f"Endpoint called: log_dataset_download() for dataset: {data.get('datasetId')}")
+    dataset_id = data.get('datasetId')
+    if not dataset_id or not ObjectId.is_valid(dataset_id):
+        raise HTTPException(status_code=400, detail="A valid datasetId is required")
+    # Counters are upserted, so only count datasets that exist
+    if not await is_live_dataset(dataset_id):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    # Buffered in memory and flushed to the popularity counters in bulk
+    popularity.record("dataset", dataset_id, "downloads")
+    return {"status": "success", "message": "Download logged successfully"}
+
+@app.get("/trending")
+async def get_trending(kind: str = "dataset", limit: int = 20):
+    logging.info(f"Endpoint called: get_trending() for kind: {kind}")
+    if kind not in ("dataset", "prompt"):
+        raise HTTPException(status_code=400, detail="kind must be 'dataset' or 'prompt'")
+    try:
+        items = await popularity.trending(kind, min(max(limit, 1), 100))
+        return FastJSONResponse({"kind": kind, "items": items})
+    except Exception as e:
+        logging.error(f"Error fetching trending {kind}s: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/prompts/{username}/{prompt_name}")
-async def get_prompt_details(username: str, prompt_name: str):
+async def get_prompt_details(username: str, prompt_name: str, request: Request):
     try:
         # Find the prompt in the prompts collection
-        prompt = await prompts_collection.find_one({"username": username, "prompt_name": prompt_name})
+        prompt = await prompts_read_collection.find_one({"username": username, "prompt_name": prompt_name})
         
         if not prompt:
             raise HTTPException(status_code=404, detail="Prompt not found")
+
+        etag = make_etag("prompt", prompt["_id"], prompt.get("createdAt"), prompt.get("updatedAt"))
+        if etag_matches(request, etag):
+            return not_modified(etag)
             
-        return {
+        return FastJSONResponse({
             "prompt_name": prompt.get("prompt_name"),
             "domain": prompt.get("domain", "General"),
             "prompt_content": prompt.get("prompt"),
             "username": prompt.get("username"),  # Make sure username is included
             "created_at": prompt.get("createdAt", ""),
             "updated_at": prompt.get("updatedAt", "")
-        }
+        }, headers=etag_headers(etag))
         
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logging.error(f"Error fetching prompt details: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -713,13 +837,8 @@ async def get_prompt_details(username: str, prompt_name: str):
 async def get_prompts():
     try:
         # Fetch all prompts from the prompts collection
-        prompts = await prompts_collection.find({}).to_list(None)
-        
-        # Convert ObjectIds to strings for JSON serialization
-        for prompt in prompts:
-            prompt["_id"] = str(prompt["_id"])
-            
-        return prompts
+        prompts = await prompts_read_collection.find({}).to_list(None)
+        return FastJSONResponse(prompts)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -730,10 +849,12 @@ async def delete_prompt(prompt_id: str):
         prompt_obj_id = ObjectId(prompt_id)
         
         # Find and delete the prompt
-        result = await prompts_collection.delete_one({"_id": prompt_obj_id})
+        deleted = await prompts_collection.find_one_and_delete({"_id": prompt_obj_id}, projection={"username": 1})
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Prompt not found")
+
+        await touch_user_profile({"username": deleted.get("username")})
             
         return {"message": "Prompt deleted successfully"}
         
@@ -743,12 +864,6 @@ async def delete_prompt(prompt_id: str):
         logging.error(f"Error deleting prompt: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    logging.info("Operation: shutdown_db_client()")
-    await close_db_client()
-
 class ApiKeyRequest(BaseModel):
     uid: str
     api_key: str
@@ -759,6 +874,7 @@ async def save_api_key(request: ApiKeyRequest):
     try:
         success = await mongodb.save_api_key(request.uid, request.api_key)
         if success:
+            chat_sessions.invalidate(request.uid)
             return {"message": "API key saved successfully"}
         raise HTTPException(status_code=404, detail="User not found")
     except Exception as e:
@@ -777,12 +893,12 @@ async def check_api_key(uid: str):
 @app.post("/prompts")
 async def create_prompt(prompt: Prompts):
     try:
-        ist = pytz.timezone('Asia/Kolkata')
         prompt_doc = {
             **prompt.dict(),
-            "createdAt": datetime.now(ist).strftime('%m-%d-%Y')
+            "createdAt": datetime.now(timezone.utc)
         }
         result = await prompts_collection.insert_one(prompt_doc)
+        await touch_user_profile({"username": prompt.username})
         return {
             "id": str(result.inserted_id),
             "message": "Prompt saved successfully"
@@ -803,7 +919,8 @@ async def health_check():
         db_error = None
         try:
             # Ping MongoDB to verify connection
-            await mongodb.mongo_client.admin.command('ping')
+            await mongodb.get_client().admin.command('ping')
+            await mongodb.get_read_client().admin.command('ping')
         except Exception as e:
             db_status = "unhealthy"
             db_error = str(e)
@@ -813,8 +930,7 @@ async def health_check():
         storage_error = None
         try:
             # List containers to verify connection
-            from src.utils.azure_storage import blob_service_client
-            containers = list(blob_service_client.list_containers(max_results=1))
+            containers = list(get_blob_service_client().list_containers(max_results=1))
         except Exception as e:
             storage_status = "unhealthy"
             storage_error = str(e)
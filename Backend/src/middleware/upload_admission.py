@@ -0,0 +1,73 @@
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import List
+from src.utils.upload_admission import UploadAdmission, UploadRejectedError
+
+class UploadAdmissionMiddleware:
+    """Reserves an upload's size from the byte budget before its body is read.
+
+    Chunked uploads, sent without Content-Length, reserve the largest allowed
+    upload and are answered with 413 as soon as they send more than that.
+    """
+
+    def __init__(self, app: ASGIApp, admission: UploadAdmission, paths: List[str]):
+        self.app = app
+        self.admission = admission
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and not content_length.isdigit():
+            return await JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})(scope, receive, send)
+
+        size = int(content_length) if content_length is not None else self.admission.max_request_bytes
+        try:
+            await self.admission.reserve(size)
+        except UploadRejectedError as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"detail": e.detail},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            return await response(scope, receive, send)
+
+        received = 0
+        response_started = False
+        too_large = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, too_large
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > size:
+                    too_large = True
+                    if not response_started:
+                        await JSONResponse(
+                            status_code=413,
+                            content={"detail": f"Upload exceeds the {size} byte limit"}
+                        )(scope, receive, send)
+                    # Stop the endpoint reading; whatever it answers now is dropped
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if too_large:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The endpoint failing on the cut-off body is expected; the 413 is already sent
+            if not too_large:
+                raise
+        finally:
+            await self.admission.release(size)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 
 class General(BaseModel):
@@ -5,14 +6,14 @@ class General(BaseModel):
     title: str
     description: str
     uid: str
-    created_at: str
+    created_at: datetime
 
 class Issue(BaseModel):
     # Remove id since MongoDB will generate it
     title: str
     description: str
     uid: str
-    created_at: str
+    created_at: datetime
 
 class IssueReply(BaseModel):
     # Remove id since MongoDB will generate it
@@ -20,4 +21,4 @@ class IssueReply(BaseModel):
     title: str
     description: str
     uid: str
-    created_at: str
\ No newline at end of file
+    created_at: datetime
\ No newline at end of file
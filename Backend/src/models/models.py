@@ -41,6 +41,7 @@ class UploadResponse(BaseModel):
     success: bool
     message: str
     files: List[str]
+    job_id: Optional[str] = None
 
 class SettingProfile(BaseModel):
     uid: str
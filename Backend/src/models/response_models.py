@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+from typing_extensions import TypedDict
+
+# Output shapes for the hottest read endpoints. They are built straight from
+# Mongo documents and encoded by orjson; nothing is validated on the way out.
+# Timestamps may still be strings on documents the migration has not reached.
+Timestamp = Union[datetime, str, None]
+
+class DatasetSummary(TypedDict):
+    id: str
+    name: str
+    description: str
+    upload_type: str
+    updatedAt: Timestamp
+    timestamp: Timestamp
+
+class PromptSummary(TypedDict):
+    id: str
+    name: str
+    description: str
+    domain: str
+    prompt: str
+    createdAt: Timestamp
+    updatedAt: Timestamp
+
+class DatasetFiles(TypedDict):
+    raw: List[str]
+    vectorized: List[str]
+
+class DatasetPayload(TypedDict):
+    _id: str
+    dataset_id: Optional[str]
+    dataset_info: Dict[str, Any]
+    upload_type: Optional[str]
+    timestamp: Timestamp
+    files: DatasetFiles
+    uid: Optional[str]
+
+class CommunityReply(TypedDict):
+    id: str
+    issueId: Optional[str]
+    content: str
+    userId: Optional[str]
+    userName: str
+    userAvatar: str
+    timestamp: Timestamp
+    tag: str
+
+class CommunityMessage(TypedDict):
+    id: str
+    content: str
+    userId: Optional[str]
+    userName: str
+    userAvatar: str
+    timestamp: Timestamp
+    tag: str
+    replies: List[CommunityReply]
+
+DATASET_SUMMARY_PROJECTION = {
+    "dataset_info.name": 1,
+    "dataset_info.description": 1,
+    "upload_type": 1,
+    "timestamp": 1
+}
+PROMPT_SUMMARY_PROJECTION = {
+    "prompt_name": 1,
+    "description": 1,
+    "domain": 1,
+    "prompt": 1,
+    "createdAt": 1,
+    "updatedAt": 1
+}
+# Fields of DatasetInfo returned by /dataset-click, with their defaults
+DATASET_INFO_FIELDS = {
+    "name": None,
+    "description": None,
+    "datasetId": None,
+    "domain": None,
+    "license": None,
+    "file_type": None,
+    "dimensions": None,
+    "vector_database": None,
+    "model_name": None,
+    "username": None,
+    "isEdit": False
+}
+
+def dataset_summary(dataset: dict) -> DatasetSummary:
+    info = dataset.get("dataset_info", {})
+    return {
+        "id": str(dataset["_id"]),
+        "name": info.get("name", "Untitled"),
+        "description": info.get("description", ""),
+        "upload_type": dataset.get("upload_type", "unknown"),
+        "updatedAt": dataset.get("timestamp", ""),
+        "timestamp": dataset.get("timestamp", "")
+    }
+
+def prompt_summary(prompt: dict) -> PromptSummary:
+    return {
+        "id": str(prompt["_id"]),
+        "name": prompt.get("prompt_name", "Untitled"),
+        "description": prompt.get("description", ""),
+        "domain": prompt.get("domain", "General"),
+        "prompt": prompt.get("prompt", ""),
+        "createdAt": prompt.get("createdAt", ""),
+        "updatedAt": prompt.get("updatedAt", prompt.get("createdAt", ""))
+    }
+
+def dataset_payload(dataset: dict, username: str) -> DatasetPayload:
+    """The public view of a dataset: the same fields DatasetSchema exposed, without re-validating stored URLs."""
+    info = dataset.get("dataset_info", {})
+    files = dataset.get("files") or {}
+    return {
+        "_id": str(dataset["_id"]),
+        "dataset_id": dataset.get("dataset_id"),
+        "dataset_info": {
+            **{field: info.get(field, default) for field, default in DATASET_INFO_FIELDS.items()},
+            "username": info.get("username") or username
+        },
+        "upload_type": dataset.get("upload_type"),
+        "timestamp": dataset.get("timestamp"),
+        "files": {
+            "raw": files.get("raw") or [],
+            "vectorized": files.get("vectorized") or []
+        },
+        "uid": dataset.get("uid")
+    }
@@ -0,0 +1,115 @@
+import re
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Response
+from src.config import settings
+from src.utils.logger import logging
+from src.database.mongodb import datasets_collection, ACTIVE_DATASETS
+from src.utils.azure_storage import blob_name_from_url, generate_download_url
+from src.utils.content_store import content_store
+from src.utils.popularity import popularity
+
+router = APIRouter()
+
+FILE_TYPES = ("raw", "vectorized")
+
+async def _find_dataset(username: str, dataset_name: str, file_type: str, projection: dict) -> Optional[dict]:
+    if file_type not in FILE_TYPES:
+        raise HTTPException(status_code=400, detail="file_type must be 'raw' or 'vectorized'")
+    # Datasets saved before storage_name existed are matched by their blob path
+    return await datasets_collection.find_one(
+        {
+            "dataset_info.username": username,
+            **ACTIVE_DATASETS,
+            "$or": [
+                {"storage_name": dataset_name},
+                {f"files.{file_type}": {"$regex": f"/{re.escape(username)}/{re.escape(dataset_name)}/"}}
+            ]
+        },
+        projection,
+        sort=[("timestamp", -1)]
+    )
+
+def _cache_grant(response: Response, expires_at: datetime) -> None:
+    # The grant itself may be reused by this client until shortly before it expires
+    remaining = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    response.headers["Cache-Control"] = f"private, max-age={max(remaining - 60, 0)}"
+
+@router.get("/datasets/{username}/{dataset_name}/{file_type}/download")
+async def get_download_grant(username: str, dataset_name: str, file_type: str, response: Response):
+    """Hand out a short-lived, read-only URL so clients fetch the archive straight from blob storage."""
+    logging.info(f"Endpoint called: get_download_grant() for {username}/{dataset_name}/{file_type}")
+    try:
+        dataset = await _find_dataset(
+            username, dataset_name, file_type,
+            {"_id": 1, f"files.{file_type}": 1, f"checksums.{file_type}": 1}
+        )
+        urls = (dataset or {}).get("files", {}).get(file_type) or []
+        if not urls:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        blob_name = blob_name_from_url(urls[-1])
+        url, expires_at = generate_download_url(blob_name, settings.DOWNLOAD_URL_TTL)
+        popularity.record("dataset", str(dataset["_id"]), "downloads")
+
+        _cache_grant(response, expires_at)
+        # Datasets uploaded before checksums were recorded have none to verify against
+        checksums = dataset.get("checksums", {}).get(file_type, {})
+        return {
+            "url": url,
+            "expires_at": expires_at.isoformat(),
+            "blob": blob_name,
+            "dataset_id": str(dataset["_id"]),
+            "sha256": checksums.get("archive", {}).get("sha256"),
+            "size": checksums.get("archive", {}).get("size"),
+            "files": checksums.get("files", [])
+        }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logging.error(f"Error issuing download grant: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/datasets/{username}/{dataset_name}/{file_type}/shards")
+async def get_shard_manifest(username: str, dataset_name: str, file_type: str, response: Response):
+    """The dataset's shard layout, for parallel and partial downloads.
+
+    Each shard segment carries a short-lived URL to its file's blob and is
+    fetched as the HTTP range ``[offset, offset + size)`` of it. File sets stored only as one archive come back with no shards; clients
+    then fall back to the /download grant.
+    """
+    logging.info(f"Endpoint called: get_shard_manifest() for {username}/{dataset_name}/{file_type}")
+    try:
+        dataset = await _find_dataset(username, dataset_name, file_type, {"_id": 1, f"manifests.{file_type}": 1, f"files.{file_type}": 1})
+        if not dataset or not dataset.get("files", {}).get(file_type):
+            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        manifest_id = dataset.get("manifests", {}).get(file_type)
+        manifest = await content_store.get_manifest(manifest_id) if manifest_id else None
+        shards = []
+        expires_at = None
+        if manifest and manifest.get("shards"):
+            # Shards are ranges of the stored files, so each segment points at its file's blob
+            member_urls = {}
+            for path, blob_name in (await content_store.member_blobs(manifest)).items():
+                member_urls[path], expires_at = generate_download_url(blob_name, settings.DOWNLOAD_URL_TTL)
+            for shard in manifest["shards"]:
+                segments = [{**segment, "url": member_urls[segment["path"]]} for segment in shard["files"]]
+                shards.append({**shard, "files": segments})
+        if shards:
+            popularity.record("dataset", str(dataset["_id"]), "downloads")
+            _cache_grant(response, expires_at)
+
+        return {
+            "dataset_id": str(dataset["_id"]),
+            "manifest_id": manifest_id,
+            "expires_at": expires_at.isoformat() if expires_at else None,
+            "total_size": (manifest or {}).get("total_size"),
+            "files": (manifest or {}).get("files", []),
+            "shards": shards
+        }
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logging.error(f"Error issuing shard manifest: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException
+from src.utils.logger import logging
+from src.utils.jobs import jobs
+from src.utils.serialization import FastJSONResponse
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    logging.info(f"Endpoint called: get_job_status() for job: {job_id}")
+    try:
+        job = await jobs.get(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        return FastJSONResponse({
+            "job_id": str(job["_id"]),
+            "kind": job["kind"],
+            "status": job["status"],
+            "attempts": job.get("attempts", 0),
+            "error": job.get("error"),
+            "result": job.get("result"),
+            "created_at": job.get("created_at"),
+            "updated_at": job.get("updated_at"),
+            "finished_at": job.get("finished_at")
+        })
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logging.error(f"Error fetching job status: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, Optional
+from cachetools import TTLCache
+from src.config import settings
+from src.utils.logger import logging
+from src.database.mongodb import datasets_read_collection, ACTIVE_DATASETS
+from src.utils.serialization import FastJSONResponse
+
+router = APIRouter()
+
+# Fields returned for each hit; full file listings stay out of search results
+SEARCH_PROJECTION = {
+    "dataset_id": 1,
+    "dataset_info": 1,
+    "upload_type": 1,
+    "timestamp": 1,
+    "uid": 1
+}
+
+FACET_FIELDS = ["file_type", "domain", "vector_database", "model_name"]
+
+# Totals and facet counts scan every match, so they are shared across pages and requests
+_facet_cache = TTLCache(maxsize=settings.SEARCH_FACET_CACHE_SIZE, ttl=settings.SEARCH_FACET_CACHE_TTL)
+_facet_pending: Dict[str, asyncio.Future] = {}
+
+def _facet_stage(field: str, limit: int = 20) -> list:
+    return [
+        {"$group": {"_id": f"$dataset_info.{field}", "count": {"$sum": 1}}},
+        {"$match": {"_id": {"$nin": [None, ""]}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit}
+    ]
+
+async def _compute_facets(match: dict) -> dict:
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            **{field: _facet_stage(field) for field in FACET_FIELDS}
+        }}
+    ]
+    result = (await datasets_read_collection.aggregate(pipeline, allowDiskUse=True).to_list(1))[0]
+    return {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "facets": {
+            field: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result[field]]
+            for field in FACET_FIELDS
+        }
+    }
+
+async def facet_counts(match: dict) -> dict:
+    """Total and facet counts for ``match``, computed at most once per cache TTL."""
+    key = json.dumps(match, sort_keys=True, default=str)
+    cached = _facet_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Concurrent requests for the same query wait on one aggregation
+    pending = _facet_pending.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_compute_facets(match))
+        _facet_pending[key] = pending
+        pending.add_done_callback(lambda _: _facet_pending.pop(key, None))
+    counts = await asyncio.shield(pending)
+    _facet_cache[key] = counts
+    return counts
+
+@router.get("/datasets/search")
+async def search_datasets(
+    q: Optional[str] = Query(None, max_length=200),
+    file_type: Optional[str] = None,
+    domain: Optional[str] = None,
+    vector_database: Optional[str] = None,
+    model_name: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    logging.info(f"Endpoint called: search_datasets() with q: {q}, page: {page}")
+    try:
+        match = dict(ACTIVE_DATASETS)
+        if q and q.strip():
+            match["$text"] = {"$search": q.strip()}
+        filters = {
+            "file_type": file_type,
+            "domain": domain,
+            "vector_database": vector_database,
+            "model_name": model_name
+        }
+        for field, value in filters.items():
+            if value:
+                match[f"dataset_info.{field}"] = value
+
+        # A plain find, so the (timestamp) and (facet, timestamp) indexes serve sort, skip and limit
+        if "$text" in match:
+            projection = {**SEARCH_PROJECTION, "score": {"$meta": "textScore"}}
+            sort = [("score", {"$meta": "textScore"}), ("timestamp", -1)]
+        else:
+            projection = SEARCH_PROJECTION
+            sort = [("timestamp", -1)]
+        cursor = datasets_read_collection.find(match, projection).sort(sort).skip((page - 1) * page_size).limit(page_size)
+
+        results, counts = await asyncio.gather(cursor.to_list(page_size), facet_counts(match))
+
+        return FastJSONResponse({
+            "results": results,
+            "total": counts["total"],
+            "page": page,
+            "page_size": page_size,
+            "facets": counts["facets"]
+        })
+    except Exception as e:
+        logging.error(f"Error in search_datasets: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
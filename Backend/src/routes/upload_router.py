@@ -1,25 +1,37 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import List
+from typing import List, Optional
 import os
 import json
+import shutil
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from src.utils.logger import logging
 from src.models.models import DatasetInfo, DatasetEditInfo, UploadResponse
-from src.utils.file_handlers import ensure_directories, save_uploaded_file
+from src.utils.file_handlers import ensure_directories, save_uploaded_file, SPOOL_DIR
 from src.database.mongodb import (
-    save_metadata_and_update_user,
+    save_metadata,
+    count_user_upload,
     user_profile_collection,
-    datasets_collection
+    datasets_collection,
+    ACTIVE_DATASETS,
+    touch_user_profile
 )
-from src.utils.azure_storage import upload_to_blob, delete_dataset_blobs, create_and_upload_zip
+from src.utils.azure_storage import upload_to_blob, delete_blobs, blob_name_from_url
+from src.utils.content_store import content_store, is_content_addressed, manifest_checksums
+from src.utils.dataset_feeds import dataset_feeds
+from src.utils.jobs import jobs
+from src.utils.upload_admission import upload_admission, UploadRejectedError
+from src.utils.dataset_gc import tombstone_dataset
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
 
 router = APIRouter()
 
+MAX_VERSION_HISTORY = 20
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_files(
     files: List[UploadFile] = File(None),
@@ -59,48 +71,158 @@ async def upload_files(
         dataset_id = dataset_info_dict.get("datasetId") or str(uuid.uuid4())
         dataset_name = dataset_info_dict["name"].replace(" ", "_").lower()
 
-        uploaded_files = {"raw": [], "vectorized": []}
-
         # Handle file uploads based on type
+        file_sets = {}
         if type.lower() == "both":
             if raw_files:
-                raw_url = await create_and_upload_zip(raw_files, username, dataset_name, "raw")
-                uploaded_files["raw"].append(raw_url)
-
+                file_sets["raw"] = raw_files
             if vectorized_files:
-                vec_url = await create_and_upload_zip(vectorized_files, username, dataset_name, "vectorized")
-                uploaded_files["vectorized"].append(vec_url)
-        else:
-            if files:
-                url = await create_and_upload_zip(files, username, dataset_name, type.lower())
-                uploaded_files[type.lower()].append(url)
-
-        # Prepare metadata
-        metadata = {
-            "dataset_id": dataset_id,
-            "dataset_info": dataset_info_dict,
-            "upload_type": type.lower(),
-            "timestamp": datetime.now().isoformat(),
-            "files": uploaded_files,
-            "uid": uid
-        }
+                file_sets["vectorized"] = vectorized_files
+        elif files:
+            file_sets[type.lower()] = files
+
+        # Spool to disk and answer right away; storing and indexing runs as a job
+        job_id = ObjectId()
+        spool_dir = os.path.join(SPOOL_DIR, str(job_id))
+        spooled = {}
+        async with upload_admission.user_slot(uid):
+            for file_type, file_set in file_sets.items():
+                type_dir = os.path.join(spool_dir, file_type)
+                os.makedirs(type_dir, exist_ok=True)
+                spooled[file_type] = await content_store.spool(file_set, type_dir, durable=True)
 
-        # Save metadata and update user profile
-        await save_metadata_and_update_user(metadata)
+            # Prepare metadata
+            metadata = {
+                "dataset_id": dataset_id,
+                "dataset_info": dataset_info_dict,
+                "upload_type": type.lower(),
+                "timestamp": datetime.now(timezone.utc),
+                "storage_name": dataset_name,
+                "uid": uid
+            }
+
+            await jobs.enqueue(
+                "dataset_upload",
+                {
+                    "dataset_object_id": ObjectId(),
+                    "metadata": metadata,
+                    "spool_dir": spool_dir,
+                    "spool_bytes": sum(entry["size"] for entries in spooled.values() for entry in entries),
+                    "file_sets": spooled
+                },
+                uid=uid,
+                job_id=job_id
+            )
 
-        all_files = uploaded_files.get("raw", []) + uploaded_files.get("vectorized", [])
         return UploadResponse(
             success=True,
-            message=f"Successfully uploaded dataset {dataset_id}",
-            files=all_files
+            message=f"Received dataset {dataset_id}, processing in the background",
+            files=[],
+            job_id=str(job_id)
         )
 
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logging.error(f"Upload error: {str(e)}")
-        if 'dataset_name' in locals() and 'username' in locals():
-            await delete_dataset_blobs(dataset_name, username)
+        if locals().get("spool_dir"):
+            shutil.rmtree(spool_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def process_upload(job: dict) -> dict:
+    """Store spooled files content-addressed, then save and publish the dataset."""
+    payload = job["payload"]
+    metadata = payload["metadata"]
+
+    # Manifests stored by an earlier attempt are recorded in the job and reused
+    stored = dict(job.get("progress", {}).get("manifests", {}))
+    for file_type, entries in payload["file_sets"].items():
+        if file_type in stored:
+            continue
+        manifest = await content_store.store_entries(entries, os.path.join(payload["spool_dir"], file_type))
+        stored[file_type] = {
+            "id": manifest["_id"],
+            "url": manifest["archive"]["url"],
+            "checksums": manifest_checksums(manifest)
+        }
+        await jobs.checkpoint(job, manifests=stored)
+
+    uploaded_files = {"raw": [], "vectorized": []}
+    for file_type, manifest in stored.items():
+        uploaded_files[file_type].append(manifest["url"])
+
+    metadata["_id"] = payload["dataset_object_id"]
+    metadata["files"] = uploaded_files
+    metadata["manifests"] = {file_type: manifest["id"] for file_type, manifest in stored.items()}
+    metadata["checksums"] = {file_type: manifest["checksums"] for file_type, manifest in stored.items()}
+
+    # Each step is checkpointed, and each is safe to repeat if the process dies before its checkpoint
+    progress = job.get("progress", {})
+    if not progress.get("saved"):
+        try:
+            await save_metadata(metadata)
+        except DuplicateKeyError:
+            logging.info(f"Dataset {metadata['_id']} was already saved by an earlier attempt")
+        await jobs.checkpoint(job, saved=True)
+    if not progress.get("counted"):
+        await count_user_upload(metadata)
+        await jobs.checkpoint(job, counted=True)
+    if not progress.get("published"):
+        await dataset_feeds.publish(metadata)
+        await jobs.checkpoint(job, published=True)
+
+    shutil.rmtree(payload["spool_dir"], ignore_errors=True)
+    return {
+        "dataset_id": str(metadata["_id"]),
+        "files": uploaded_files.get("raw", []) + uploaded_files.get("vectorized", [])
+    }
+
+async def discard_upload(job: dict) -> None:
+    for manifest in job.get("progress", {}).get("manifests", {}).values():
+        await content_store.release(manifest["id"])
+    shutil.rmtree(job["payload"]["spool_dir"], ignore_errors=True)
+
+jobs.register("dataset_upload", process_upload, on_failure=discard_upload)
+
+def edit_update(dataset: dict, file_type: str, storage_name: str, stored: Optional[dict] = None, changes: Optional[dict] = None) -> dict:
+    """The dataset update for an edit; with ``stored`` it replaces the files of ``file_type``."""
+    uploaded_files = {"raw": [], "vectorized": [], **dataset.get("files", {})}
+    manifests = dict(dataset.get("manifests", {}))
+    if stored:
+        uploaded_files[file_type] = [stored["url"]]  # This replaces existing files of this type
+        manifests[file_type] = stored["id"]
+
+    # Determine upload_type based on available files
+    has_raw = bool(uploaded_files.get("raw"))
+    has_vectorized = bool(uploaded_files.get("vectorized"))
+    upload_type = "both" if has_raw and has_vectorized else (
+        "raw" if has_raw else "vectorized" if has_vectorized else file_type
+    )
+
+    update = {"$set": {
+        "files": uploaded_files,
+        "upload_type": upload_type,
+        "manifests": manifests,
+        "storage_name": storage_name,
+        "timestamp": datetime.now(timezone.utc)
+    }}
+    if stored:
+        update["$set"][f"checksums.{file_type}"] = stored["checksums"]
+        # Keep a short history of which manifest each version pointed at
+        update["$inc"] = {"version": 1}
+        update["$push"] = {"versions": {
+            "$each": [{
+                "file_type": file_type,
+                "manifest_id": stored["id"],
+                "changes": changes,
+                "created_at": datetime.now(timezone.utc)
+            }],
+            "$slice": -MAX_VERSION_HISTORY
+        }}
+    return update
+
 @router.post("/upload/edit", response_model=UploadResponse)
 async def edit_dataset_files(
     files: List[UploadFile] = File(None),
@@ -108,7 +230,8 @@ async def edit_dataset_files(
     vectorized_files: List[UploadFile] = File(None),
     type: str = Form(...),
     datasetInfo: str = Form(...),
-    uid: str = Form(...)
+    uid: str = Form(...),
+    manifest: Optional[str] = Form(None)
 ):
     try:
         # Validate user
@@ -125,93 +248,185 @@ async def edit_dataset_files(
 
         # Parse dataset info for edit
         dataset_info = DatasetEditInfo.parse_raw(datasetInfo)
-        dataset_info_dict = dataset_info.dict(exclude_none=True)
-
         dataset_name = dataset_info.name.replace(" ", "_").lower()
-        uploaded_files = {"raw": [], "vectorized": []}
 
         # Get existing dataset
         existing_dataset = await datasets_collection.find_one(
-            {"_id": ObjectId(dataset_info.datasetId)}
+            {"_id": ObjectId(dataset_info.datasetId), **ACTIVE_DATASETS}
         )
         if not existing_dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
 
-        # Preserve existing files
-        uploaded_files = existing_dataset.get("files", {"raw": [], "vectorized": []})
-        
-        # Ensure uploaded_files has both raw and vectorized keys
-        if "raw" not in uploaded_files:
-            uploaded_files["raw"] = []
-        if "vectorized" not in uploaded_files:
-            uploaded_files["vectorized"] = []
+        # With a manifest only new or changed files are sent; the rest is reused server-side
+        file_manifest = None
+        if manifest is not None:
+            if type not in ("raw", "vectorized"):
+                raise HTTPException(status_code=400, detail="Delta edits need type 'raw' or 'vectorized'")
+            try:
+                file_manifest = json.loads(manifest)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="manifest must be valid JSON")
 
-        try:
-            # Handle file uploads based on type
-            if type == "raw" and raw_files:
-                raw_url = await create_and_upload_zip(raw_files, username, dataset_name, "raw")
-                uploaded_files["raw"] = [raw_url]  # This replaces existing raw files
-            elif type == "vectorized" and vectorized_files:
-                vec_url = await create_and_upload_zip(vectorized_files, username, dataset_name, "vectorized")
-                uploaded_files["vectorized"] = [vec_url]  # This replaces existing vectorized files
-
-            # Determine upload_type based on available files
-            has_raw = bool(uploaded_files.get("raw"))
-            has_vectorized = bool(uploaded_files.get("vectorized"))
-            
-            # Update the upload_type to reflect the correct dataset type
-            upload_type = "both" if has_raw and has_vectorized else (
-                "raw" if has_raw else "vectorized" if has_vectorized else type
-            )
-
-            # Update dataset
+        edited_files = raw_files if type == "raw" else vectorized_files if type == "vectorized" else None
+        if file_manifest is None and not edited_files:
+            # Nothing to store; only the dataset fields change
             result = await datasets_collection.update_one(
-                {"_id": ObjectId(dataset_info.datasetId)},
-                {"$set": {
-                    "files": uploaded_files,
-                    "upload_type": upload_type,
-                    "timestamp": datetime.now().isoformat()
-                }}
+                {"_id": existing_dataset["_id"], **ACTIVE_DATASETS},
+                edit_update(existing_dataset, type, dataset_name)
             )
-
+            if result.matched_count == 0:
+                raise HTTPException(status_code=404, detail="Dataset not found")
+            await touch_user_profile({"uid": existing_dataset.get("uid")})
+            await dataset_feeds.refresh(existing_dataset.get("dataset_info", {}).get("file_type"))
             return UploadResponse(
                 success=True,
-                message=f"Successfully updated dataset files",
-                files=uploaded_files.get(type, [])
+                message="Successfully updated dataset",
+                files=existing_dataset.get("files", {}).get(type, [])
             )
 
-        except Exception as upload_error:
-            logging.error(f"Upload error: {str(upload_error)}")
-            await delete_dataset_blobs(dataset_name, username)
-            raise upload_error
+        # Spool to disk and answer right away; storing the files and rebuilding the archive runs as a job
+        job_id = ObjectId()
+        spool_dir = os.path.join(SPOOL_DIR, str(job_id))
+        os.makedirs(spool_dir, exist_ok=True)
+        delta_stats = None
+        async with upload_admission.user_slot(uid):
+            if file_manifest is not None:
+                try:
+                    entries, delta_stats = await content_store.spool_delta(file_manifest, edited_files or [], spool_dir)
+                except ValueError as ve:
+                    raise HTTPException(status_code=400, detail=str(ve))
+            else:
+                entries = await content_store.spool(edited_files, spool_dir, durable=True)
 
+            enqueued = await jobs.enqueue(
+                "dataset_edit",
+                {
+                    "dataset_object_id": existing_dataset["_id"],
+                    "file_type": type,
+                    "storage_name": dataset_name,
+                    "feed_file_type": existing_dataset.get("dataset_info", {}).get("file_type"),
+                    "spool_dir": spool_dir,
+                    "spool_bytes": sum(entry["size"] for entry in entries if "local" in entry),
+                    "entries": entries,
+                    "changes": delta_stats
+                },
+                uid=uid,
+                job_id=job_id
+            )
+
+        message = f"Received files for dataset {dataset_info.datasetId}, processing in the background"
+        if delta_stats:
+            message += f" ({delta_stats['uploaded']} uploaded, {delta_stats['reused']} reused)"
+        return UploadResponse(success=True, message=message, files=[], job_id=str(job_id))
+
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logging.error(f"Error in edit_dataset_files: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # The job owns the spool once it is enqueued
+        if locals().get("spool_dir") and not locals().get("enqueued"):
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+async def process_edit(job: dict) -> dict:
+    """Store an edited file set, then point the dataset at it and release the one it replaces."""
+    payload = job["payload"]
+    file_type = payload["file_type"]
+    dataset_id = payload["dataset_object_id"]
+    progress = job.setdefault("progress", {})
+
+    stored = progress.get("manifest")
+    if stored is None:
+        manifest = await content_store.store_delta(payload["entries"], payload["spool_dir"])
+        stored = {"id": manifest["_id"], "url": manifest["archive"]["url"], "checksums": manifest_checksums(manifest)}
+        await jobs.checkpoint(job, manifest=stored)
+
+    if not progress.get("applied"):
+        dataset = await datasets_collection.find_one({"_id": dataset_id, **ACTIVE_DATASETS})
+        if dataset is None:
+            raise LookupError("Dataset was deleted before the edit could be applied")
+        current = dataset.get("manifests", {}).get(file_type)
+        # A rerun after the update finds the new manifest in place and keeps the recorded predecessor
+        if "superseded" not in progress or current != stored["id"]:
+            await jobs.checkpoint(job, superseded={"manifest_id": current, "urls": dataset.get("files", {}).get(file_type, [])})
+            # Only replace the manifest read above, so concurrent edits cannot release each other's content
+            result = await datasets_collection.update_one(
+                {"_id": dataset_id, **ACTIVE_DATASETS, f"manifests.{file_type}": current},
+                edit_update(dataset, file_type, payload["storage_name"], stored, payload.get("changes"))
+            )
+            if result.matched_count == 0:
+                raise RuntimeError("Dataset changed while the edit was being stored")
+        await jobs.checkpoint(job, applied=True)
+
+    superseded = progress["superseded"]
+    if not progress.get("released"):
+        # Re-uploading identical content took a second reference, which this drops again
+        await content_store.release(superseded["manifest_id"])
+        await jobs.checkpoint(job, released=True)
+        await touch_user_profile({"uid": job.get("uid")})
+        # Archives written before content addressing are owned by this dataset alone
+        await delete_blobs([url for url in superseded["urls"] if not is_content_addressed(blob_name_from_url(url))])
+        await dataset_feeds.refresh(payload.get("feed_file_type"))
+
+    shutil.rmtree(payload["spool_dir"], ignore_errors=True)
+    return {"dataset_id": str(dataset_id), "files": [stored["url"]], "changes": payload.get("changes")}
+
+async def discard_edit(job: dict) -> None:
+    progress = job.get("progress", {})
+    if progress.get("manifest") and not progress.get("applied"):
+        await content_store.release(progress["manifest"]["id"])
+    shutil.rmtree(job["payload"]["spool_dir"], ignore_errors=True)
+
+jobs.register("dataset_edit", process_edit, on_failure=discard_edit)
 
 @router.delete("/datasets/{dataset_id}")
 async def delete_dataset(dataset_id: str):
     try:
-        # Get dataset info to fetch username and dataset name
-        dataset = await datasets_collection.find_one({"dataset_id": dataset_id})
+        # Tombstone in one atomic update; content and blobs are collected in the background
+        dataset = await tombstone_dataset({"dataset_id": dataset_id})
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
-            
-        username = dataset.get("dataset_info", {}).get("username")
-        dataset_name = dataset.get("dataset_info", {}).get("name", "").replace(" ", "_").lower()
-        
-        if not username or not dataset_name:
-            raise HTTPException(status_code=400, detail="Username or dataset name not found")
-        
-        # Delete files from Azure Blob Storage
-        await delete_dataset_blobs(dataset_name, username)
-        
-        # Delete dataset document from MongoDB
-        result = await datasets_collection.delete_one({"dataset_id": dataset_id})
-        
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        await dataset_feeds.refresh(dataset.get("dataset_info", {}).get("file_type"))
             
         return {"message": "Dataset deleted successfully"}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/datasets/{dataset_id}/manifest")
+async def get_dataset_manifest(dataset_id: str, file_type: str):
+    """Current per-file hashes, so clients can send only what changed to /upload/edit."""
+    logging.info(f"Endpoint called: get_dataset_manifest() for dataset: {dataset_id}, type: {file_type}")
+    if not ObjectId.is_valid(dataset_id):
+        raise HTTPException(status_code=400, detail="Invalid dataset ID")
+    try:
+        dataset = await datasets_collection.find_one(
+            {"_id": ObjectId(dataset_id), **ACTIVE_DATASETS},
+            {"manifests": 1, "version": 1}
+        )
+        if not dataset:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+
+        manifest_id = dataset.get("manifests", {}).get(file_type)
+        manifest = await content_store.get_manifest(manifest_id) if manifest_id else None
+        if not manifest:
+            raise HTTPException(status_code=404, detail=f"No {file_type} manifest for this dataset")
+
+        return {
+            "dataset_id": dataset_id,
+            "file_type": file_type,
+            "version": dataset.get("version", 0),
+            "manifest_id": manifest["_id"],
+            "files": manifest["files"],
+            "total_size": manifest["total_size"]
+        }
+    except HTTPException as he:
+        raise he
     except Exception as e:
+        logging.error(f"Error fetching dataset manifest: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from src.models.models import User, UserProfile
-from src.database.mongodb import user_profile_collection, datasets_collection
+from src.database.mongodb import user_profile_read_collection, datasets_collection, datasets_read_collection, ACTIVE_DATASETS
+from src.utils.etags import make_etag, etag_matches, etag_headers, not_modified
+from src.utils.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -14,7 +16,7 @@ async def get_user(user_id: int):
 
 @router.get("/{username}")
 async def get_user_by_username(username: str):
-    user = await user_profile_collection.find_one({"username": username})
+    user = await user_profile_read_collection.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user["_id"] = str(user["_id"])
@@ -22,26 +24,38 @@ async def get_user_by_username(username: str):
 
 @router.get("/{username}/datasets")
 async def get_user_datasets(username: str):
-    user = await user_profile_collection.find_one({"username": username})
+    user = await user_profile_read_collection.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    datasets = await datasets_collection.find({"uid": user["uid"]}).to_list(None)
+    datasets = await datasets_read_collection.find({"uid": user["uid"], **ACTIVE_DATASETS}).to_list(None)
     return [{"_id": str(dataset["_id"]), **dataset} for dataset in datasets]
 
 @router.get("/{username}/{dataset_name}")
-async def get_dataset_by_name(username: str, dataset_name: str):
-    user = await user_profile_collection.find_one({"username": username})
+async def get_dataset_by_name(username: str, dataset_name: str, request: Request):
+    user = await user_profile_read_collection.find_one({"username": username}, {"uid": 1})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    dataset = await datasets_collection.find_one({
+    # Every edit stamps a new timestamp; check it on the primary before loading file listings and checksums
+    version = await datasets_collection.find_one({
         "uid": user["uid"],
-        "dataset_info.name": dataset_name
-    })
+        "dataset_info.name": dataset_name,
+        **ACTIVE_DATASETS
+    }, {"timestamp": 1, "version": 1})
     
+    if not version:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    etag = make_etag("dataset", version["_id"], version.get("timestamp"), version.get("version"))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # A secondary that has not replicated this version yet would serve a body the ETag does not describe
+    dataset = await datasets_read_collection.find_one({"_id": version["_id"], **ACTIVE_DATASETS})
+    if dataset is None or (dataset.get("timestamp"), dataset.get("version")) != (version.get("timestamp"), version.get("version")):
+        dataset = await datasets_collection.find_one({"_id": version["_id"], **ACTIVE_DATASETS})
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
-    
-    dataset["_id"] = str(dataset["_id"])
-    return dataset
+
+    return FastJSONResponse(dataset, headers=etag_headers(etag))
@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.database.mongodb import (
+    user_profile_collection,
+    datasets_collection,
+    prompts_collection,
+    general_collection,
+    issues_collection,
+    replies_collection,
+    chat_history_collection,
+    ACTIVE_DATASETS
+)
+from src.utils.azure_storage import delete_blob_names, list_blob_names
+from src.utils.dataset_feeds import dataset_feeds
+from src.utils.dataset_gc import schedule_collection
+from src.utils.jobs import jobs
+from src.utils.logger import logging
+
+ACCOUNT_DELETION_JOB = "account_deletion"
+BATCH_SIZE = 500
+
+async def _in_batches(collection, query: dict, apply) -> int:
+    """Run ``apply`` over the ids matching ``query``, BATCH_SIZE documents at a time.
+
+    ``apply`` must make the documents stop matching ``query``, by deleting or
+    rewriting them, so each round picks up where the last one ended.
+    """
+    total = 0
+    while True:
+        ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(BATCH_SIZE)]
+        if not ids:
+            return total
+        total += await apply({"_id": {"$in": ids}})
+
+def _deleter(collection):
+    async def apply(query: dict) -> int:
+        return (await collection.delete_many(query)).deleted_count
+    return apply
+
+def _anonymizer(collection):
+    async def apply(query: dict) -> int:
+        return (await collection.update_many(query, {"$set": {"uid": None, "author": None}})).modified_count
+    return apply
+
+async def _tombstone_datasets(uid: str, username: str) -> int:
+    result = await datasets_collection.update_many(
+        {"uid": uid, **ACTIVE_DATASETS},
+        {"$set": {"deleted_at": datetime.now(timezone.utc)}}
+    )
+    # Each tombstone gets its own dataset_gc job, which releases content and blobs
+    file_types = set()
+    cursor = datasets_collection.find(
+        {"uid": uid, "deleted_at": {"$ne": None}, "purged_at": None},
+        {"_id": 1, "dataset_info.file_type": 1}
+    )
+    async for dataset in cursor:
+        await schedule_collection(dataset["_id"], uid)
+        file_types.add(dataset.get("dataset_info", {}).get("file_type"))
+    # Take the account's datasets off the homepage feeds, as single deletes do
+    if file_types:
+        await dataset_feeds.refresh(*file_types)
+    return result.modified_count
+
+async def _delete_prompts(uid: str, username: str) -> int:
+    return await _in_batches(prompts_collection, {"username": username}, _deleter(prompts_collection))
+
+async def _delete_chat_history(uid: str, username: str) -> int:
+    return await _in_batches(chat_history_collection, {"uid": uid}, _deleter(chat_history_collection))
+
+async def _anonymize_community(uid: str, username: str) -> int:
+    # Threads other people replied to stay readable; authorless posts render as Anonymous
+    total = 0
+    for collection in (general_collection, issues_collection, replies_collection):
+        total += await _in_batches(collection, {"uid": uid}, _anonymizer(collection))
+    return total
+
+async def _delete_user_blobs(uid: str, username: str) -> int:
+    # Uploads from before content addressing were stored under username/
+    blob_names = await asyncio.to_thread(list_blob_names, f"{username}/")
+    failed = await delete_blob_names(blob_names)
+    if failed:
+        raise RuntimeError(f"{len(failed)} blob(s) under {username}/ could not be deleted")
+    return len(blob_names)
+
+async def _delete_profile(uid: str, username: str) -> int:
+    return (await user_profile_collection.delete_one({"uid": uid})).deleted_count
+
+# Order matters: the profile goes last so the username stays reserved until
+# its blob prefix has been cleared
+STEPS = [
+    ("datasets", _tombstone_datasets),
+    ("prompts", _delete_prompts),
+    ("chat_history", _delete_chat_history),
+    ("community", _anonymize_community),
+    ("blobs", _delete_user_blobs),
+    ("profile", _delete_profile)
+]
+
+async def delete_account_data(job: dict) -> dict:
+    """Remove everything an account owns, one checkpointed step at a time."""
+    uid = job["payload"]["uid"]
+    username = job["payload"].get("username")
+    counts = dict(job.get("progress", {}).get("counts", {}))
+    for name, step in STEPS:
+        if name in counts:
+            continue
+        if name in ("prompts", "blobs") and not username:
+            counts[name] = 0
+        else:
+            counts[name] = await step(uid, username)
+        await jobs.checkpoint(job, counts=counts)
+        logging.info(f"Account deletion {job['_id']} for UID {uid}: {name} done ({counts[name]})")
+    return {"counts": counts}
+
+async def request_account_deletion(uid: str) -> Optional[str]:
+    """Schedule deletion of an account and return its job id, or None if there is no such user.
+
+    Repeated requests return the job that is already running.
+    """
+    profile = await user_profile_collection.find_one_and_update(
+        {"uid": uid, "deletion_job_id": None},
+        {"$set": {"deletion_job_id": ObjectId(), "deletion_requested_at": datetime.now(timezone.utc)}},
+        projection={"username": 1, "deletion_job_id": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if profile is None:
+        profile = await user_profile_collection.find_one({"uid": uid}, {"username": 1, "deletion_job_id": 1})
+        if profile is None:
+            return None
+
+    job_id = profile["deletion_job_id"]
+    try:
+        await jobs.enqueue(ACCOUNT_DELETION_JOB, {"uid": uid, "username": profile.get("username")}, uid=uid, job_id=job_id)
+    except DuplicateKeyError:
+        # Asking again after the job gave up starts it over; finished steps are skipped
+        await jobs.retry(job_id)
+    return str(job_id)
+
+jobs.register(ACCOUNT_DELETION_JOB, delete_account_data)
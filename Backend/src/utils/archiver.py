@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from src.config import settings
+from src.utils.logger import logging
+
+CHUNK_SIZE = 1024 * 1024
+
+CODECS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA
+}
+
+# Formats that are already compressed (or dense binary) gain nothing from deflate
+STORE_ONLY_EXTENSIONS = {
+    ".npy", ".npz", ".parquet", ".zst", ".zip", ".gz", ".bz2", ".xz", ".7z",
+    ".png", ".jpg", ".jpeg", ".webp", ".mp3", ".mp4"
+}
+
+# Line-oriented formats; shards of these end on a row boundary and record row ranges
+ROW_EXTENSIONS = {".csv", ".tsv", ".jsonl", ".ndjson", ".txt"}
+# A shard may run past its target size to finish a row, but never by more than this
+MAX_ROW_OVERRUN = 16 * 1024 * 1024
+
+SAMPLE_SIZE = 64 * 1024
+# Members whose sample shrinks by less than this are stored as-is
+MIN_SAVINGS = 0.05
+
+def is_incompressible(local: str) -> bool:
+    """Cheaply compress a sample from the middle of the file to see if it is worth deflating."""
+    size = os.path.getsize(local)
+    if size < 1024:
+        return False
+    with open(local, "rb") as source:
+        source.seek(max((size - SAMPLE_SIZE) // 2, 0))
+        sample = source.read(SAMPLE_SIZE)
+    return len(zlib.compress(sample, 1)) > len(sample) * (1 - MIN_SAVINGS)
+
+def member_compression(path: str, local: str, codec: str) -> int:
+    if codec == "store" or os.path.splitext(path)[1].lower() in STORE_ONLY_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    if is_incompressible(local):
+        return zipfile.ZIP_STORED
+    return CODECS[codec]
+
+class HashingWriter(io.RawIOBase):
+    """Write-only file that hashes bytes on their way to disk.
+
+    It refuses to seek, so zipfile streams the archive strictly in order
+    (using data descriptors) and the digest is exact without a second read.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            super().close()
+            self._file.close()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+def build_archive(entries: List[dict], zip_path: str, codec: str = "deflate", level: int = 6) -> Dict[str, object]:
+    """Write a deterministic zip of ``entries`` and return its size and SHA-256.
+
+    Runs in a worker process. Members are sorted and carry the zip epoch
+    as their timestamp, so the bytes depend only on the content and codec.
+    """
+    with HashingWriter(zip_path) as out:
+        with zipfile.ZipFile(out, "w", allowZip64=True) as archive:
+            for entry in sorted(entries, key=lambda e: e["path"]):
+                archive.compression = member_compression(entry["path"], entry["local"], codec)
+                archive.compresslevel = level if archive.compression != zipfile.ZIP_STORED else None
+                with open(entry["local"], "rb") as source, archive.open(entry["path"], "w", force_zip64=True) as target:
+                    shutil.copyfileobj(source, target, CHUNK_SIZE)
+        return {"size": out.size, "sha256": out.hexdigest()}
+
+def is_row_oriented(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in ROW_EXTENSIONS
+
+def _shard_cut(block: bytes, room: int, row_oriented: bool, at_row_start: bool) -> int:
+    """How many leading bytes of ``block`` still belong in the current shard."""
+    if room >= len(block):
+        return len(block)
+    if not row_oriented or -room >= MAX_ROW_OVERRUN:
+        return max(room, 0)
+    if room <= 0:
+        if at_row_start:
+            return 0
+        newline = block.find(b"\n")
+    else:
+        newline = block.find(b"\n", room - 1)
+    return len(block) if newline == -1 else newline + 1
+
+def build_shards(entries: List[dict], shard_size: int) -> List[dict]:
+    """Lay out the concatenation of ``entries`` as shards of about ``shard_size`` bytes.
+
+    Runs in a worker process. Nothing is written: a shard is a list of
+    byte ranges of the stored files, in path order. Each shard records its
+    offset in that stream, its size and SHA-256, and the file segments it
+    covers. Line-oriented files are cut after a newline (unless a single
+    row exceeds MAX_ROW_OVERRUN) and their segments carry the
+    ``[start, stop)`` range of rows that end inside them, plus
+    ``continues_row`` when they begin partway through a row.
+    """
+    shards: List[dict] = []
+    shard: Optional[dict] = None
+    stream_offset = 0
+
+    def close_shard() -> None:
+        shard["sha256"] = shard.pop("digest").hexdigest()
+        shards.append(shard)
+
+    for entry in sorted(entries, key=lambda e: e["path"]):
+        row_oriented = is_row_oriented(entry["path"])
+        file_offset = 0
+        row = 0
+        at_row_start = True
+        segment: Optional[dict] = None
+        with open(entry["local"], "rb") as source:
+            block = source.read(CHUNK_SIZE)
+            while True:
+                if shard is None:
+                    shard = {"index": len(shards), "offset": stream_offset, "size": 0, "files": [], "digest": hashlib.sha256()}
+                if segment is None:
+                    segment = {"path": entry["path"], "offset": file_offset, "size": 0}
+                    if row_oriented:
+                        segment["rows"] = [row, row]
+                        if not at_row_start:
+                            segment["continues_row"] = True
+                    shard["files"].append(segment)
+
+                take = _shard_cut(block, shard_size - shard["size"], row_oriented, at_row_start)
+                if take:
+                    data = block[:take]
+                    shard["digest"].update(data)
+                    shard["size"] += take
+                    segment["size"] += take
+                    file_offset += take
+                    stream_offset += take
+                    if row_oriented:
+                        row += data.count(b"\n")
+                        at_row_start = data.endswith(b"\n")
+                        segment["rows"][1] = row
+                    block = block[take:]
+
+                if block:
+                    # The shard is full; the rest of this file continues in the next one
+                    if not segment["size"]:
+                        shard["files"].remove(segment)
+                    close_shard()
+                    shard = None
+                    segment = None
+                    continue
+                block = source.read(CHUNK_SIZE)
+                if not block:
+                    break
+        if row_oriented and not at_row_start:
+            # The last row has no trailing newline
+            segment["rows"][1] = row + 1
+
+    if shard is not None:
+        close_shard()
+    return shards
+
+class Archiver:
+    """Runs CPU-heavy ingest steps in a bounded process pool.
+
+    Compression would otherwise run on the event loop thread and stall
+    every request in the worker for the length of a large upload.
+    """
+
+    def __init__(self, max_workers: int = 2, codec: str = "deflate", level: int = 6):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown archive codec {codec!r}, expected one of {', '.join(CODECS)}")
+        self.max_workers = max_workers
+        self.codec = codec
+        self.level = level
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app does not fork workers
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+
+    async def build(self, entries: List[dict], zip_path: str) -> Dict[str, object]:
+        members = [{"path": entry["path"], "local": entry["local"]} for entry in entries]
+        return await self.run(build_archive, members, zip_path, self.codec, self.level)
+
+    async def shard(self, entries: List[dict], shard_size: int) -> List[dict]:
+        members = [{"path": entry["path"], "local": entry["local"]} for entry in entries]
+        return await self.run(build_shards, members, shard_size)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            logging.info("Shutting down archive process pool")
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+archiver = Archiver(
+    max_workers=settings.ARCHIVE_WORKERS,
+    codec=settings.ARCHIVE_CODEC,
+    level=settings.ARCHIVE_COMPRESSION_LEVEL
+)
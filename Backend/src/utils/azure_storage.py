@@ -1,69 +1,101 @@
-from azure.storage.blob import BlobServiceClient, BlobClient
 from fastapi import UploadFile
-import os
-import shutil
-import tempfile
 import logging
 import asyncio
-from typing import List
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from src.config import settings
 
-STORAGE_ACCOUNT_URL = "https://vecem.blob.core.windows.net"
-SAS_TOKEN = "sp=racwd&st=2025-02-19T16:15:56Z&se=2099-02-20T00:15:56Z&spr=https&sv=2022-11-02&sr=c&sig=ku6eP3I24d7lanXfI0OJgt4lKWO3jL3r0tgjXl6OS8Y%3D"
-CONTAINER_NAME = "datasets"
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobServiceClient, ContainerClient
 
-blob_service_client = BlobServiceClient(account_url=STORAGE_ACCOUNT_URL, credential=SAS_TOKEN)
-container_client = blob_service_client.get_container_client(CONTAINER_NAME)
+CONTAINER_NAME = settings.AZURE_CONTAINER_NAME
 
-async def create_and_upload_zip(files: List[UploadFile], username: str, dataset_name: str, file_type: str) -> str:
-    """Create separate zip files for raw and vectorized data and upload them to Azure Blob Storage."""
-    temp_dir = None
-    
-    try:
-        # Create temporary directory structure
-        temp_dir = tempfile.mkdtemp()
-        dataset_dir = os.path.join(temp_dir, username, dataset_name, file_type)
-        os.makedirs(dataset_dir, exist_ok=True)
-
-        # Save files to temporary directory
-        for file in files:
-            file_content = await file.read()
-            file_path = os.path.join(dataset_dir, file.filename)
-            with open(file_path, "wb") as f:
-                f.write(file_content)
-            await file.seek(0)  # Reset file pointer
-
-        # Create zip file for the specific file_type folder
-        zip_base_path = os.path.join(temp_dir, username, dataset_name, f"{file_type}")
-        zip_path = f"{zip_base_path}.zip"
-        shutil.make_archive(
-            base_name=zip_base_path,
-            format='zip',
-            root_dir=dataset_dir
-        )
-
-        # Upload zip to Azure with correct folder structure
-        blob_name = f"{username}/{dataset_name}/{file_type}.zip"
-        blob_client = container_client.get_blob_client(blob_name)
-        
-        with open(zip_path, "rb") as zip_file:
-            blob_client.upload_blob(zip_file, overwrite=True)
+# Versioned blobs never change once written, so caches may keep them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, max-age=300"
 
-        return blob_client.url
+# Created by open_storage() from the app lifespan, or on first use by jobs and CLIs
+_blob_service_client: Optional["BlobServiceClient"] = None
+_container_client: Optional["ContainerClient"] = None
+_clients_lock = threading.Lock()
 
-    except Exception as e:
-        logging.error(f"Error in create_and_upload_zip: {str(e)}")
-        raise
+def open_storage() -> None:
+    """Create the blob clients. The Azure SDK is only imported here, keeping app import fast."""
+    global _blob_service_client, _container_client
+    with _clients_lock:
+        if _blob_service_client is not None:
+            return
+        from azure.storage.blob import BlobServiceClient
+        service_client = BlobServiceClient.from_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
+        _container_client = service_client.get_container_client(CONTAINER_NAME)
+        _blob_service_client = service_client
+
+def close_storage() -> None:
+    global _blob_service_client, _container_client
+    with _clients_lock:
+        if _blob_service_client is not None:
+            _blob_service_client.close()
+        _blob_service_client = None
+        _container_client = None
+
+def get_blob_service_client() -> "BlobServiceClient":
+    if _blob_service_client is None:
+        open_storage()
+    return _blob_service_client
+
+def get_container_client() -> "ContainerClient":
+    if _container_client is None:
+        open_storage()
+    return _container_client
+
+def blob_name_from_url(url: str) -> str:
+    """Turn a stored blob URL back into its name inside the container."""
+    path = unquote(urlparse(url).path).lstrip("/")
+    prefix = f"{CONTAINER_NAME}/"
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+def is_versioned_blob(blob_name: str) -> bool:
+    # Legacy uploads were written in place as username/dataset/type.zip;
+    # content-addressed and versioned names never change once written
+    return blob_name.startswith("cas/") or blob_name.count("/") >= 3
+
+def generate_download_url(blob_name: str, expires_in: int) -> Tuple[str, datetime]:
+    """Issue a short-lived, read-only SAS URL for a single blob.
+
+    Start and expiry are aligned to fixed windows so every grant for the same
+    blob in a window yields the same URL, which keeps CDN cache keys stable.
+    """
+    from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+    blob_service_client = get_blob_service_client()
+    account_key = getattr(blob_service_client.credential, "account_key", None)
+    if not account_key:
+        raise RuntimeError("Download grants require an account key in AZURE_STORAGE_CONNECTION_STRING")
 
-    finally:
-        # Clean up temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    window = max(expires_in // 3, 60)
+    now = datetime.now(timezone.utc)
+    window_start = datetime.fromtimestamp(int(now.timestamp()) // window * window, tz=timezone.utc)
+    expiry = window_start + timedelta(seconds=expires_in + window)
+
+    sas_token = generate_blob_sas(
+        account_name=blob_service_client.account_name,
+        container_name=CONTAINER_NAME,
+        blob_name=blob_name,
+        account_key=account_key,
+        permission=BlobSasPermissions(read=True),
+        start=window_start - timedelta(minutes=5),  # tolerate client clock skew
+        expiry=expiry,
+        cache_control=IMMUTABLE_CACHE_CONTROL if is_versioned_blob(blob_name) else MUTABLE_CACHE_CONTROL
+    )
+    blob_client = get_container_client().get_blob_client(blob_name)
+    return f"{blob_client.url}?{sas_token}", expiry
 
 async def upload_to_blob(file: UploadFile, dataset_id: str, dataset_name: str, file_type: str, username: str) -> str:
     try:
         # Create a unique blob path: username/dataset_name/file_type/filename
         blob_path = f"{username}/{dataset_name}/{file_type}/{file.filename}"
-        blob_client = container_client.get_blob_client(blob_path)
+        blob_client = get_container_client().get_blob_client(blob_path)
         
         # Read file content
         file_content = await file.read()
@@ -78,15 +110,44 @@ async def upload_to_blob(file: UploadFile, dataset_id: str, dataset_name: str, f
         logging.error(f"Error uploading to blob storage: {str(e)}")
         raise
 
-async def delete_dataset_blobs(dataset_name: str, username: str):
-    try:
-        # List all blobs in the dataset directory under the user's folder
-        blob_list = container_client.list_blobs(name_starts_with=f"{username}/{dataset_name}")
-        
-        # Delete each blob
-        for blob in blob_list:
-            container_client.delete_blob(blob.name)
-            
-    except Exception as e:
-        logging.error(f"Error deleting dataset blobs: {str(e)}")
-        raise
+# Azure accepts at most 256 sub-requests per blob batch
+DELETE_BATCH_SIZE = 256
+
+def _delete_batch(blob_names: List[str]) -> List[str]:
+    failed = []
+    responses = get_container_client().delete_blobs(*blob_names, raise_on_any_failure=False)
+    for blob_name, response in zip(blob_names, responses):
+        # 404 means an earlier attempt already removed it
+        if response.status_code not in (202, 404):
+            failed.append(blob_name)
+    return failed
+
+async def delete_blob_names(blob_names: List[str]) -> List[str]:
+    """Delete blobs with the batch API, DELETE_BATCH_SIZE per round trip.
+
+    Returns the names that could not be deleted so callers can retry them.
+    """
+    failed = []
+    unique = list(dict.fromkeys(blob_names))
+    for start in range(0, len(unique), DELETE_BATCH_SIZE):
+        batch = unique[start:start + DELETE_BATCH_SIZE]
+        try:
+            failed.extend(await asyncio.to_thread(_delete_batch, batch))
+        except Exception as e:
+            logging.warning(f"Blob batch delete of {len(batch)} blob(s) failed: {str(e)}")
+            failed.extend(batch)
+    if failed:
+        logging.warning(f"Could not delete {len(failed)} of {len(unique)} blob(s)")
+    return failed
+
+async def delete_blobs(urls: List[str]) -> List[str]:
+    """Delete individual blobs, e.g. versions superseded by an edit."""
+    return await delete_blob_names([blob_name_from_url(url) for url in urls])
+
+def list_blob_names(prefix: str) -> List[str]:
+    return [blob.name for blob in get_container_client().list_blobs(name_starts_with=prefix)]
+
+async def delete_dataset_blobs(dataset_name: str, username: str) -> List[str]:
+    """Delete the blobs written under a dataset's folder before content addressing."""
+    blob_names = await asyncio.to_thread(list_blob_names, f"{username}/{dataset_name}/")
+    return await delete_blob_names(blob_names)
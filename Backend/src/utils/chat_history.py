@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Sequence
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, message_to_dict, messages_from_dict
+from src.database.mongodb import chat_history_collection
+from src.utils.logger import logging
+
+Summarizer = Callable[[str, List[BaseMessage]], Awaitable[str]]
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token) that avoids loading a tokenizer
+    return len(text) // 4 + 4
+
+class MongoChatMessageHistory(BaseChatMessageHistory):
+    """Chat history for one (uid, session_id) pair, persisted in Mongo.
+
+    The last ``max_turns`` turns are cached in memory, so a pooled session
+    reads the database only once. Turns that no longer fit the window or the
+    token budget are dropped from the prompt and, when a summarizer is set,
+    folded into a running summary in the background.
+    """
+
+    def __init__(
+        self,
+        uid: str,
+        session_id: str,
+        max_turns: int = 10,
+        token_budget: int = 4000,
+        max_stored_messages: int = 200,
+        summarizer: Optional[Summarizer] = None
+    ):
+        self.uid = uid
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_stored_messages = max_stored_messages
+        self.summarizer = summarizer
+        self.summary = ""
+        self._recent: List[BaseMessage] = []
+        self._loaded = False
+        self._summary_task: Optional[asyncio.Task] = None
+
+    @property
+    def _filter(self) -> dict:
+        return {"uid": self.uid, "session_id": self.session_id}
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        if self.summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] + self._recent
+        return list(self._recent)
+
+    async def _load(self) -> None:
+        if self._loaded:
+            return
+        doc = await chat_history_collection.find_one(
+            self._filter,
+            {"summary": 1, "messages": {"$slice": -2 * self.max_turns}}
+        )
+        if doc:
+            self.summary = doc.get("summary", "")
+            self._recent = messages_from_dict(doc.get("messages", []))
+            self._trim()
+        self._loaded = True
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        await self._load()
+        return self.messages
+
+    def _tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(str(m.content)) for m in self._recent)
+
+    def _trim(self) -> List[BaseMessage]:
+        """Drop whole turns from the front until the window fits; return what was dropped."""
+        dropped: List[BaseMessage] = []
+        turns = sum(isinstance(m, HumanMessage) for m in self._recent)
+        while self._recent and (turns > self.max_turns or self._tokens() > self.token_budget):
+            # Always keep the latest turn, even if it alone exceeds the budget
+            if turns <= 1:
+                break
+            dropped.append(self._recent.pop(0))
+            while self._recent and not isinstance(self._recent[0], HumanMessage):
+                dropped.append(self._recent.pop(0))
+            turns -= 1
+        return dropped
+
+    async def aadd_messages(self, messages: Sequence[BaseMessage]) -> None:
+        await self._load()
+        self._recent.extend(messages)
+
+        await chat_history_collection.update_one(
+            self._filter,
+            {
+                "$push": {"messages": {
+                    "$each": [message_to_dict(m) for m in messages],
+                    "$slice": -self.max_stored_messages
+                }},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            },
+            upsert=True
+        )
+
+        dropped = self._trim()
+        if dropped and self.summarizer:
+            # Summarize off the request path so the reply is not delayed
+            self._summary_task = asyncio.create_task(self._summarize(dropped, self._summary_task))
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        # Sync callers (e.g. the CLI) only get the in-memory window
+        self._recent.extend(messages)
+        self._trim()
+
+    async def _summarize(self, dropped: List[BaseMessage], previous: Optional[asyncio.Task]) -> None:
+        # Fold summaries in order so a slow earlier call is not overwritten
+        if previous:
+            await previous
+        try:
+            self.summary = await self.summarizer(self.summary, dropped)
+            await chat_history_collection.update_one(
+                self._filter,
+                {"$set": {"summary": self.summary}}
+            )
+        except Exception as e:
+            logging.error(f"Error summarizing chat history for UID {self.uid}: {str(e)}")
+
+    async def aclear(self) -> None:
+        self.clear()
+        await chat_history_collection.delete_one(self._filter)
+
+    def clear(self) -> None:
+        self.summary = ""
+        self._recent = []
@@ -0,0 +1,77 @@
+import asyncio
+import importlib
+from typing import TYPE_CHECKING, Optional
+from cachetools import TTLCache
+from src.config import settings
+from src.database.mongodb import user_profile_collection
+from src.utils.logger import logging
+
+if TYPE_CHECKING:
+    from src.bot import FRIDAY
+
+BOT_MODULE = "src.bot"
+_bot_module = None
+
+async def load_bot():
+    """Import the chat bot on first use.
+
+    LangChain and the Gemini client take about a second to import, so only
+    chat requests pay for them, and the import runs off the event loop.
+    """
+    global _bot_module
+    if _bot_module is None:
+        # Concurrent first requests serialize on the import lock and get the same module
+        _bot_module = await asyncio.to_thread(importlib.import_module, BOT_MODULE)
+    return _bot_module
+
+class ChatSessionManager:
+    """Keeps FRIDAY instances alive between /chat requests.
+
+    Sessions live in a bounded TTL/LRU pool keyed by uid, so the model client,
+    prompt chain and conversation history are reused across messages. API keys
+    are cached separately and dropped through ``invalidate`` whenever a user
+    changes their key.
+    """
+
+    def __init__(self, max_sessions: int = 1000, session_ttl: int = 1800, api_key_ttl: int = 300):
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=session_ttl)
+        self._api_keys = TTLCache(maxsize=max_sessions, ttl=api_key_ttl)
+
+    async def get_api_key(self, uid: str) -> str:
+        api_key = self._api_keys.get(uid)
+        if api_key is not None:
+            return api_key
+
+        user = await user_profile_collection.find_one({"uid": uid}, {"api_key": 1})
+        if not user or not user.get("api_key"):
+            raise ValueError("API key not found for user")
+
+        self._api_keys[uid] = user["api_key"]
+        return user["api_key"]
+
+    async def get_session(self, uid: str) -> "FRIDAY":
+        api_key = await self.get_api_key(uid)
+
+        session: Optional["FRIDAY"] = self._sessions.get(uid)
+        if session is None:
+            logging.info(f"Creating chat session for UID: {uid}")
+            bot = await load_bot()
+            session = bot.FRIDAY(uid)
+
+        # Rebuild the model only when the key changed; history is kept
+        if session.api_key != api_key:
+            await session.initialize(api_key)
+
+        # Re-inserting refreshes the TTL so active sessions stay pooled
+        self._sessions[uid] = session
+        return session
+
+    def invalidate(self, uid: str) -> None:
+        """Forget the cached API key; the session rebuilds its model on next use."""
+        self._api_keys.pop(uid, None)
+
+chat_sessions = ChatSessionManager(
+    max_sessions=settings.CHAT_SESSION_MAX_SIZE,
+    session_ttl=settings.CHAT_SESSION_TTL,
+    api_key_ttl=settings.CHAT_API_KEY_TTL
+)
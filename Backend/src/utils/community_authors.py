@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from src.database.mongodb import (
+    user_profile_collection,
+    general_collection,
+    issues_collection,
+    replies_collection
+)
+from src.utils.jobs import jobs
+from src.utils.logger import logging
+
+AUTHOR_FANOUT_JOB = "author_fanout"
+COMMUNITY_COLLECTIONS = (general_collection, issues_collection, replies_collection)
+AUTHOR_PROJECTION = {"uid": 1, "name": 1, "profilePicture": 1}
+
+def snapshot_from_profile(profile: dict) -> dict:
+    """The author fields embedded in community posts so threads render without a profile lookup."""
+    return {
+        "name": profile.get("name") or "Anonymous",
+        "avatar": profile.get("profilePicture") or "",
+        "updated_at": datetime.now(timezone.utc)
+    }
+
+async def author_snapshot(uid: Optional[str]) -> Optional[dict]:
+    if not uid:
+        return None
+    profile = await user_profile_collection.find_one({"uid": uid}, AUTHOR_PROJECTION)
+    return snapshot_from_profile(profile) if profile else None
+
+async def resolve_missing_authors(docs: List[dict]) -> Dict[str, dict]:
+    """Snapshots for posts written before authors were embedded, fetched in one query."""
+    uids = {doc["uid"] for doc in docs if "author" not in doc and doc.get("uid")}
+    if not uids:
+        return {}
+    cursor = user_profile_collection.find({"uid": {"$in": list(uids)}}, AUTHOR_PROJECTION)
+    return {profile["uid"]: snapshot_from_profile(profile) async for profile in cursor}
+
+def author_fields(doc: dict, fallback: Dict[str, dict]) -> Tuple[str, str]:
+    author = doc["author"] if "author" in doc else fallback.get(doc.get("uid"))
+    if not author:
+        return "Anonymous", ""
+    return author.get("name") or "Anonymous", author.get("avatar") or ""
+
+async def schedule_author_fanout(uid: str, profile: dict) -> str:
+    return await jobs.enqueue(AUTHOR_FANOUT_JOB, {"uid": uid, "author": snapshot_from_profile(profile)}, uid=uid)
+
+async def fan_out_author(job: dict) -> dict:
+    """Copy a user's new name and avatar onto every post they wrote.
+
+    Posts already carrying a newer snapshot are skipped, so fan-outs that
+    run out of order cannot roll a later profile change back.
+    """
+    uid = job["payload"]["uid"]
+    author = job["payload"]["author"]
+    updated = 0
+    for collection in COMMUNITY_COLLECTIONS:
+        result = await collection.update_many(
+            {"uid": uid, "author.updated_at": {"$not": {"$gte": author["updated_at"]}}},
+            {"$set": {"author": author}}
+        )
+        updated += result.modified_count
+    logging.info(f"Updated author snapshot on {updated} post(s) for UID {uid}")
+    return {"updated": updated}
+
+jobs.register(AUTHOR_FANOUT_JOB, fan_out_author)
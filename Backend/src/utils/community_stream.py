@@ -0,0 +1,180 @@
+import asyncio
+import orjson
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional, Set
+from bson import ObjectId
+from src.config import settings
+from src.database.mongodb import general_collection, issues_collection, replies_collection
+from src.models.response_models import CommunityMessage, CommunityReply
+from src.utils.community_authors import author_fields, resolve_missing_authors
+from src.utils.logger import logging
+from src.utils.serialization import dumps
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis is only needed when several workers share the stream
+    redis = None
+
+TAGS = ("general", "issue")
+REDIS_CHANNEL = "community:events"
+# Clients further behind than this reload the thread list instead
+CATCH_UP_LIMIT = 500
+
+def collection_for(tag: str):
+    return general_collection if tag == "general" else issues_collection
+
+def format_message(msg: dict, tag: str, fallback: Dict[str, dict], replies: Optional[List[CommunityReply]] = None) -> CommunityMessage:
+    user_name, user_avatar = author_fields(msg, fallback)
+    return {
+        "id": str(msg["_id"]),
+        "content": msg.get("description", ""),
+        "userId": msg.get("uid", ""),
+        "userName": user_name,
+        "userAvatar": user_avatar,
+        "timestamp": msg.get("created_at"),
+        "tag": tag,
+        "replies": replies or []
+    }
+
+def format_reply(reply: dict, tag: str, fallback: Dict[str, dict]) -> CommunityReply:
+    user_name, user_avatar = author_fields(reply, fallback)
+    return {
+        "id": str(reply["_id"]),
+        "issueId": reply.get("issue_id"),
+        "content": reply.get("description", ""),
+        "userId": reply.get("uid", ""),
+        "userName": user_name,
+        "userAvatar": user_avatar,
+        "timestamp": reply.get("created_at"),
+        "tag": tag
+    }
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+def _event(tag: str, event_type: str, data: dict) -> dict:
+    # The payload is encoded once, however many clients receive it
+    return {"id": data["id"], "tag": tag, "type": event_type, "data": dumps(data).decode()}
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {event['data']}\n\n"
+
+class CommunityBroadcaster:
+    """Pushes new community posts to connected stream clients.
+
+    Each worker fans events out to its own subscribers. With
+    COMMUNITY_REDIS_URL set, events travel through a Redis pub/sub channel
+    instead, so a post made on one worker reaches clients on every worker.
+    Clients that fall behind are disconnected and catch up from their
+    cursor on reconnect.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, queue_size: int = 100, keepalive: float = 15):
+        self.redis_url = redis_url
+        self.queue_size = queue_size
+        self.keepalive = keepalive
+        self._subscribers: Dict[str, Set[_Subscriber]] = defaultdict(set)
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _deliver(self, event: dict) -> None:
+        for subscriber in list(self._subscribers.get(event["tag"], ())):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up; end its stream so it reconnects and catches up
+                subscriber.overflowed = True
+                self._subscribers[event["tag"]].discard(subscriber)
+
+    async def publish(self, tag: str, event_type: str, data: dict) -> None:
+        event = _event(tag, event_type, data)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(REDIS_CHANNEL, dumps(event))
+                return
+            except Exception as e:
+                logging.warning(f"Redis publish failed, delivering locally: {str(e)}")
+        self._deliver(event)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(REDIS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._deliver(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Community stream Redis listener failed, retrying: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if not self.redis_url:
+            return
+        if redis is None:
+            logging.warning("COMMUNITY_REDIS_URL is set but the redis package is not installed; streaming within this worker only")
+            return
+        self._redis = redis.from_url(self.redis_url, decode_responses=True)
+        self._listener = asyncio.create_task(self._listen())
+        logging.info("Community stream fanning out through Redis")
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def catch_up(self, tag: str, since: ObjectId) -> List[dict]:
+        """Posts created after ``since``, oldest first, as stream events."""
+        messages = await collection_for(tag).find({"_id": {"$gt": since}}).sort("_id", 1).limit(CATCH_UP_LIMIT).to_list(None)
+        replies = []
+        if tag == "issue":
+            replies = await replies_collection.find({"_id": {"$gt": since}}).sort("_id", 1).limit(CATCH_UP_LIMIT).to_list(None)
+        fallback = await resolve_missing_authors(messages + replies)
+        events = [(msg["_id"], "message", format_message(msg, tag, fallback)) for msg in messages]
+        events += [(reply["_id"], "reply", format_reply(reply, tag, fallback)) for reply in replies]
+        events.sort(key=lambda item: item[0])
+        return [_event(tag, event_type, data) for _, event_type, data in events]
+
+    async def stream(self, tag: str, since: Optional[ObjectId], is_disconnected) -> AsyncIterator[str]:
+        subscriber = _Subscriber(self.queue_size)
+        # Subscribe before catching up so nothing posted in between is lost
+        self._subscribers[tag].add(subscriber)
+        try:
+            yield "retry: 3000\n\n"
+            sent: Set[str] = set()
+            if since is not None:
+                for event in await self.catch_up(tag, since):
+                    sent.add(event["id"])
+                    yield _sse(event)
+
+            while not await is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if subscriber.overflowed:
+                    return
+                if event["id"] in sent:
+                    continue
+                yield _sse(event)
+        finally:
+            self._subscribers[tag].discard(subscriber)
+
+community_stream = CommunityBroadcaster(
+    redis_url=settings.COMMUNITY_REDIS_URL,
+    queue_size=settings.COMMUNITY_STREAM_QUEUE_SIZE,
+    keepalive=settings.COMMUNITY_STREAM_KEEPALIVE
+)
@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.config import settings
+from src.database.mongodb import blobs_collection, manifests_collection
+from src.utils.azure_storage import get_container_client, delete_blob_names, IMMUTABLE_CACHE_CONTROL
+from src.utils.archiver import archiver
+from src.utils.logger import logging
+
+CHUNK_SIZE = 1024 * 1024
+CAS_PREFIX = "cas"
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def is_content_addressed(blob_name: str) -> bool:
+    return blob_name.startswith(f"{CAS_PREFIX}/")
+
+def new_generation() -> str:
+    return uuid.uuid4().hex[:16]
+
+# Blob names carry the generation of the document that owns them, so deleting
+# an unreferenced blob can never hit one re-created for a later upload
+def member_blob_name(sha256: str, generation: str) -> str:
+    return f"{CAS_PREFIX}/{sha256[:2]}/{sha256}.{generation}"
+
+def archive_blob_name(manifest_id: str, generation: str) -> str:
+    return f"{CAS_PREFIX}/archives/{manifest_id}.{generation}.zip"
+
+def manifest_id_for(entries: List[dict]) -> str:
+    digest = hashlib.sha256()
+    for entry in sorted(entries, key=lambda e: e["path"]):
+        digest.update(f"{entry['path']}\x00{entry['sha256']}\x00{entry['size']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def _member_path(filename: str) -> str:
+    path = posixpath.normpath((filename or "").replace("\\", "/")).lstrip("/")
+    if not path or path == "." or path.startswith("../") or path == "..":
+        return os.path.basename(filename or "") or "file"
+    return path
+
+def _upload(blob_name: str, path: str, content_type: str) -> None:
+    from azure.storage.blob import ContentSettings
+    with open(path, "rb") as data:
+        get_container_client().get_blob_client(blob_name).upload_blob(
+            data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type, cache_control=IMMUTABLE_CACHE_CONTROL)
+        )
+
+def _download(blob_name: str, path: str) -> None:
+    with open(path, "wb") as out:
+        get_container_client().download_blob(blob_name).readinto(out)
+
+def manifest_checksums(manifest: dict) -> dict:
+    """Integrity data for a dataset document: the archive plus every member."""
+    return {
+        "archive": {"sha256": manifest["archive"].get("sha256"), "size": manifest["archive"]["size"]},
+        "files": manifest["files"]
+    }
+
+class ContentStore:
+    """Content-addressed storage for dataset files.
+
+    Every file is stored once under ``cas/<hh>/<sha256>.<generation>`` and
+    tracked in the ``blobs`` collection with a reference count. A document
+    is removed before its blob is deleted; a new upload of the same content
+    then gets a new generation, and with it a blob name that no pending
+    delete refers to. A dataset's file set is a
+    ``manifests`` document (path, hash and size per file) whose id is the
+    hash of its entries, so identical uploads resolve to the same manifest
+    and the same download archive, and nothing is transferred twice.
+
+    File sets of at least SHARD_MIN_DATASET_SIZE also get a shard layout:
+    shards of about SHARD_SIZE bytes, listed in the manifest with their
+    offsets, checksums and row ranges. Shards are byte ranges of the member
+    blobs rather than blobs of their own, so clients can fetch them in
+    parallel or only the parts they need without the data being stored again.
+    """
+
+    async def spool(self, files: List[UploadFile], directory: str, durable: bool = False) -> List[dict]:
+        """Stream uploads to disk, hashing each file on the way through.
+
+        With ``durable`` each file is fsynced, so the spool survives a crash.
+        """
+        entries: Dict[str, dict] = {}
+        for index, file in enumerate(files):
+            path = _member_path(file.filename)
+            digest = hashlib.sha256()
+            size = 0
+            local = os.path.join(directory, f"{index}-{os.path.basename(path)}")
+            with open(local, "wb") as out:
+                while chunk := await file.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+                if durable:
+                    out.flush()
+                    os.fsync(out.fileno())
+            await file.seek(0)
+            # A repeated path replaces the earlier file, as it did on disk before
+            entries[path] = {"path": path, "sha256": digest.hexdigest(), "size": size, "local": local}
+        return list(entries.values())
+
+    async def _acquire_member(self, entry: dict) -> None:
+        blob = await blobs_collection.find_one_and_update(
+            {"_id": entry["sha256"]},
+            {
+                "$inc": {"refcount": 1},
+                "$setOnInsert": {
+                    "blob": member_blob_name(entry["sha256"], new_generation()),
+                    "size": entry["size"],
+                    "ready": False,
+                    "created_at": datetime.now(timezone.utc)
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if blob.get("ready"):
+            return
+        await asyncio.to_thread(_upload, blob["blob"], entry["local"], "application/octet-stream")
+        await blobs_collection.update_one({"_id": entry["sha256"]}, {"$set": {"ready": True}})
+
+    async def _release_member(self, sha256: str) -> Optional[str]:
+        """Drop one reference to a file and return its blob name once it is unreferenced."""
+        blob = await blobs_collection.find_one_and_update(
+            {"_id": sha256},
+            {"$inc": {"refcount": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["refcount"] > 0:
+            return None
+        # Only delete if nobody re-acquired it in the meantime
+        result = await blobs_collection.delete_one({"_id": sha256, "refcount": {"$lte": 0}})
+        return blob["blob"] if result.deleted_count else None
+
+    async def _release_members(self, hashes, extra_blobs: Optional[List[str]] = None) -> None:
+        orphaned = list(extra_blobs or [])
+        for sha256 in hashes:
+            blob_name = await self._release_member(sha256)
+            if blob_name:
+                orphaned.append(blob_name)
+        if orphaned:
+            await delete_blob_names(orphaned)
+
+    async def _reference(self, manifest_id: str) -> Optional[dict]:
+        return await manifests_collection.find_one_and_update(
+            {"_id": manifest_id},
+            {"$inc": {"refcount": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def store_entries(self, entries: List[dict], workdir: str) -> dict:
+        """Reference the manifest for spooled entries, uploading only content not stored yet."""
+        manifest_id = manifest_id_for(entries)
+        manifest = await self._reference(manifest_id)
+        if manifest is not None:
+            logging.info(f"Reusing stored manifest {manifest_id}")
+            return manifest
+
+        acquired = []
+        # Blobs of this attempt only; nobody else can refer to them until the manifest is inserted
+        generation = new_generation()
+        uploaded: List[str] = []
+        try:
+            for entry in {entry["sha256"]: entry for entry in entries}.values():
+                await self._acquire_member(entry)
+                acquired.append(entry["sha256"])
+
+            zip_path = os.path.join(workdir, f"{manifest_id}.zip")
+            archive_checksum = await archiver.build(entries, zip_path)
+            archive = archive_blob_name(manifest_id, generation)
+            uploaded.append(archive)
+            await asyncio.to_thread(_upload, archive, zip_path, "application/zip")
+            os.remove(zip_path)
+
+            total_size = sum(entry["size"] for entry in entries)
+            shards = []
+            if total_size >= settings.SHARD_MIN_DATASET_SIZE:
+                shards = await archiver.shard(entries, settings.SHARD_SIZE)
+
+            manifest = {
+                "_id": manifest_id,
+                "files": [{k: entry[k] for k in ("path", "sha256", "size")} for entry in sorted(entries, key=lambda e: e["path"])],
+                "total_size": total_size,
+                "archive": {"blob": archive, "url": get_container_client().get_blob_client(archive).url, **archive_checksum},
+                "shards": shards,
+                "refcount": 1,
+                "created_at": datetime.now(timezone.utc)
+            }
+            await manifests_collection.insert_one(manifest)
+            return manifest
+        except DuplicateKeyError:
+            # An identical upload finished first; share its manifest instead
+            await self._release_members(acquired, extra_blobs=uploaded)
+            return await self._reference(manifest_id)
+        except Exception:
+            await self._release_members(acquired, extra_blobs=uploaded)
+            raise
+
+    def _parse_manifest(self, manifest: List[dict]) -> Dict[str, dict]:
+        if not isinstance(manifest, list) or not manifest:
+            raise ValueError("Manifest must be a non-empty list of {path, sha256, size} entries")
+        entries = {}
+        for item in manifest:
+            try:
+                path = _member_path(item["path"])
+                sha256 = str(item["sha256"]).lower()
+                size = int(item["size"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Invalid manifest entry: {item}")
+            if not SHA256_PATTERN.match(sha256) or size < 0:
+                raise ValueError(f"Invalid manifest entry: {item}")
+            entries[path] = {"path": path, "sha256": sha256, "size": size}
+        return entries
+
+    async def _stored_blobs(self, entries: List[dict]) -> Dict[str, dict]:
+        if not entries:
+            return {}
+        cursor = blobs_collection.find({"_id": {"$in": list({entry["sha256"] for entry in entries})}, "ready": True})
+        return {blob["_id"]: blob async for blob in cursor}
+
+    async def spool_delta(self, manifest: List[dict], files: List[UploadFile], directory: str) -> Tuple[List[dict], dict]:
+        """Spool an edit described by ``manifest``, where only new or changed files are uploaded.
+
+        Entries without an uploaded file must already be in the store; they
+        come back without a local copy, for ``store_delta`` to resolve.
+        """
+        wanted = self._parse_manifest(manifest)
+        uploaded = {entry["path"]: entry for entry in await self.spool(files, directory, durable=True)}
+        for path, entry in uploaded.items():
+            if path not in wanted:
+                raise ValueError(f"Uploaded file {path} is not listed in the manifest")
+            if (entry["sha256"], entry["size"]) != (wanted[path]["sha256"], wanted[path]["size"]):
+                raise ValueError(f"Uploaded file {path} does not match its manifest hash")
+
+        reused = [entry for path, entry in wanted.items() if path not in uploaded]
+        stored = await self._stored_blobs(reused)
+        missing = [entry["path"] for entry in reused if entry["sha256"] not in stored]
+        if missing:
+            raise ValueError(f"Content not on the server, upload these files: {', '.join(missing)}")
+        return list(uploaded.values()) + reused, {"uploaded": len(uploaded), "reused": len(reused)}
+
+    async def store_delta(self, entries: List[dict], workdir: str) -> dict:
+        """Reference the manifest for entries from ``spool_delta``.
+
+        Unchanged files are only fetched from blob storage, once per hash,
+        when the file set is new and its archive has to be built.
+        """
+        manifest = await self._reference(manifest_id_for(entries))
+        if manifest is not None:
+            return manifest
+
+        reused = [entry for entry in entries if "local" not in entry]
+        stored = await self._stored_blobs(reused)
+        missing = [entry["path"] for entry in reused if entry["sha256"] not in stored]
+        if missing:
+            raise ValueError(f"Content was deleted before the edit was stored: {', '.join(missing)}")
+        local_by_hash = {}
+        for entry in reused:
+            if entry["sha256"] not in local_by_hash:
+                local = os.path.join(workdir, f"reused-{entry['sha256']}")
+                await asyncio.to_thread(_download, stored[entry["sha256"]]["blob"], local)
+                local_by_hash[entry["sha256"]] = local
+            entry["local"] = local_by_hash[entry["sha256"]]
+        return await self.store_entries(entries, workdir)
+
+    async def get_manifest(self, manifest_id: str) -> Optional[dict]:
+        return await manifests_collection.find_one({"_id": manifest_id}, {"refcount": 0})
+
+    async def member_blobs(self, manifest: dict) -> Dict[str, str]:
+        """Blob name of each file in a manifest, by path."""
+        hashes = {entry["sha256"] for entry in manifest["files"]}
+        blobs = {blob["_id"]: blob["blob"] async for blob in blobs_collection.find({"_id": {"$in": list(hashes)}}, {"blob": 1})}
+        return {entry["path"]: blobs[entry["sha256"]] for entry in manifest["files"] if entry["sha256"] in blobs}
+
+    async def release(self, manifest_id: Optional[str]) -> None:
+        """Drop one dataset reference; content is deleted once nothing refers to it."""
+        if not manifest_id:
+            return
+        try:
+            manifest = await manifests_collection.find_one_and_update(
+                {"_id": manifest_id},
+                {"$inc": {"refcount": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if manifest is None or manifest["refcount"] > 0:
+                return
+            result = await manifests_collection.delete_one({"_id": manifest_id, "refcount": {"$lte": 0}})
+            if not result.deleted_count:
+                return
+            await self._release_members(
+                {entry["sha256"] for entry in manifest["files"]},
+                extra_blobs=[manifest["archive"]["blob"]]
+            )
+        except Exception as e:
+            logging.error(f"Error releasing manifest {manifest_id}: {str(e)}")
+
+content_store = ContentStore()
@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from src.config import settings
+from src.database.mongodb import datasets_collection, dataset_feeds_collection, dataset_feeds_read_collection, ACTIVE_DATASETS
+from src.utils.logger import logging
+
+FEED_SIZE = 16
+ALL_CATEGORY = "all"
+
+# Only what the homepage cards render; file listings are never part of a feed
+FEED_PROJECTION = {
+    "dataset_id": 1,
+    "dataset_info.name": 1,
+    "dataset_info.description": 1,
+    "dataset_info.domain": 1,
+    "dataset_info.file_type": 1,
+    "upload_type": 1,
+    "timestamp": 1,
+    "uid": 1
+}
+
+def _feed_item(dataset: dict) -> dict:
+    info = dataset.get("dataset_info") or {}
+    return {
+        "_id": str(dataset["_id"]),
+        "dataset_id": dataset.get("dataset_id"),
+        "dataset_info": {
+            "name": info.get("name", "Untitled"),
+            "description": info.get("description", ""),
+            "domain": info.get("domain", ""),
+            "file_type": info.get("file_type", "unknown")
+        },
+        "upload_type": dataset.get("upload_type"),
+        "timestamp": dataset.get("timestamp"),
+        "uid": dataset.get("uid")
+    }
+
+class DatasetFeeds:
+    """Materialized per-category homepage feeds.
+
+    Each category's newest datasets are stored as one document in
+    ``datasetfeeds`` and refreshed by the write paths that change the catalog.
+    Reads are served from a per-process snapshot that is re-read from the
+    feed document after ``ttl`` seconds, so other workers' writes show up
+    quickly without touching the datasets collection. The feed's
+    ``updated_at`` doubles as its version for conditional requests.
+    """
+
+    def __init__(self, ttl: float = 5):
+        self.ttl = ttl
+        self._snapshot: Dict[str, Tuple[float, Optional[datetime], List[dict]]] = {}
+
+    def _remember(self, category: str, updated_at: Optional[datetime], datasets: List[dict]) -> None:
+        self._snapshot[category] = (time.monotonic() + self.ttl, updated_at, datasets)
+
+    async def _rebuild(self, category: str) -> Tuple[datetime, List[dict]]:
+        query = dict(ACTIVE_DATASETS) if category == ALL_CATEGORY else {"dataset_info.file_type": category, **ACTIVE_DATASETS}
+        cursor = datasets_collection.find(query, FEED_PROJECTION).sort("timestamp", -1).limit(FEED_SIZE)
+        datasets = [_feed_item(dataset) async for dataset in cursor]
+        updated_at = datetime.now(timezone.utc)
+
+        await dataset_feeds_collection.replace_one(
+            {"_id": category},
+            {"_id": category, "datasets": datasets, "updated_at": updated_at},
+            upsert=True
+        )
+        self._remember(category, updated_at, datasets)
+        return updated_at, datasets
+
+    async def feed(self, category: str) -> Tuple[Optional[datetime], List[dict]]:
+        """The category's datasets, newest first, with the time the feed last changed."""
+        snapshot = self._snapshot.get(category)
+        if snapshot and snapshot[0] > time.monotonic():
+            return snapshot[1], snapshot[2]
+
+        feed = await dataset_feeds_read_collection.find_one({"_id": category})
+        if feed is None:
+            return await self._rebuild(category)
+
+        self._remember(category, feed.get("updated_at"), feed["datasets"])
+        return feed.get("updated_at"), feed["datasets"]
+
+    async def publish(self, dataset: dict) -> None:
+        """Prepend a newly saved dataset to the feeds it belongs to."""
+        item = _feed_item(dataset)
+        for category in (ALL_CATEGORY, item["dataset_info"]["file_type"]):
+            try:
+                # Skipped when a retried upload already published this dataset
+                result = await dataset_feeds_collection.update_one(
+                    {"_id": category, "datasets._id": {"$ne": item["_id"]}},
+                    {
+                        "$push": {"datasets": {"$each": [item], "$position": 0, "$slice": FEED_SIZE}},
+                        "$set": {"updated_at": datetime.now(timezone.utc)}
+                    }
+                )
+                if result.matched_count:
+                    self._snapshot.pop(category, None)
+                elif not await dataset_feeds_collection.find_one({"_id": category}, {"_id": 1}):
+                    await self._rebuild(category)
+            except Exception as e:
+                logging.error(f"Error publishing dataset to {category} feed: {str(e)}")
+
+    async def refresh(self, *file_types: Optional[str]) -> None:
+        """Recompute the feeds touched by an edit or delete."""
+        categories = {ALL_CATEGORY, *(file_type for file_type in file_types if file_type)}
+        for category in categories:
+            try:
+                await self._rebuild(category)
+            except Exception as e:
+                logging.error(f"Error refreshing {category} feed: {str(e)}")
+
+dataset_feeds = DatasetFeeds(ttl=settings.DATASET_FEED_TTL)
@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from src.database.mongodb import datasets_collection, jobs_collection, ACTIVE_DATASETS, touch_user_profile
+from src.utils.azure_storage import blob_name_from_url, delete_blob_names, delete_dataset_blobs
+from src.utils.content_store import content_store, is_content_addressed
+from src.utils.jobs import jobs, QUEUED, RUNNING
+from src.utils.logger import logging
+
+GC_JOB = "dataset_gc"
+
+async def schedule_collection(dataset_id: ObjectId, uid: Optional[str]) -> None:
+    # The job shares the dataset's id, so a dataset is never collected twice at once
+    try:
+        await jobs.enqueue(GC_JOB, {"dataset_id": str(dataset_id)}, uid=uid, job_id=dataset_id)
+    except DuplicateKeyError:
+        # A job that ran out of attempts would otherwise leave the tombstone unpurged for good
+        if await jobs.retry(dataset_id):
+            logging.info(f"Retrying failed collection of deleted dataset {dataset_id}")
+
+async def tombstone_dataset(query: dict) -> Optional[dict]:
+    """Atomically mark a live dataset deleted and schedule its storage for collection.
+
+    Returns the dataset as it was before deletion, or None if no live dataset matched.
+    """
+    dataset = await datasets_collection.find_one_and_update(
+        {**query, **ACTIVE_DATASETS},
+        {"$set": {"deleted_at": datetime.now(timezone.utc)}},
+        projection={"uid": 1, "dataset_info": 1}
+    )
+    if dataset is None:
+        return None
+    await schedule_collection(dataset["_id"], dataset.get("uid"))
+    await touch_user_profile({"uid": dataset.get("uid")})
+    return dataset
+
+async def collect_dataset(job: dict) -> dict:
+    """Release a deleted dataset's content and delete the blobs only it used.
+
+    Every step is safe to repeat; released manifests are checkpointed so a
+    retried job does not drop their references twice.
+    """
+    dataset_id = ObjectId(job["payload"]["dataset_id"])
+    dataset = await datasets_collection.find_one({"_id": dataset_id, "deleted_at": {"$ne": None}})
+    if dataset is None or dataset.get("purged_at"):
+        return {"skipped": True}
+
+    released = list(job.get("progress", {}).get("released", []))
+    for file_type, manifest_id in dataset.get("manifests", {}).items():
+        if file_type in released:
+            continue
+        await content_store.release(manifest_id)
+        released.append(file_type)
+        await jobs.checkpoint(job, released=released)
+
+    # Files uploaded before content addressing live under username/dataset_name/,
+    # which a live dataset re-uploaded under the same name would have overwritten
+    info = dataset.get("dataset_info", {})
+    username = info.get("username")
+    dataset_name = (info.get("name") or "").replace(" ", "_").lower()
+    legacy = []
+    failed = []
+    successor = await datasets_collection.find_one(
+        {"uid": dataset.get("uid"), "dataset_info.name": info.get("name"), **ACTIVE_DATASETS},
+        {"_id": 1}
+    )
+    if successor is None:
+        legacy = [
+            blob_name_from_url(url)
+            for urls in dataset.get("files", {}).values()
+            for url in urls or []
+            if not is_content_addressed(blob_name_from_url(url))
+        ]
+        failed = await delete_blob_names(legacy)
+        if username and dataset_name:
+            failed += await delete_dataset_blobs(dataset_name, username)
+    if failed:
+        raise RuntimeError(f"{len(failed)} blob(s) of dataset {dataset_id} could not be deleted")
+
+    await datasets_collection.update_one({"_id": dataset_id}, {"$set": {"purged_at": datetime.now(timezone.utc)}})
+    logging.info(f"Collected deleted dataset {dataset_id}: released {len(released)} manifest(s), deleted {len(legacy)} legacy blob(s)")
+    return {"released": released, "legacy_blobs": len(legacy)}
+
+async def requeue_pending(batch_size: int = 500) -> None:
+    """Schedule collection for tombstones whose job was lost, e.g. a crash right after the delete.
+
+    Runs in the background after startup, in batches; tombstones whose job
+    is still queued or running are left to it.
+    """
+    try:
+        pending = 0
+        last_id = None
+        while True:
+            query = {"deleted_at": {"$ne": None}, "purged_at": None}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await datasets_collection.find(query, {"uid": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            scheduled = {
+                job["_id"]
+                async for job in jobs_collection.find(
+                    {"_id": {"$in": [dataset["_id"] for dataset in batch]}, "status": {"$in": [QUEUED, RUNNING]}},
+                    {"_id": 1}
+                )
+            }
+            for dataset in batch:
+                if dataset["_id"] not in scheduled:
+                    await schedule_collection(dataset["_id"], dataset.get("uid"))
+                    pending += 1
+        if pending:
+            logging.info(f"Requeued collection of {pending} deleted dataset(s)")
+    except Exception as e:
+        logging.error(f"Error requeueing deleted datasets: {str(e)}")
+
+jobs.register(GC_JOB, collect_dataset)
@@ -0,0 +1,41 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any
+from fastapi import Request, Response
+
+# Browsers keep the body but revalidate it on every use
+CACHE_CONTROL = "private, no-cache"
+
+def _version_part(part: Any) -> Any:
+    # Mongo keeps datetimes to the millisecond and reads them back with its own
+    # UTC tzinfo; a time just written and the same time read back by another
+    # worker must give the same validator
+    if isinstance(part, datetime):
+        part = part.astimezone(timezone.utc)
+        return part.replace(microsecond=part.microsecond - part.microsecond % 1000)
+    return part
+
+def make_etag(*parts: Any) -> str:
+    """A validator derived from whatever versions the response was built from.
+
+    Weak, because the same representation may be sent gzipped or not.
+    """
+    parts = tuple(_version_part(part) for part in parts)
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -1,7 +1,24 @@
 import os
+import socket
+import tempfile
 from fastapi import UploadFile
+from src.config import settings
 from src.utils.logger import logging
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+# Every upload byte that touches disk lives under here, so it can be budgeted and swept
+SPOOL_DIR = settings.UPLOAD_SPOOL_DIR or os.path.join(BASE_DIR, "uploads", "spool")
+WORK_DIR_PREFIX = "work-"
+
+def work_dir_prefix() -> str:
+    # Host and pid let the sweeper tell a crashed worker's leftovers from live ones
+    return f"{WORK_DIR_PREFIX}{socket.gethostname()}-{os.getpid()}-"
+
+def make_work_dir() -> str:
+    """Create a scratch directory inside the upload spool."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix=work_dir_prefix(), dir=SPOOL_DIR)
+
 def ensure_directories(directory_path: str) -> bool:
     try:
         os.makedirs(directory_path, exist_ok=True)
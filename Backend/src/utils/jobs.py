@@ -0,0 +1,210 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from src.config import settings
+from src.database.mongodb import jobs_collection
+from src.utils.logger import logging
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class JobQueue:
+    """Background jobs persisted in the ``jobs`` collection.
+
+    Handlers are registered per job kind and run on asyncio worker tasks in
+    every API process. A worker claims a job by atomically moving it to
+    ``running`` with a lease it keeps renewing; if the process dies, the
+    lease lapses and another worker (or this one after a restart) picks the
+    job up again. Handlers must therefore be safe to re-run, and can store
+    progress with ``checkpoint`` to skip finished steps.
+    """
+
+    def __init__(self, workers: int = 2, poll_interval: float = 2, lease_seconds: int = 300, max_attempts: int = 3):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_hooks: Dict[str, JobHandler] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[JobHandler] = None) -> None:
+        """Register the coroutine that runs ``kind`` jobs; ``on_failure`` runs once retries are exhausted."""
+        self._handlers[kind] = handler
+        if on_failure:
+            self._failure_hooks[kind] = on_failure
+
+    async def enqueue(self, kind: str, payload: dict, uid: Optional[str] = None, job_id: Optional[ObjectId] = None) -> str:
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": job_id or ObjectId(),
+            "kind": kind,
+            "uid": uid,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "progress": {},
+            "run_after": now,
+            "created_at": now,
+            "updated_at": now
+        }
+        await jobs_collection.insert_one(job)
+        if self._wakeup:
+            self._wakeup.set()
+        logging.info(f"Enqueued {kind} job {job['_id']}")
+        return str(job["_id"])
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await jobs_collection.find_one({"_id": ObjectId(job_id)}, {"payload": 0})
+
+    async def retry(self, job_id: ObjectId) -> bool:
+        """Queue a failed job again with fresh attempts; its progress is kept."""
+        now = datetime.now(timezone.utc)
+        result = await jobs_collection.update_one(
+            {"_id": job_id, "status": FAILED},
+            {
+                "$set": {"status": QUEUED, "attempts": 0, "run_after": now, "updated_at": now},
+                "$unset": {"finished_at": ""}
+            }
+        )
+        if result.modified_count and self._wakeup:
+            self._wakeup.set()
+        return result.modified_count > 0
+
+    async def checkpoint(self, job: dict, **progress) -> None:
+        """Persist handler progress so a retried job can resume where it stopped."""
+        job.setdefault("progress", {}).update(progress)
+        await jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {**{f"progress.{key}": value for key, value in progress.items()}, "updated_at": datetime.now(timezone.utc)}}
+        )
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await jobs_collection.find_one_and_update(
+            {
+                "kind": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": QUEUED, "run_after": {"$lte": now}},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "worker": self.worker_id,
+                    "started_at": now,
+                    "updated_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _heartbeat(self, job_id: ObjectId) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await jobs_collection.update_one(
+                    {"_id": job_id, "status": RUNNING, "worker": self.worker_id},
+                    {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logging.warning(f"Could not renew lease for job {job_id}: {str(e)}")
+
+    async def _finish(self, job: dict, status: str, **fields) -> None:
+        now = datetime.now(timezone.utc)
+        await jobs_collection.update_one(
+            {"_id": job["_id"], "worker": self.worker_id},
+            {
+                "$set": {"status": status, "updated_at": now, "finished_at": now, **fields},
+                "$unset": {"lease_expires_at": ""}
+            }
+        )
+
+    async def _run(self, job: dict) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job["_id"]))
+        try:
+            result = await self._handlers[job["kind"]](job)
+            await self._finish(job, SUCCEEDED, result=result or {}, error=None)
+            logging.info(f"Job {job['_id']} ({job['kind']}) succeeded")
+        except asyncio.CancelledError:
+            # Shutting down; hand the job straight back instead of waiting for the lease
+            await jobs_collection.update_one(
+                {"_id": job["_id"], "worker": self.worker_id},
+                {"$set": {"status": QUEUED, "updated_at": datetime.now(timezone.utc)}, "$inc": {"attempts": -1}}
+            )
+            raise
+        except Exception as e:
+            logging.error(f"Job {job['_id']} ({job['kind']}) attempt {job['attempts']} failed: {str(e)}")
+            if job["attempts"] < self.max_attempts:
+                now = datetime.now(timezone.utc)
+                await jobs_collection.update_one(
+                    {"_id": job["_id"], "worker": self.worker_id},
+                    {"$set": {
+                        "status": QUEUED,
+                        "error": str(e),
+                        "updated_at": now,
+                        "run_after": now + timedelta(seconds=min(30 * job["attempts"], 600))
+                    }}
+                )
+                return
+            await self._finish(job, FAILED, error=str(e))
+            hook = self._failure_hooks.get(job["kind"])
+            if hook:
+                try:
+                    await hook(job)
+                except Exception as hook_error:
+                    logging.error(f"Failure hook for job {job['_id']} failed: {str(hook_error)}")
+        finally:
+            heartbeat.cancel()
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logging.error(f"Error claiming job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"Started {self.workers} job worker(s) as {self.worker_id}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+jobs = JobQueue(
+    workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
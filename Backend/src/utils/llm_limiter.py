@@ -0,0 +1,152 @@
+import asyncio
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from src.config import settings
+from src.utils.logger import logging
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call cannot be queued; the API maps it to 429."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Too many chat requests in progress, please retry shortly")
+        self.retry_after = retry_after
+
+class LLMLimiter:
+    """Per-process admission control for outbound LLM calls.
+
+    At most ``max_in_flight`` calls run at once and each user may hold at most
+    ``per_user_in_flight`` of them. Up to ``max_queue`` further calls wait and
+    are admitted round-robin across users, so one busy user cannot starve the
+    rest; beyond that, requests are shed immediately. Identical in-flight
+    requests can also be coalesced onto a single generation.
+    """
+
+    def __init__(self, max_in_flight: int = 16, max_queue: int = 64, per_user_in_flight: int = 2, queue_timeout: float = 30):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.per_user_in_flight = per_user_in_flight
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._user_in_flight: Dict[str, int] = defaultdict(int)
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._queued = 0
+        self._shared: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.queue_timeout // 2))
+
+    def _can_run(self, uid: str) -> bool:
+        return self._in_flight < self.max_in_flight and self._user_in_flight.get(uid, 0) < self.per_user_in_flight
+
+    def _grant(self, uid: str) -> None:
+        self._in_flight += 1
+        self._user_in_flight[uid] += 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting users in round-robin order."""
+        progressed = True
+        while progressed and self._in_flight < self.max_in_flight:
+            progressed = False
+            for uid in list(self._waiters):
+                if self._user_in_flight.get(uid, 0) >= self.per_user_in_flight:
+                    continue
+                waiters = self._waiters[uid]
+                future = waiters.popleft()
+                self._queued -= 1
+                if waiters:
+                    self._waiters.move_to_end(uid)
+                else:
+                    del self._waiters[uid]
+                if future.done():
+                    progressed = True
+                    break
+                self._grant(uid)
+                future.set_result(None)
+                progressed = True
+                break
+
+    def _remove_waiter(self, uid: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(uid)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._waiters[uid]
+
+    async def acquire(self, uid: str) -> None:
+        if self._can_run(uid):
+            self._grant(uid)
+            return
+
+        if self._queued >= self.max_queue:
+            logging.warning(f"LLM queue full ({self._queued} waiting), shedding request for UID: {uid}")
+            raise LLMOverloadedError(self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(uid, deque()).append(future)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we gave up, so pass it on
+                self.release(uid)
+            else:
+                self._remove_waiter(uid, future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise LLMOverloadedError(self.retry_after)
+            raise
+
+    def release(self, uid: str) -> None:
+        self._in_flight -= 1
+        self._user_in_flight[uid] -= 1
+        if self._user_in_flight[uid] <= 0:
+            del self._user_in_flight[uid]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, uid: str):
+        await self.acquire(uid)
+        try:
+            yield
+        finally:
+            self.release(uid)
+
+    def join(self, key: str) -> Optional[asyncio.Future]:
+        """Return the shared result of an identical in-flight request, if any."""
+        future = self._shared.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def lead(self, key: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._shared[key] = future
+        return future
+
+    def finish(self, key: str, future: asyncio.Future, result: Optional[str]) -> None:
+        """Publish the leader's reply; ``None`` tells followers it failed."""
+        if self._shared.get(key) is future:
+            del self._shared[key]
+        if not future.done():
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "coalescing": len(self._shared),
+            "coalesced_total": self.coalesced,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue
+        }
+
+llm_limiter = LLMLimiter(
+    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+    max_queue=settings.LLM_MAX_QUEUE,
+    per_user_in_flight=settings.LLM_MAX_IN_FLIGHT_PER_USER,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT
+)
@@ -0,0 +1,148 @@
+import asyncio
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from src.config import settings
+from src.database.mongodb import popularity_collection, popularity_read_collection
+from src.utils.logger import logging
+
+HOUR_FORMAT = "%Y%m%d%H"
+TRENDING_CACHE_TTL = 60
+EVENT_WEIGHTS = {"clicks": 1.0, "downloads": 5.0}
+
+class PopularityTracker:
+    """Usage counters and trending scores for datasets and prompts.
+
+    ``record`` only bumps an in-memory counter, so click endpoints do no I/O.
+    A background loop flushes the buffer as one unordered bulk of ``$inc``
+    upserts (totals plus hourly buckets), and a slower loop turns the hourly
+    buckets into exponentially decayed ``trending_score`` values.
+    """
+
+    def __init__(self, flush_interval: float = 5, trending_interval: float = 300, half_life_hours: float = 24, window_days: int = 7):
+        self.flush_interval = flush_interval
+        self.trending_interval = trending_interval
+        self.half_life_hours = half_life_hours
+        self.window_days = window_days
+        self._pending: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        self._labels: Dict[Tuple[str, str], dict] = {}
+        self._trending: Dict[str, Tuple[float, int, List[dict]]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def record(self, kind: str, item_id: str, event: str, labels: Optional[dict] = None) -> None:
+        key = (kind, item_id)
+        self._pending[key][event] += 1
+        if labels:
+            self._labels[key] = labels
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, defaultdict(Counter)
+        labels, self._labels = self._labels, {}
+
+        now = datetime.now(timezone.utc)
+        hour = now.strftime(HOUR_FORMAT)
+        operations = []
+        for (kind, item_id), counts in pending.items():
+            increments = {}
+            for event, count in counts.items():
+                increments[event] = count
+                increments[f"hourly.{hour}.{event}"] = count
+            operations.append(UpdateOne(
+                {"_id": f"{kind}:{item_id}"},
+                {
+                    "$inc": increments,
+                    "$set": {"kind": kind, "item_id": item_id, "last_event_at": now, **labels.get((kind, item_id), {})}
+                },
+                upsert=True
+            ))
+
+        try:
+            await popularity_collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logging.error(f"Error flushing popularity events: {str(e)}")
+            # Put the counts back so the next flush retries them
+            for key, counts in pending.items():
+                self._pending[key].update(counts)
+            for key, value in labels.items():
+                self._labels.setdefault(key, value)
+
+    def _score(self, hourly: dict, now: datetime) -> float:
+        score = 0.0
+        for hour, counts in hourly.items():
+            bucket = datetime.strptime(hour, HOUR_FORMAT).replace(tzinfo=timezone.utc)
+            age_hours = max((now - bucket).total_seconds() / 3600, 0)
+            weight = sum(EVENT_WEIGHTS.get(event, 0) * count for event, count in counts.items())
+            score += weight * math.pow(0.5, age_hours / self.half_life_hours)
+        return score
+
+    async def recompute_trending(self) -> None:
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.window_days)
+        cutoff_hour = cutoff.strftime(HOUR_FORMAT)
+
+        operations = []
+        # Items with no recent events still carry a stale score, so include them once more
+        cursor = popularity_collection.find(
+            {"$or": [{"last_event_at": {"$gte": cutoff}}, {"trending_score": {"$gt": 0}}]},
+            {"hourly": 1}
+        )
+        async for doc in cursor:
+            hourly = doc.get("hourly", {})
+            expired = [hour for hour in hourly if hour < cutoff_hour]
+            live = {hour: counts for hour, counts in hourly.items() if hour >= cutoff_hour}
+            update = {"$set": {"trending_score": round(self._score(live, now), 4)}}
+            if expired:
+                update["$unset"] = {f"hourly.{hour}": "" for hour in expired}
+            operations.append(UpdateOne({"_id": doc["_id"]}, update))
+
+        if operations:
+            await popularity_collection.bulk_write(operations, ordered=False)
+        self._trending.clear()
+        logging.info(f"Recomputed trending scores for {len(operations)} item(s)")
+
+    async def trending(self, kind: str, limit: int = 20) -> List[dict]:
+        cached = self._trending.get(kind)
+        if cached and cached[0] > time.monotonic() and cached[1] >= limit:
+            return cached[2][:limit]
+
+        fetch_limit = max(limit, 50)
+        items = await popularity_read_collection.find(
+            {"kind": kind, "trending_score": {"$gt": 0}},
+            {"_id": 0, "hourly": 0}
+        ).sort("trending_score", -1).limit(fetch_limit).to_list(None)
+
+        self._trending[kind] = (time.monotonic() + TRENDING_CACHE_TTL, fetch_limit, items)
+        return items[:limit]
+
+    async def _run_every(self, interval: float, job) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await job()
+            except Exception as e:
+                logging.error(f"Popularity background job failed: {str(e)}")
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run_every(self.flush_interval, self.flush)),
+            asyncio.create_task(self._run_every(self.trending_interval, self.recompute_trending))
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.flush()
+
+popularity = PopularityTracker(
+    flush_interval=settings.POPULARITY_FLUSH_INTERVAL,
+    trending_interval=settings.TRENDING_RECOMPUTE_INTERVAL,
+    half_life_hours=settings.TRENDING_HALF_LIFE_HOURS,
+    window_days=settings.TRENDING_WINDOW_DAYS
+)
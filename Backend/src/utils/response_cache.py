@@ -0,0 +1,101 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional
+from cachetools import TTLCache
+from src.config import settings
+
+if TYPE_CHECKING:
+    import numpy as np
+
+@dataclass
+class CachedResponse:
+    scope: str
+    text: str
+    latency: float
+    embedding: Optional["np.ndarray"] = None
+
+def normalize_message(message: str) -> str:
+    # Case, whitespace and trailing punctuation rarely change the answer
+    return re.sub(r"\s+", " ", message).strip().rstrip("?!.").lower()
+
+class ResponseCache:
+    """TTL/size-bounded cache of complete chat replies.
+
+    Entries are keyed by the normalized message plus the model and system
+    prompt, so a prompt change never serves stale answers. When embeddings
+    are supplied, near-duplicate messages within the same scope are matched
+    by cosine similarity.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: int = 3600, similarity_threshold: float = 0.95):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+
+    @staticmethod
+    def scope(model: str, system_prompt: str) -> str:
+        return hashlib.sha256(f"{model}\x00{system_prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(scope: str, message: str) -> str:
+        return hashlib.sha256(f"{scope}\x00{normalize_message(message)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        self.saved_latency += entry.latency
+        return entry.text
+
+    def get_similar(self, scope: str, embedding: List[float]) -> Optional[str]:
+        candidates = [e for e in list(self._entries.values()) if e.scope == scope and e.embedding is not None]
+        if not candidates:
+            return None
+
+        # Only chat uses embeddings, and the bot has loaded numpy by then
+        import numpy as np
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        matrix = np.stack([e.embedding for e in candidates])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        entry = candidates[best]
+        self.semantic_hits += 1
+        self.saved_latency += entry.latency
+        return entry.text
+
+    def put(self, key: str, scope: str, text: str, latency: float, embedding: Optional[List[float]] = None) -> None:
+        vector = None
+        if embedding is not None:
+            import numpy as np
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        self._entries[key] = CachedResponse(scope=scope, text=text, latency=latency, embedding=vector)
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_latency, 3)
+        }
+
+response_cache = ResponseCache(
+    maxsize=settings.CHAT_CACHE_MAX_SIZE,
+    ttl=settings.CHAT_CACHE_TTL,
+    similarity_threshold=settings.CHAT_CACHE_SIMILARITY_THRESHOLD
+)
@@ -0,0 +1,33 @@
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Stored datetimes are UTC; naive ones (from pydantic defaults) are marked as such
+DUMPS_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+def _default(obj: Any) -> Any:
+    # Only called for types orjson does not handle natively
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serialize API payloads, including raw Mongo documents, in a single pass."""
+    return orjson.dumps(content, default=_default, option=DUMPS_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    Returning one of these from an endpoint skips FastAPI's
+    ``jsonable_encoder`` walk entirely; ObjectId and datetime values are
+    encoded as they are written out.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+import socket
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from src.config import settings
+from src.database.mongodb import jobs_collection
+from src.utils.file_handlers import SPOOL_DIR, WORK_DIR_PREFIX
+from src.utils.logger import logging
+
+# Jobs that keep a spool directory until they finish
+SPOOLING_JOBS = ["dataset_upload", "dataset_edit"]
+SPOOL_POLL_INTERVAL = 1.0
+
+class UploadRejectedError(Exception):
+    """An upload could not be admitted; the API maps it to ``status_code`` with Retry-After."""
+
+    def __init__(self, detail: str, status_code: int = 503, retry_after: int = 30):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class UploadAdmission:
+    """Bounds the bytes and per-user concurrency of uploads in flight.
+
+    Each upload request reserves its size from a byte budget before its body
+    is read. The budget also covers files already spooled: an upload or edit
+    job holds its ``spool_bytes`` until it finishes and removes its spool.
+    Requests that do not fit wait up to ``queue_timeout`` for earlier uploads
+    to finish, then are rejected with Retry-After.
+    """
+
+    def __init__(self, byte_budget: int, max_request_bytes: int, per_user: int = 2, queue_timeout: float = 30, min_free_bytes: int = 0):
+        self.byte_budget = byte_budget
+        self.max_request_bytes = max_request_bytes
+        self.per_user = per_user
+        self.queue_timeout = queue_timeout
+        self.min_free_bytes = min_free_bytes
+        self.reserved = 0
+        self.rejected = 0
+        self._user_in_flight = defaultdict(int)
+        self._changed = asyncio.Condition()
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, int(self.queue_timeout))
+
+    def _disk_has_room(self, size: int) -> bool:
+        try:
+            os.makedirs(SPOOL_DIR, exist_ok=True)
+            return shutil.disk_usage(SPOOL_DIR).free - size >= self.min_free_bytes
+        except OSError as e:
+            logging.warning(f"Could not check free space in {SPOOL_DIR}: {str(e)}")
+            return True
+
+    def _reject(self, detail: str, status_code: int = 503) -> UploadRejectedError:
+        self.rejected += 1
+        logging.warning(f"Upload rejected: {detail}")
+        return UploadRejectedError(detail, status_code, self.retry_after)
+
+    async def _spooled_bytes(self) -> int:
+        """Bytes spooled by upload and edit jobs that have not finished yet."""
+        result = await jobs_collection.aggregate([
+            {"$match": {"kind": {"$in": SPOOLING_JOBS}, "status": {"$in": ["queued", "running"]}}},
+            {"$group": {"_id": None, "bytes": {"$sum": "$payload.spool_bytes"}}}
+        ]).to_list(1)
+        return result[0]["bytes"] if result else 0
+
+    async def reserve(self, size: int) -> None:
+        limit = min(self.max_request_bytes, self.byte_budget)
+        if size > limit:
+            raise self._reject(f"Upload of {size} bytes exceeds the {limit} byte limit", 413)
+        if not self._disk_has_room(size):
+            raise self._reject("Not enough free space to accept this upload right now")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        while True:
+            spooled = await self._spooled_bytes()
+            async with self._changed:
+                if self.reserved + spooled + size <= self.byte_budget:
+                    self.reserved += size
+                    return
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise self._reject("Too many uploads in progress, please retry shortly")
+                # Jobs finishing in other workers free spool bytes without notifying us, so poll too
+                try:
+                    await asyncio.wait_for(self._changed.wait(), min(remaining, SPOOL_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, size: int) -> None:
+        async with self._changed:
+            self.reserved -= size
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def user_slot(self, uid: str):
+        """Hold one of the user's ``per_user`` upload slots.
+
+        Uploads still being processed as jobs count against the limit too.
+        """
+        # Reserve before awaiting, so concurrent requests from the same user see each other
+        self._user_in_flight[uid] += 1
+        try:
+            active = self._user_in_flight[uid] - 1 + await jobs_collection.count_documents(
+                {"uid": uid, "kind": {"$in": SPOOLING_JOBS}, "status": {"$in": ["queued", "running"]}}
+            )
+            if active >= self.per_user:
+                raise self._reject(f"You already have {active} uploads in progress, please wait for one to finish", 429)
+            yield
+        finally:
+            self._user_in_flight[uid] -= 1
+            if self._user_in_flight[uid] <= 0:
+                del self._user_in_flight[uid]
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _orphaned_work_dir(name: str, path: str, max_age: float) -> bool:
+    # work-<host>-<pid>-<random>; hostnames may contain dashes, so split from the right
+    parts = name[len(WORK_DIR_PREFIX):].rsplit("-", 2)
+    if len(parts) == 3 and parts[0] == socket.gethostname() and parts[1].isdigit():
+        return not _pid_alive(int(parts[1]))
+    return time.time() - os.path.getmtime(path) > max_age
+
+async def sweep_spool(max_age: float) -> None:
+    """Remove spool directories left behind by crashed workers or finished jobs."""
+    if not os.path.isdir(SPOOL_DIR):
+        return
+    removed = 0
+    grace = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    for name in os.listdir(SPOOL_DIR):
+        path = os.path.join(SPOOL_DIR, name)
+        if not os.path.isdir(path):
+            continue
+        try:
+            if name.startswith(WORK_DIR_PREFIX):
+                orphaned = _orphaned_work_dir(name, path, max_age)
+            elif ObjectId.is_valid(name):
+                # Job spools are kept while their job may still run; a job that was never
+                # enqueued is only given up on after the grace period
+                job = await jobs_collection.find_one({"_id": ObjectId(name)}, {"status": 1})
+                if job is None:
+                    orphaned = ObjectId(name).generation_time < grace
+                else:
+                    orphaned = job["status"] in ("succeeded", "failed")
+            else:
+                continue
+            if orphaned:
+                await asyncio.to_thread(shutil.rmtree, path, True)
+                removed += 1
+        except Exception as e:
+            logging.error(f"Error sweeping spool directory {path}: {str(e)}")
+    logging.info(f"Spool sweep removed {removed} orphaned director{'y' if removed == 1 else 'ies'}")
+
+upload_admission = UploadAdmission(
+    byte_budget=settings.UPLOAD_BYTE_BUDGET,
+    max_request_bytes=settings.UPLOAD_MAX_REQUEST_BYTES,
+    per_user=settings.UPLOAD_MAX_CONCURRENT_PER_USER,
+    queue_timeout=settings.UPLOAD_QUEUE_TIMEOUT,
+    min_free_bytes=settings.UPLOAD_MIN_FREE_BYTES
+)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+# Settings are read when src.config is imported; nothing here connects to them
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("UPLOAD_SPOOL_DIR", tempfile.mkdtemp(prefix="vecem-test-spool-"))
+os.environ.setdefault(
+    "AZURE_STORAGE_CONNECTION_STRING",
+    "DefaultEndpointsProtocol=https;AccountName=vecem;AccountKey=dGVzdA==;EndpointSuffix=core.windows.net"
+)
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables.history import RunnableWithMessageHistory
+
+def make_bot(replies, uid: str = "test-user"):
+    """A FRIDAY session backed by a fake streaming model and in-memory history."""
+    from src.bot import FRIDAY
+    bot = FRIDAY(uid)
+    bot.api_key = "test-key"
+    bot.model = GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+    histories = {}
+    bot.get_session_history = lambda session_id: histories.setdefault(session_id, InMemoryChatMessageHistory())
+    bot.chain = RunnableWithMessageHistory(
+        bot.setup_chain(),
+        bot.get_session_history,
+        input_messages_key="input",
+        history_messages_key="history"
+    )
+    return bot
+
+@pytest.fixture
+def fake_bot():
+    """Build FRIDAY sessions backed by a fake streaming model."""
+    return make_bot
+
+@pytest.fixture
+def uncached(monkeypatch):
+    """Send every chat request to the model, bypassing the response cache."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "CHAT_CACHE_ENABLED", False)
+
+@pytest.fixture
+def pooled_bot(monkeypatch):
+    """Install a fake bot as every user's pooled chat session."""
+    from src.utils.chat_sessions import chat_sessions
+
+    def install(replies):
+        bot = make_bot(replies)
+
+        async def get_session(uid):
+            return bot
+
+        monkeypatch.setattr(chat_sessions, "get_session", get_session)
+        return bot
+
+    return install
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Point every collection, primary and read, at one in-memory database."""
+    from src.config import settings
+    from src.database import mongodb
+    # tz_aware like the real clients, so datetimes read back compare equal to the ones written
+    client = AsyncMongoMockClient(tz_aware=True)
+    for name in ("client", "read_client"):
+        monkeypatch.setattr(mongodb, name, client)
+    for name in ("db", "read_db"):
+        monkeypatch.setattr(mongodb, name, client[settings.DATABASE_NAME])
+    return mongodb
+
+class FakeContainer:
+    """A blob container kept in memory, with the calls the content store makes."""
+
+    url = "https://vecem.blob.core.windows.net/datasets"
+
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, name):
+        container = self
+
+        class Blob:
+            url = f"{container.url}/{name}"
+
+            def upload_blob(self, data, overwrite=False, **kwargs):
+                container.blobs[name] = data.read()
+
+        return Blob()
+
+    def download_blob(self, name):
+        data = self.blobs[name]
+
+        class Download:
+            def readinto(self, out):
+                return out.write(data)
+
+        return Download()
+
+    def delete_batch(self, names):
+        for name in names:
+            self.blobs.pop(name, None)
+        return []
+
+@pytest.fixture
+def blob_storage(monkeypatch):
+    """Serve blob storage from memory and run archive builds inline."""
+    from src.utils import azure_storage, content_store
+    from src.utils.archiver import archiver
+    container = FakeContainer()
+    monkeypatch.setattr(content_store, "get_container_client", lambda: container)
+    monkeypatch.setattr(azure_storage, "_delete_batch", container.delete_batch)
+
+    async def run_inline(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(archiver, "run", run_inline)
+    return container
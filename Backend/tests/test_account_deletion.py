@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime, timezone
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from src.main import app
+from src.utils import account_deletion
+from src.utils.dataset_feeds import dataset_feeds
+from src.utils.jobs import jobs
+
+def test_account_deletion_job_removes_what_the_account_owns(mongo, blob_storage, monkeypatch):
+    monkeypatch.setattr(dataset_feeds, "ttl", 0)
+    monkeypatch.setattr(dataset_feeds, "_snapshot", {})
+    monkeypatch.setattr(account_deletion, "list_blob_names", lambda prefix: [f"{prefix}legacy.csv"])
+    blob_storage.blobs["bob/legacy.csv"] = b"old"
+    own, other = ObjectId(), ObjectId()
+
+    async def seed():
+        await mongo.user_profile_collection.insert_one({"uid": "u1", "username": "bob"})
+        await mongo.datasets_collection.insert_many([
+            {"_id": own, "uid": "u1", "dataset_info": {"name": "mine", "file_type": "text"}, "timestamp": datetime.now(timezone.utc), "deleted_at": None},
+            {"_id": other, "uid": "u2", "dataset_info": {"name": "theirs", "file_type": "text"}, "timestamp": datetime.now(timezone.utc), "deleted_at": None}
+        ])
+        await mongo.prompts_collection.insert_one({"username": "bob", "prompt_name": "p"})
+        await mongo.chat_history_collection.insert_one({"uid": "u1", "session_id": "s1", "messages": []})
+        await mongo.issues_collection.insert_many([{"uid": "u1", "description": "mine"}, {"uid": "u2", "description": "theirs"}])
+        await dataset_feeds.refresh("text")
+
+    asyncio.run(seed())
+    client = TestClient(app)
+
+    first = client.delete("/delete-account/u1").json()
+    # Asking again reports the same job instead of starting another
+    assert client.delete("/delete-account/u1").json()["job_id"] == first["job_id"]
+
+    async def run_deletion():
+        await jobs._run(await jobs._claim())
+        return (
+            await jobs.get(first["job_id"]),
+            await mongo.datasets_collection.find_one({"_id": own}),
+            await mongo.issues_collection.find({}, {"_id": 0, "uid": 1, "description": 1}).sort("description", 1).to_list(None),
+            await jobs.get(own)
+        )
+
+    job, dataset, issues, gc_job = asyncio.run(run_deletion())
+    assert job["status"] == "succeeded"
+    assert job["result"]["counts"] == {"datasets": 1, "prompts": 1, "chat_history": 1, "community": 1, "blobs": 1, "profile": 1}
+    assert dataset["deleted_at"] is not None and gc_job["kind"] == "dataset_gc"
+    assert issues == [{"uid": None, "description": "mine"}, {"uid": "u2", "description": "theirs"}]
+    assert "bob/legacy.csv" not in blob_storage.blobs
+    assert client.get("/user-profile/u1").status_code == 404
+    # The feeds no longer list the account's datasets
+    feed = client.get("/dataset-category/text").json()["datasets"]
+    assert [item["dataset_info"]["name"] for item in feed] == ["theirs"]
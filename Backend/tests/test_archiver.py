@@ -0,0 +1,39 @@
+import asyncio
+import hashlib
+import os
+import zipfile
+import pytest
+from src.utils.archiver import Archiver
+
+def test_archives_are_built_in_the_pool_and_deterministic(tmp_path):
+    files = {
+        "rows.csv": b"id,text\n" + b"1,hello world\n" * 2000,
+        "vectors.npy": b"\x93NUMPY" + bytes(range(256)) * 20,
+        "noise.bin": os.urandom(8192)
+    }
+    entries = []
+    for path, content in files.items():
+        (tmp_path / path).write_bytes(content)
+        entries.append({"path": path, "local": str(tmp_path / path), "sha256": "unused", "size": len(content)})
+    archiver = Archiver(max_workers=1)
+
+    async def build_twice():
+        try:
+            return [await archiver.build(entries, str(tmp_path / name)) for name in ("a.zip", "b.zip")]
+        finally:
+            archiver.shutdown()
+
+    first, second = asyncio.run(build_twice())
+    assert first == second
+    data = (tmp_path / "a.zip").read_bytes()
+    assert first == {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+    with zipfile.ZipFile(tmp_path / "a.zip") as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == files
+        compression = {info.filename: info.compress_type for info in archive.infolist()}
+    # Row data is deflated; already-dense formats and incompressible bytes are stored
+    assert compression == {"noise.bin": zipfile.ZIP_STORED, "rows.csv": zipfile.ZIP_DEFLATED, "vectors.npy": zipfile.ZIP_STORED}
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError, match="Unknown archive codec"):
+        Archiver(codec="rar")
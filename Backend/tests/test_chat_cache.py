@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.config import settings
+from src.main import app
+from src.utils.response_cache import ResponseCache
+
+@pytest.fixture
+def cache(monkeypatch):
+    """An empty response cache, enabled for the test."""
+    monkeypatch.setattr(settings, "CHAT_CACHE_ENABLED", True)
+    cache = ResponseCache()
+    monkeypatch.setattr("src.bot.response_cache", cache)
+    return cache
+
+def test_new_conversation_opening_prompt_hits_cache(pooled_bot, cache):
+    # Only one reply is scripted, so a second generation would fail
+    pooled_bot(["Vecora writes **concise** system prompts."])
+    client = TestClient(app)
+
+    first = client.post("/chat", json={"message": "What do you do?", "uid": "test-user"}).json()
+    second = client.post("/chat", json={"message": "what do you do? ", "uid": "test-user"}).json()
+
+    assert first["session_id"] != second["session_id"]
+    assert first["response"] == second["response"] == "Vecora writes concise system prompts."
+    assert cache.stats()["hits"] == 1
+
+def test_follow_up_turn_is_not_served_from_cache(pooled_bot, cache):
+    pooled_bot(["Hello!", "Here is a prompt for a support agent."])
+    client = TestClient(app)
+
+    opening = client.post("/chat", json={"message": "hi", "uid": "test-user"}).json()
+    # The same text later in a conversation depends on the earlier turns
+    client.post("/chat", json={"message": "hi", "uid": "test-user", "session_id": opening["session_id"]})
+
+    assert cache.stats()["hits"] == 0
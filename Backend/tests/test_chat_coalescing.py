@@ -0,0 +1,31 @@
+import asyncio
+from src.utils.llm_limiter import LLMOverloadedError, llm_limiter
+
+def test_identical_requests_share_one_generation_without_cache(fake_bot, uncached):
+    # Only one reply is scripted, so a second generation would fail
+    bot = fake_bot(["A prompt for a travel agent."])
+    coalesced = llm_limiter.coalesced
+
+    async def ask_twice():
+        return await asyncio.gather(
+            bot.get_response("Write a travel agent prompt", "first"),
+            bot.get_response("write a travel agent prompt", "second")
+        )
+
+    assert asyncio.run(ask_twice()) == ["A prompt for a travel agent."] * 2
+    assert llm_limiter.coalesced == coalesced + 1
+
+def test_follower_of_failed_leader_is_told_to_retry(fake_bot, uncached):
+    # No scripted replies: the leading generation fails
+    bot = fake_bot([])
+
+    async def ask_twice():
+        return await asyncio.gather(
+            bot.stream_response("hello", "first").__anext__(),
+            bot.get_response("hello", "second"),
+            return_exceptions=True
+        )
+
+    leader, follower = asyncio.run(ask_twice())
+    assert not isinstance(leader, str)
+    assert isinstance(follower, LLMOverloadedError)
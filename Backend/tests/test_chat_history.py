@@ -0,0 +1,44 @@
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from src.utils.chat_history import MongoChatMessageHistory
+
+def turn(i):
+    return [HumanMessage(content=f"question {i}"), AIMessage(content=f"answer {i}")]
+
+def test_old_turns_are_summarized_and_the_window_reloads(mongo):
+    summarized = []
+
+    async def summarizer(summary, dropped):
+        summarized.append([m.content for m in dropped])
+        return f"{summary} {len(dropped)} earlier messages".strip()
+
+    def history():
+        return MongoChatMessageHistory("u1", "s1", max_turns=2, max_stored_messages=4, summarizer=summarizer)
+
+    async def scenario():
+        session = history()
+        for i in range(1, 4):
+            await session.aadd_messages(turn(i))
+        await session._summary_task
+        stored = await mongo.chat_history_collection.find_one({"uid": "u1", "session_id": "s1"})
+        # A new worker picking up the conversation reads the same window
+        return session.messages, await history().aget_messages(), stored
+
+    in_memory, reloaded, stored = asyncio.run(scenario())
+    assert summarized == [["question 1", "answer 1"]]
+    for messages in (in_memory, reloaded):
+        assert isinstance(messages[0], SystemMessage) and "2 earlier messages" in messages[0].content
+        assert [m.content for m in messages[1:]] == ["question 2", "answer 2", "question 3", "answer 3"]
+    # Storage is capped at max_stored_messages
+    assert [m["data"]["content"] for m in stored["messages"]] == ["question 2", "answer 2", "question 3", "answer 3"]
+
+def test_token_budget_keeps_at_least_the_latest_turn(mongo):
+    session = MongoChatMessageHistory("u1", "s2", max_turns=10, token_budget=20)
+    long_turn = [HumanMessage(content="x" * 200), AIMessage(content="y" * 200)]
+
+    async def scenario():
+        await session.aadd_messages(turn(1))
+        await session.aadd_messages(long_turn)
+        return await session.aget_messages()
+
+    assert asyncio.run(scenario()) == long_turn
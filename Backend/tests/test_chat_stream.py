@@ -0,0 +1,64 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from src.main import app, chat_stream_endpoint, ChatMessage
+from src.utils.llm_limiter import llm_limiter
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+def test_stream_sends_deltas_then_done(pooled_bot, uncached):
+    pooled_bot(["hello there friend"])
+
+    # Without the lifespan, so no database or storage is contacted
+    response = TestClient(app).post("/chat/stream", json={"message": "hi", "uid": "test-user", "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    deltas = [data["text"] for event, data in events if event == "message"]
+    # The fake model streams word by word; separators must survive
+    assert len(deltas) > 1
+    assert "".join(deltas) == "hello there friend"
+    assert events[-1] == ("done", {"session_id": "s1"})
+
+def test_stream_closes_upstream_on_disconnect(pooled_bot, uncached, monkeypatch):
+    bot = pooled_bot(["one two three four five six"])
+    closed = asyncio.Event()
+    stream_response = bot.stream_response
+
+    async def tracked_stream(*args, **kwargs):
+        try:
+            async for chunk in stream_response(*args, **kwargs):
+                yield chunk
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(bot, "stream_response", tracked_stream)
+
+    class DisconnectingRequest:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls > 1
+
+    async def consume():
+        response = await chat_stream_endpoint(
+            ChatMessage(message="count", uid="test-user", session_id="s2"),
+            DisconnectingRequest()
+        )
+        return [chunk async for chunk in response.body_iterator]
+
+    body = "".join(asyncio.run(consume()))
+    events = parse_events(body)
+    assert closed.is_set()
+    assert "done" not in [event for event, _ in events]
+    assert "".join(data["text"] for _, data in events) != "one two three four five six"
+    # The model stream was torn down, so its limiter slot is free again
+    assert llm_limiter.stats()["in_flight"] == 0
@@ -0,0 +1,50 @@
+import asyncio
+from bson import ObjectId
+from src.utils.community_stream import CommunityBroadcaster
+
+def test_stream_replays_posts_after_the_cursor_then_live_events(mongo):
+    broadcaster = CommunityBroadcaster(queue_size=10, keepalive=0.01)
+    seen, new, reply = ObjectId(), ObjectId(), ObjectId()
+
+    async def scenario():
+        await mongo.user_profile_collection.insert_one({"uid": "u2", "name": "Ada"})
+        await mongo.issues_collection.insert_many([
+            {"_id": seen, "description": "seen", "uid": "u1"},
+            {"_id": new, "description": "new", "uid": "u1", "author": {"name": "Bob"}}
+        ])
+        await mongo.replies_collection.insert_one({"_id": reply, "issue_id": str(new), "description": "reply", "uid": "u2"})
+
+        async def is_disconnected():
+            return False
+
+        stream = broadcaster.stream("issue", seen, is_disconnected)
+        chunks = [await anext(stream) for _ in range(3)]
+        # A live event for a post the catch-up already sent is not sent twice
+        await broadcaster.publish("issue", "message", {"id": str(new)})
+        await broadcaster.publish("issue", "message", {"id": "live"})
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return chunks
+
+    retry, message, replied, live = asyncio.run(scenario())
+    assert retry == "retry: 3000\n\n"
+    assert message.startswith(f"id: {new}\nevent: message\n") and '"userName":"Bob"' in message
+    assert replied.startswith(f"id: {reply}\nevent: reply\n") and '"userName":"Ada"' in replied
+    assert live.startswith("id: live\n")
+    assert broadcaster.subscriber_count == 0
+
+def test_slow_client_is_disconnected_to_catch_up(mongo):
+    broadcaster = CommunityBroadcaster(queue_size=1, keepalive=0.01)
+
+    async def scenario():
+        async def is_disconnected():
+            return False
+
+        stream = broadcaster.stream("general", None, is_disconnected)
+        await anext(stream)
+        for i in range(2):
+            await broadcaster.publish("general", "message", {"id": str(i)})
+        return [chunk async for chunk in stream]
+
+    assert asyncio.run(scenario()) == []
+    assert broadcaster.subscriber_count == 0
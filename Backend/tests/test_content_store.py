@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+import pytest
+from src.utils.archiver import archiver
+from src.utils.content_store import content_store
+
+def entries_for(tmp_path, files):
+    entries = []
+    for path, content in files.items():
+        local = tmp_path / path
+        local.write_bytes(content)
+        entries.append({"path": path, "sha256": hashlib.sha256(content).hexdigest(), "size": len(content), "local": str(local)})
+    return entries
+
+def sha(content):
+    return hashlib.sha256(content).hexdigest()
+
+def test_shared_files_are_stored_once_and_released_by_refcount(mongo, blob_storage, tmp_path):
+    shared, only_a, only_b = b"shared\n" * 10, b"a\n", b"b\n"
+
+    async def scenario():
+        a = await content_store.store_entries(entries_for(tmp_path, {"x.csv": shared, "y.csv": only_a}), str(tmp_path))
+        b = await content_store.store_entries(entries_for(tmp_path, {"x.csv": shared, "z.csv": only_b}), str(tmp_path))
+        stored = await mongo.blobs_collection.find_one({"_id": sha(shared)})
+        await content_store.release(a["_id"])
+        kept = await mongo.blobs_collection.find_one({"_id": sha(shared)})
+        dropped = await mongo.blobs_collection.find_one({"_id": sha(only_a)})
+        return a, stored, kept, dropped
+
+    a, stored, kept, dropped = asyncio.run(scenario())
+    assert stored["refcount"] == 2
+    assert kept["refcount"] == 1 and kept["blob"] in blob_storage.blobs
+    assert dropped is None
+    # b's two members and archive are left
+    assert a["archive"]["blob"] not in blob_storage.blobs and len(blob_storage.blobs) == 3
+
+def test_content_stored_again_after_release_gets_a_new_blob_name(mongo, blob_storage, tmp_path):
+    files = {"x.csv": b"row\n"}
+
+    async def store_and_release():
+        manifest = await content_store.store_entries(entries_for(tmp_path, files), str(tmp_path))
+        blob = (await mongo.blobs_collection.find_one({"_id": sha(b"row\n")}))["blob"]
+        await content_store.release(manifest["_id"])
+        return blob
+
+    first, second = asyncio.run(store_and_release()), asyncio.run(store_and_release())
+    # A delete of the first generation still in flight cannot remove the second
+    assert first != second
+
+def test_failed_store_drops_its_references(mongo, blob_storage, tmp_path, monkeypatch):
+    async def failing_build(entries, zip_path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archiver, "build", failing_build)
+
+    with pytest.raises(OSError):
+        asyncio.run(content_store.store_entries(entries_for(tmp_path, {"x.csv": b"row\n"}), str(tmp_path)))
+    assert asyncio.run(mongo.blobs_collection.count_documents({})) == 0
+    assert blob_storage.blobs == {}
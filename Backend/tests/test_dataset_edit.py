@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import json
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from src.main import app
+from src.utils.content_store import content_store
+from src.utils.jobs import jobs
+
+def spooled(directory, files):
+    entries = []
+    for path, content in files.items():
+        local = directory / path
+        local.write_bytes(content)
+        entries.append({"path": path, "sha256": hashlib.sha256(content).hexdigest(), "size": len(content), "local": str(local)})
+    return entries
+
+def manifest_entry(path, content):
+    return {"path": path, "sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+def test_delta_edit_is_stored_by_a_job_and_releases_the_old_content(mongo, blob_storage, tmp_path):
+    dataset_id = ObjectId()
+    unchanged, old, new = b"kept,row\n" * 100, b"old,row\n", b"new,row\n"
+
+    async def store_original():
+        await mongo.user_profile_collection.insert_one({"uid": "u1", "username": "bob"})
+        manifest = await content_store.store_entries(spooled(tmp_path, {"a.csv": unchanged, "b.csv": old}), str(tmp_path))
+        await mongo.datasets_collection.insert_one({
+            "_id": dataset_id,
+            "uid": "u1",
+            "dataset_info": {"name": "reviews", "file_type": "text"},
+            "files": {"raw": [manifest["archive"]["url"]], "vectorized": []},
+            "manifests": {"raw": manifest["_id"]},
+            "deleted_at": None
+        })
+        return manifest
+
+    original = asyncio.run(store_original())
+    original_blobs = set(blob_storage.blobs)
+
+    response = TestClient(app).post(
+        "/upload/edit",
+        data={
+            "type": "raw",
+            "uid": "u1",
+            "datasetInfo": json.dumps({"datasetId": str(dataset_id), "name": "reviews", "description": "", "domain": "", "file_type": "text"}),
+            "manifest": json.dumps([manifest_entry("a.csv", unchanged), manifest_entry("b.csv", new)])
+        },
+        files=[("raw_files", ("b.csv", new))]
+    ).json()
+    # Nothing is stored while the request is open
+    assert response["job_id"] and response["files"] == []
+    assert set(blob_storage.blobs) == original_blobs
+
+    async def run_job():
+        await jobs._run(await jobs._claim())
+        return (
+            await jobs.get(response["job_id"]),
+            await mongo.datasets_collection.find_one({"_id": dataset_id}),
+            await mongo.manifests_collection.find_one({"_id": original["_id"]}),
+            await mongo.blobs_collection.find_one({"_id": hashlib.sha256(unchanged).hexdigest()})
+        )
+
+    job, dataset, old_manifest, shared_blob = asyncio.run(run_job())
+    assert job["status"] == "succeeded"
+    assert dataset["manifests"]["raw"] != original["_id"]
+    assert dataset["files"]["raw"] == job["result"]["files"]
+    assert dataset["version"] == 1 and dataset["versions"][0]["changes"] == {"uploaded": 1, "reused": 1}
+    # The old file set is gone; the file both versions share is kept once
+    assert old_manifest is None and shared_blob["refcount"] == 1
+    assert original["archive"]["blob"] not in blob_storage.blobs
+    assert len(blob_storage.blobs) == 3
@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from src.main import app
+from src.utils.dataset_feeds import FEED_SIZE, dataset_feeds
+
+def dataset(name, file_type, age):
+    return {
+        "_id": ObjectId(),
+        "dataset_info": {"name": name, "file_type": file_type},
+        "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(hours=age),
+        "deleted_at": None
+    }
+
+def names(response):
+    return [item["dataset_info"]["name"] for item in response.json()["datasets"]]
+
+def test_feeds_are_recomputed_on_publish_and_delete(mongo, monkeypatch):
+    monkeypatch.setattr(dataset_feeds, "ttl", 0)
+    monkeypatch.setattr(dataset_feeds, "_snapshot", {})
+    older = [dataset(f"text-{i}", "text", i + 1) for i in range(FEED_SIZE)]
+    image = dataset("scans", "image", 0)
+    asyncio.run(mongo.datasets_collection.insert_many(older + [image]))
+    client = TestClient(app)
+
+    # The first read materializes the feed, newest first and capped
+    text = client.get("/dataset-category/text")
+    assert names(text) == [f"text-{i}" for i in range(FEED_SIZE)]
+    assert client.get("/dataset-category/text", headers={"If-None-Match": text.headers["ETag"]}).status_code == 304
+
+    newest = dataset("fresh", "text", -1)
+
+    async def upload():
+        await mongo.datasets_collection.insert_one(newest)
+        await dataset_feeds.publish(newest)
+        # A retried upload publishes again
+        await dataset_feeds.publish(newest)
+
+    asyncio.run(upload())
+    published = client.get("/dataset-category/text")
+    assert published.headers["ETag"] != text.headers["ETag"]
+    assert names(published) == ["fresh"] + [f"text-{i}" for i in range(FEED_SIZE - 1)]
+
+    async def delete():
+        await mongo.datasets_collection.update_one({"_id": newest["_id"]}, {"$set": {"deleted_at": datetime.now(timezone.utc)}})
+        await dataset_feeds.refresh("text")
+
+    asyncio.run(delete())
+    assert names(client.get("/dataset-category/text")) == names(text)
+    assert names(client.get("/dataset-category/all"))[:2] == ["scans", "text-0"]
+    assert names(client.get("/dataset-category/image")) == ["scans"]
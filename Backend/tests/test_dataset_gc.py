@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from src.database.migrations import migrate_deleted_datasets
+from src.main import app
+from src.utils.content_store import content_store
+from src.utils.dataset_gc import requeue_pending
+from src.utils.jobs import jobs
+
+def tombstone(**fields):
+    return {"_id": ObjectId(), "uid": "u1", "deleted_at": datetime.now(timezone.utc), "purged_at": None, **fields}
+
+def test_requeue_schedules_only_tombstones_without_a_live_job(mongo):
+    lost, running, failed = tombstone(), tombstone(), tombstone()
+    purged = tombstone(purged_at=datetime.now(timezone.utc))
+    live = {"_id": ObjectId(), "uid": "u1", "deleted_at": None}
+
+    async def scenario():
+        await mongo.datasets_collection.insert_many([lost, running, failed, purged, live])
+        await mongo.jobs_collection.insert_many([
+            {"_id": running["_id"], "kind": "dataset_gc", "status": "running", "attempts": 1},
+            {"_id": failed["_id"], "kind": "dataset_gc", "status": "failed", "attempts": 5}
+        ])
+        await requeue_pending(batch_size=2)
+        return {job["_id"]: job async for job in mongo.jobs_collection.find({})}
+
+    jobs_by_id = asyncio.run(scenario())
+    assert set(jobs_by_id) == {lost["_id"], running["_id"], failed["_id"]}
+    assert jobs_by_id[lost["_id"]]["status"] == "queued"
+    assert jobs_by_id[running["_id"]]["attempts"] == 1
+    assert jobs_by_id[failed["_id"]]["status"] == "queued" and jobs_by_id[failed["_id"]]["attempts"] == 0
+
+def test_migration_moves_legacy_deletes_to_tombstones(mongo):
+    legacy = {"_id": ObjectId(), "uid": "u1", "dataset_info": {"name": "old"}}
+
+    async def scenario():
+        await mongo.deleted_datasets_collection.insert_one(legacy)
+        moved = await migrate_deleted_datasets(batch_size=10, pause=0, dry_run=False)
+        return (
+            moved,
+            await mongo.deleted_datasets_collection.count_documents({}),
+            await mongo.datasets_collection.find_one({"_id": legacy["_id"]}),
+            await jobs.get(legacy["_id"])
+        )
+
+    moved, left, dataset, job = asyncio.run(scenario())
+    assert moved == 1 and left == 0
+    assert dataset["deleted_at"] is not None
+    assert job["kind"] == "dataset_gc" and job["status"] == "queued"
+
+def test_deleted_dataset_is_hidden_and_shared_content_is_kept_until_unused(mongo, blob_storage, tmp_path):
+    content = b"shared,row\n" * 50
+    (tmp_path / "a.csv").write_bytes(content)
+    entry = {"path": "a.csv", "sha256": hashlib.sha256(content).hexdigest(), "size": len(content), "local": str(tmp_path / "a.csv")}
+
+    async def store_both():
+        await mongo.user_profile_collection.insert_one({"uid": "u1", "username": "bob"})
+        ids = []
+        for name in ("first", "second"):
+            manifest = await content_store.store_entries([dict(entry)], str(tmp_path))
+            ids.append((await mongo.datasets_collection.insert_one({
+                "uid": "u1",
+                "dataset_info": {"name": name, "file_type": "text"},
+                "files": {"raw": [manifest["archive"]["url"]]},
+                "manifests": {"raw": manifest["_id"]},
+                "deleted_at": None
+            })).inserted_id)
+        return manifest["_id"], ids
+
+    manifest_id, (first, second) = asyncio.run(store_both())
+    client = TestClient(app)
+
+    def delete(dataset_id, name):
+        return client.request("DELETE", f"/api/datasets/{dataset_id}", json={"userId": "u1", "datasetName": name})
+
+    async def collect():
+        await jobs._run(await jobs._claim())
+        return await mongo.manifests_collection.find_one({"_id": manifest_id})
+
+    assert delete(first, "first").status_code == 200
+    assert client.get("/users/bob/first").status_code == 404
+    assert client.get("/check-dataset-name/u1/first").json()["available"]
+    assert delete(first, "first").status_code == 404
+
+    # The second dataset still refers to the same content
+    assert asyncio.run(collect())["refcount"] == 1
+    assert client.get("/users/bob/second").status_code == 200
+    assert len(blob_storage.blobs) == 2
+
+    assert delete(second, "second").status_code == 200
+    assert asyncio.run(collect()) is None
+    assert blob_storage.blobs == {}
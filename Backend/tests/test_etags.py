@@ -0,0 +1,15 @@
+import asyncio
+from datetime import datetime, timezone
+from src.utils.etags import make_etag
+
+def test_etag_is_the_same_for_a_time_written_and_read_back(mongo):
+    written = datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+    async def round_trip():
+        await mongo.dataset_feeds_collection.insert_one({"_id": "text", "updated_at": written})
+        return (await mongo.dataset_feeds_collection.find_one({"_id": "text"}))["updated_at"]
+
+    read_back = asyncio.run(round_trip())
+    assert read_back != written
+    assert make_etag("feed", "text", read_back) == make_etag("feed", "text", written)
+    assert make_etag("feed", "text", written.replace(microsecond=124000)) != make_etag("feed", "text", written)
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from src.utils.jobs import JobQueue, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+def make_queue(handler, on_failure=None, max_attempts=2):
+    queue = JobQueue(workers=1, lease_seconds=60, max_attempts=max_attempts)
+    queue.register("test", handler, on_failure=on_failure)
+    return queue
+
+async def make_due(mongo, job_id):
+    # Failed attempts are retried after a backoff; skip it
+    await mongo.jobs_collection.update_one({"_id": job_id}, {"$set": {"run_after": datetime.now(timezone.utc)}})
+
+def test_retried_attempt_resumes_from_its_checkpoint(mongo):
+    steps = []
+
+    async def handler(job):
+        if not job["progress"].get("stored"):
+            steps.append("store")
+            await queue.checkpoint(job, stored=True)
+        if job["attempts"] == 1:
+            raise RuntimeError("publish failed")
+        steps.append("publish")
+        return {"done": True}
+
+    queue = make_queue(handler)
+
+    async def scenario():
+        job_id = await queue.enqueue("test", {})
+        await queue._run(await queue._claim())
+        failed_attempt = await mongo.jobs_collection.find_one({})
+        await make_due(mongo, failed_attempt["_id"])
+        await queue._run(await queue._claim())
+        return failed_attempt, await queue.get(job_id)
+
+    failed_attempt, job = asyncio.run(scenario())
+    assert failed_attempt["status"] == QUEUED and failed_attempt["error"] == "publish failed"
+    assert steps == ["store", "publish"]
+    assert job["status"] == SUCCEEDED and job["attempts"] == 2 and job["result"] == {"done": True}
+
+def test_expired_lease_is_claimed_by_another_worker(mongo):
+    async def handler(job):
+        return None
+
+    first, second = make_queue(handler), make_queue(handler)
+    second.worker_id = "other-host:1"
+
+    async def scenario():
+        await first.enqueue("test", {})
+        job = await first._claim()
+        live_lease = await second._claim()
+        # The first worker died; its lease runs out
+        await mongo.jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        taken_over = await second._claim()
+        # The first worker coming back must not overwrite the new owner's run
+        await first._finish(job, SUCCEEDED)
+        return live_lease, taken_over, await mongo.jobs_collection.find_one({})
+
+    live_lease, taken_over, stored = asyncio.run(scenario())
+    assert live_lease is None
+    assert taken_over["worker"] == "other-host:1" and taken_over["attempts"] == 2
+    assert stored["status"] == RUNNING and stored["worker"] == "other-host:1"
+
+def test_exhausted_job_fails_once_and_can_be_retried(mongo):
+    failures = []
+
+    async def handler(job):
+        raise RuntimeError("storage unavailable")
+
+    async def on_failure(job):
+        failures.append(job["_id"])
+
+    queue = make_queue(handler, on_failure=on_failure, max_attempts=1)
+
+    async def scenario():
+        job_id = await queue.enqueue("test", {})
+        await queue._run(await queue._claim())
+        failed = await queue.get(job_id)
+        retried = await queue.retry(failed["_id"])
+        again = await queue.retry(failed["_id"])
+        return failed, retried, again, await queue.get(job_id)
+
+    failed, retried, again, requeued = asyncio.run(scenario())
+    assert failed["status"] == FAILED and failed["error"] == "storage unavailable"
+    assert failures == [failed["_id"]]
+    # Only failed jobs are requeued, with fresh attempts
+    assert retried and not again
+    assert requeued["status"] == QUEUED and requeued["attempts"] == 0 and "finished_at" not in requeued
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from src.main import app
+from src.utils.llm_limiter import LLMLimiter, LLMOverloadedError, llm_limiter
+
+def test_waiting_users_are_admitted_round_robin():
+    limiter = LLMLimiter(max_in_flight=1, max_queue=10, per_user_in_flight=1)
+    order = []
+
+    async def call(uid, name):
+        async with limiter.slot(uid):
+            order.append(name)
+
+    async def scenario():
+        await limiter.acquire("busy")
+        # One user queues three calls before another user queues one
+        calls = [asyncio.create_task(call("a", f"a{i}")) for i in range(1, 4)]
+        calls.append(asyncio.create_task(call("b", "b1")))
+        await asyncio.sleep(0)
+        limiter.release("busy")
+        await asyncio.gather(*calls)
+
+    asyncio.run(scenario())
+    assert order == ["a1", "b1", "a2", "a3"]
+    assert limiter.stats()["in_flight"] == 0
+
+def test_full_queue_is_shed_with_retry_after(pooled_bot, uncached, monkeypatch):
+    monkeypatch.setattr(llm_limiter, "max_in_flight", 0)
+    monkeypatch.setattr(llm_limiter, "max_queue", 0)
+    pooled_bot(["never sent"])
+
+    response = TestClient(app).post("/chat", json={"message": "hi", "uid": "test-user"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(llm_limiter.retry_after)
+
+def test_wait_times_out_without_leaking_a_slot():
+    limiter = LLMLimiter(max_in_flight=1, max_queue=10, queue_timeout=0.05)
+
+    async def scenario():
+        await limiter.acquire("a")
+        with pytest.raises(LLMOverloadedError) as shed:
+            await limiter.acquire("b")
+        waiting = limiter.stats()["queued"]
+        limiter.release("a")
+        return shed.value, waiting
+
+    shed, waiting = asyncio.run(scenario())
+    assert shed.retry_after == limiter.retry_after
+    assert waiting == 0
+    assert limiter.stats()["in_flight"] == 0
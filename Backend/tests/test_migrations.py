@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime, timezone
+from src.database.migrations import migrate_field, parse_timestamp
+
+def test_legacy_timestamps_parse_to_utc():
+    assert parse_timestamp("2025-03-01 10:30:00 IST") == datetime(2025, 3, 1, 5, 0, tzinfo=timezone.utc)
+    assert parse_timestamp("2025-03-01 10:30:00") == datetime(2025, 3, 1, 5, 0, tzinfo=timezone.utc)
+    assert parse_timestamp("03-01-2025") == datetime(2025, 2, 28, 18, 30, tzinfo=timezone.utc)
+    # isoformat() strings: naive ones were written on UTC hosts
+    assert parse_timestamp("2025-03-01T10:30:00.250000") == datetime(2025, 3, 1, 10, 30, 0, 250000, tzinfo=timezone.utc)
+    assert parse_timestamp(" 2025-03-01T10:30:00+05:30 ") == datetime(2025, 3, 1, 5, 0, tzinfo=timezone.utc)
+    assert parse_timestamp("yesterday") is None
+
+def test_dry_run_counts_without_writing(mongo):
+    async def scenario():
+        await mongo.general_collection.insert_many([
+            {"created_at": "2025-03-01 10:30:00 IST"},
+            {"created_at": "not a date"},
+            {"created_at": datetime(2025, 3, 1, tzinfo=timezone.utc)}
+        ])
+        stats = await migrate_field(mongo.general_collection, "created_at", batch_size=1, pause=0, dry_run=True)
+        return stats, await mongo.general_collection.count_documents({"created_at": {"$type": "string"}})
+
+    stats, still_strings = asyncio.run(scenario())
+    assert stats == {"converted": 1, "unparsed": 1}
+    assert still_strings == 2
@@ -0,0 +1,22 @@
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from src.main import app
+from src.utils.popularity import popularity
+
+def test_download_pings_only_count_live_datasets(mongo, monkeypatch):
+    monkeypatch.setattr(popularity, "_pending", defaultdict(Counter))
+    live, deleted = ObjectId(), ObjectId()
+    asyncio.run(mongo.datasets_collection.insert_many([
+        {"_id": live, "deleted_at": None},
+        {"_id": deleted, "deleted_at": datetime.now(timezone.utc)}
+    ]))
+    client = TestClient(app)
+
+    assert client.post("/dataset-download", json={"datasetId": str(live)}).status_code == 200
+    assert client.post("/dataset-download", json={"datasetId": str(deleted)}).status_code == 404
+    assert client.post("/dataset-download", json={"datasetId": str(ObjectId())}).status_code == 404
+
+    assert list(popularity._pending) == [("dataset", str(live))]
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from src.main import app
+
+@pytest.fixture
+def secondary(mongo, monkeypatch):
+    """Serve read collections from a separate database, standing in for a lagging secondary."""
+    from src.config import settings
+    database = AsyncMongoMockClient(tz_aware=True)[settings.DATABASE_NAME]
+    monkeypatch.setattr(mongo, "read_db", database)
+    return database
+
+def test_profile_body_matches_the_etag_while_the_secondary_lags(mongo, secondary):
+    before, after = datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 2, tzinfo=timezone.utc)
+    profile = {"_id": ObjectId(), "uid": "u1", "username": "bob", "name": "Bob"}
+    kept, added = ObjectId(), ObjectId()
+
+    async def replicate(updated_at, datasets, name):
+        await secondary.userprofile.delete_many({})
+        await secondary.datasets.delete_many({})
+        await secondary.userprofile.insert_one({**profile, "name": name, "updatedAt": updated_at})
+        await secondary.datasets.insert_many(datasets)
+
+    def dataset(dataset_id, name):
+        return {"_id": dataset_id, "uid": "u1", "dataset_info": {"name": name}, "deleted_at": None}
+
+    asyncio.run(mongo.user_profile_collection.insert_one({**profile, "updatedAt": after}))
+    asyncio.run(mongo.datasets_collection.insert_many([dataset(kept, "kept"), dataset(added, "added")]))
+    asyncio.run(replicate(before, [dataset(kept, "kept")], "Bob"))
+    client = TestClient(app)
+
+    stale = client.get("/user-profile/u1")
+    assert sorted(d["name"] for d in stale.json()["datasets"]) == ["added", "kept"]
+
+    # Once the secondary has the version the ETag names, it serves the page
+    asyncio.run(replicate(after, [dataset(kept, "kept"), dataset(added, "added")], "Bob (secondary)"))
+    current = client.get("/user-profile/username/bob")
+    assert current.headers["ETag"] == stale.headers["ETag"]
+    assert current.json()["name"] == "Bob (secondary)"
+
+def test_dataset_body_matches_the_etag_while_the_secondary_lags(mongo, secondary):
+    dataset_id = ObjectId()
+    edited = datetime.now(timezone.utc).replace(microsecond=0)
+    asyncio.run(mongo.user_profile_collection.insert_one({"uid": "u1", "username": "bob"}))
+    asyncio.run(secondary.userprofile.insert_one({"uid": "u1", "username": "bob"}))
+    asyncio.run(mongo.datasets_collection.insert_one({
+        "_id": dataset_id, "uid": "u1", "dataset_info": {"name": "reviews", "description": "new"},
+        "timestamp": edited, "version": 2, "deleted_at": None
+    }))
+    asyncio.run(secondary.datasets.insert_one({
+        "_id": dataset_id, "uid": "u1", "dataset_info": {"name": "reviews", "description": "old"},
+        "timestamp": edited - timedelta(days=1), "version": 1, "deleted_at": None
+    }))
+
+    response = TestClient(app).get("/users/bob/reviews")
+    assert response.json()["dataset_info"]["description"] == "new"
+    assert response.json()["version"] == 2
@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+from src.main import app
+from src.routes import search_router
+
+def dataset(name, file_type, domain, age, deleted=False):
+    return {
+        "dataset_info": {"name": name, "file_type": file_type, "domain": domain},
+        "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc) - timedelta(days=age),
+        "deleted_at": datetime.now(timezone.utc) if deleted else None
+    }
+
+def test_search_pages_newest_first_with_facets_of_every_match(mongo, monkeypatch):
+    monkeypatch.setattr(search_router, "_facet_cache", TTLCache(maxsize=10, ttl=60))
+    computed = []
+    compute_facets = search_router._compute_facets
+
+    async def counting_compute(match):
+        computed.append(match)
+        return await compute_facets(match)
+
+    monkeypatch.setattr(search_router, "_compute_facets", counting_compute)
+    asyncio.run(mongo.datasets_collection.insert_many([
+        dataset("reviews", "text", "retail", 3),
+        dataset("tickets", "text", "support", 1),
+        dataset("scans", "image", "health", 2),
+        dataset("receipts", "text", "retail", 0, deleted=True)
+    ]))
+    client = TestClient(app)
+
+    first = client.get("/datasets/search", params={"page_size": 2}).json()
+    assert [hit["dataset_info"]["name"] for hit in first["results"]] == ["tickets", "scans"]
+    assert first["total"] == 3
+    assert first["facets"]["file_type"] == [{"value": "text", "count": 2}, {"value": "image", "count": 1}]
+    assert first["facets"]["vector_database"] == []
+
+    # Later pages reuse the cached counts
+    second = client.get("/datasets/search", params={"page_size": 2, "page": 2}).json()
+    assert [hit["dataset_info"]["name"] for hit in second["results"]] == ["reviews"]
+    assert second["facets"] == first["facets"] and len(computed) == 1
+
+    filtered = client.get("/datasets/search", params={"file_type": "text"}).json()
+    assert [hit["dataset_info"]["name"] for hit in filtered["results"]] == ["tickets", "reviews"]
+    # Tied buckets have no set order
+    domains = sorted(filtered["facets"]["domain"], key=lambda bucket: bucket["value"])
+    assert domains == [{"value": "retail", "count": 1}, {"value": "support", "count": 1}]
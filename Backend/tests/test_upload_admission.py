@@ -0,0 +1,97 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+from datetime import datetime, timezone
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from src.middleware.upload_admission import UploadAdmissionMiddleware
+from src.utils import upload_admission as admission_module
+from src.utils.file_handlers import WORK_DIR_PREFIX
+from src.utils.upload_admission import UploadAdmission, UploadRejectedError, sweep_spool
+
+def make_client(**limits):
+    admission = UploadAdmission(**{"byte_budget": 100, "max_request_bytes": 50, "queue_timeout": 0.05, **limits})
+    app = FastAPI()
+    app.add_middleware(UploadAdmissionMiddleware, admission=admission, paths=["/upload"])
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"received": len(await request.body())}
+
+    return TestClient(app), admission
+
+def test_chunked_uploads_are_admitted_up_to_the_request_limit(mongo):
+    client, admission = make_client()
+
+    accepted = client.post("/upload", content=iter([b"x" * 20, b"y" * 20]))
+    assert accepted.status_code == 200 and accepted.json() == {"received": 40}
+
+    rejected = client.post("/upload", content=iter([b"x" * 30, b"y" * 30]))
+    assert rejected.status_code == 413
+    assert admission.reserved == 0
+
+def test_oversized_upload_is_rejected_before_its_body_is_read(mongo):
+    client, admission = make_client()
+
+    response = client.post("/upload", content=b"x" * 60)
+    assert response.status_code == 413 and response.headers["Retry-After"] == "1"
+    assert admission.rejected == 1
+
+def test_spooled_jobs_hold_the_budget_until_they_finish(mongo):
+    client, admission = make_client()
+    job_id = asyncio.run(mongo.jobs_collection.insert_one(
+        {"kind": "dataset_upload", "status": "queued", "payload": {"spool_bytes": 90}}
+    )).inserted_id
+
+    # Only 10 bytes are free while the queued job's spool is on disk; the request times out waiting
+    waiting = client.post("/upload", content=b"x" * 20)
+    assert waiting.status_code == 503 and "Retry-After" in waiting.headers
+
+    asyncio.run(mongo.jobs_collection.update_one({"_id": job_id}, {"$set": {"status": "succeeded"}}))
+    assert client.post("/upload", content=b"x" * 20).status_code == 200
+    assert admission.reserved == 0
+
+def test_user_with_uploads_in_progress_is_rejected(mongo):
+    admission = UploadAdmission(byte_budget=100, max_request_bytes=50, per_user=1)
+
+    async def scenario():
+        async with admission.user_slot("u1"):
+            async with admission.user_slot("u2"):
+                pass
+        await mongo.jobs_collection.insert_one({"uid": "u1", "kind": "dataset_edit", "status": "running", "payload": {}})
+        async with admission.user_slot("u1"):
+            pass
+
+    with pytest.raises(UploadRejectedError) as rejected:
+        asyncio.run(scenario())
+    assert rejected.value.status_code == 429
+
+def test_sweep_spool_removes_only_orphaned_directories(mongo, tmp_path, monkeypatch):
+    monkeypatch.setattr(admission_module, "SPOOL_DIR", str(tmp_path))
+    finished, queued = ObjectId(), ObjectId()
+    asyncio.run(mongo.jobs_collection.insert_many([
+        {"_id": finished, "status": "succeeded"},
+        {"_id": queued, "status": "queued"}
+    ]))
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    names = {
+        "finished": str(finished),
+        "queued": str(queued),
+        "never_enqueued": str(ObjectId.from_datetime(datetime(2020, 1, 1, tzinfo=timezone.utc))),
+        "just_spooled": str(ObjectId()),
+        "dead_worker": f"{WORK_DIR_PREFIX}{socket.gethostname()}-{dead.pid}-abc",
+        "live_worker": f"{WORK_DIR_PREFIX}{socket.gethostname()}-{os.getpid()}-abc",
+        "unrelated": "keep-me"
+    }
+    for name in names.values():
+        (tmp_path / name).mkdir()
+
+    asyncio.run(sweep_spool(max_age=3600))
+
+    left = {key for key, name in names.items() if (tmp_path / name).exists()}
+    assert left == {"queued", "just_spooled", "live_worker", "unrelated"}
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime, timezone
+from bson import ObjectId
+from src.routes.upload_router import process_upload
+from src.utils.dataset_feeds import dataset_feeds
+
+def upload_job(dataset_id, spool_dir):
+    # A job whose files were already stored, but whose later checkpoints were lost
+    return {
+        "_id": ObjectId(),
+        "payload": {
+            "dataset_object_id": dataset_id,
+            "metadata": {
+                "uid": "u1",
+                "upload_type": "both",
+                "dataset_info": {"name": "reviews", "file_type": "text"},
+                "timestamp": datetime.now(timezone.utc),
+                "deleted_at": None
+            },
+            "spool_dir": str(spool_dir),
+            "file_sets": {}
+        },
+        "progress": {"manifests": {"raw": {"id": "m1", "url": "https://vecem.blob.core.windows.net/datasets/cas/archives/m1.zip", "checksums": {}}}}
+    }
+
+def test_rerun_upload_job_saves_counts_and_publishes_once(mongo, tmp_path):
+    dataset_id = ObjectId()
+
+    async def scenario():
+        await mongo.user_profile_collection.insert_one({"uid": "u1", "username": "bob"})
+        await dataset_feeds.refresh("text")
+        await process_upload(upload_job(dataset_id, tmp_path))
+        await process_upload(upload_job(dataset_id, tmp_path))
+        profile = await mongo.user_profile_collection.find_one({"uid": "u1"})
+        feed = await mongo.dataset_feeds_collection.find_one({"_id": "all"})
+        return profile, feed, await mongo.datasets_collection.count_documents({})
+
+    profile, feed, saved = asyncio.run(scenario())
+    assert saved == 1
+    assert (profile["number_of_raw_datasets"], profile["number_of_vectorized_datasets"]) == (1, 1)
+    assert [item["_id"] for item in feed["datasets"]] == [str(dataset_id)]
@@ -94,6 +94,7 @@ const DashboardLayout = () => {
     },
   ]);
   const [chatInput, setChatInput] = useState("");
+  const [chatSessionId, setChatSessionId] = useState<string | null>(null);
   const [isTyping, setIsTyping] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const [isFullWidth, setIsFullWidth] = useState(false);
@@ -144,7 +145,8 @@ const DashboardLayout = () => {
     setIsTyping(true);
 
     try {
-      const data = await sendChatMessage(chatInput, user.uid);
+      const data = await sendChatMessage(chatInput, user.uid, chatSessionId);
+      setChatSessionId(data.session_id);
 
       const botMessage: ChatMessage = {
         id: (Date.now() + 1).toString(),
@@ -228,13 +230,10 @@ const DashboardLayout = () => {
   const handleCategorySelect = async (category: string) => {
     setSelectedCategory(category);
     try {
-      const response = await fetch(`${API_BASE_URL}/dataset-category`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ category }),
-      });
+      // GET so the browser can revalidate its cached feed with If-None-Match
+      const response = await fetch(
+        `${API_BASE_URL}/dataset-category/${encodeURIComponent(category)}`
+      );
 
       if (!response.ok) {
         throw new Error("Failed to fetch datasets");
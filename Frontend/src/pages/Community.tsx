@@ -69,6 +69,21 @@ const messageVariants = {
   },
 };
 
+// ObjectId hex strings are fixed-width and sort by creation time
+const newestId = (messages: any[]): string | undefined =>
+  messages
+    .flatMap((message) => [
+      message.id,
+      ...(Array.isArray(message.replies)
+        ? message.replies.map((reply: any) => reply.id)
+        : []),
+    ])
+    .filter((id): id is string => typeof id === "string" && id.length > 0)
+    .reduce<string | undefined>(
+      (newest, id) => (newest === undefined || id > newest ? id : newest),
+      undefined
+    );
+
 const Community = () => {
   const { user } = useAuth();
   const [messages, setMessages] = useState<Message[]>([]);
@@ -263,7 +278,7 @@ const Community = () => {
 
       if (!Array.isArray(data)) {
         setMessages([]);
-        return;
+        return undefined;
       }
 
       // Keep track of existing messages to prevent duplicates
@@ -297,6 +312,7 @@ const Community = () => {
             new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime()
         );
       });
+      return newestId(data);
     } catch (error) {
       console.error("Error fetching messages:", error);
       setFetchError("Failed to load messages. Please try again later.");
@@ -305,21 +321,49 @@ const Community = () => {
     }
   };
 
+  // Load the thread, then stream new messages and replies instead of polling.
+  // The stream starts after the newest loaded post so nothing posted in
+  // between is missed; on reconnect the browser resumes from the last event
   useEffect(() => {
-    const loadMessages = async () => {
-      await fetchMessages(selectedFilter);
-    };
-    loadMessages();
-  }, [selectedFilter]); // Reload when filter changes
+    let source: EventSource | null = null;
+    let cancelled = false;
+
+    const subscribe = async () => {
+      const since = await fetchMessages(selectedFilter);
+      if (cancelled) return;
+      const query = since ? `?since=${encodeURIComponent(since)}` : "";
+      source = new EventSource(
+        `${API_BASE_URL}/community/stream/${selectedFilter}${query}`
+      );
 
-  // Add these two useEffect hooks for auto-refresh and scrolling
-  useEffect(() => {
-    const interval = setInterval(async () => {
-      await fetchMessages(selectedFilter);
-    }, 10000); // Increased to 10 seconds to reduce unnecessary refreshes
+      source.addEventListener("message", (event) => {
+        const message = JSON.parse((event as MessageEvent).data);
+        setMessages((prev) =>
+          prev.some((msg) => msg.id === message.id)
+            ? prev
+            : [...prev, { ...message, replies: message.replies || [] }]
+        );
+      });
 
-    return () => clearInterval(interval);
-  }, [selectedFilter]);
+      source.addEventListener("reply", (event) => {
+        const reply = JSON.parse((event as MessageEvent).data);
+        setMessages((prev) =>
+          prev.map((msg) =>
+            msg.id === reply.issueId &&
+            !(msg.replies || []).some((r) => r.id === reply.id)
+              ? { ...msg, replies: [...(msg.replies || []), reply] }
+              : msg
+          )
+        );
+      });
+    };
+
+    subscribe();
+    return () => {
+      cancelled = true;
+      source?.close();
+    };
+  }, [selectedFilter]); // Reload when filter changes
 
   useEffect(() => {
     // This is correct
@@ -4,6 +4,7 @@ import {
   uploadDataset,
   DatasetForm,
   checkDatasetNameAvailability,
+  waitForJob,
 } from "../services/uploadService";
 import { useAuth } from "../contexts/AuthContext";
 import { useNavigate, Link } from "react-router-dom";
@@ -78,6 +79,7 @@ const UploadFile = () => {
     null
   );
   const [isUploading, setIsUploading] = useState<boolean>(false);
+  const [isProcessing, setIsProcessing] = useState<boolean>(false);
 
   const licenses = [
     "MIT License",
@@ -419,6 +421,16 @@ const UploadFile = () => {
         );
       }
 
+      if (result?.success && result.job_id) {
+        // The files are on the server; storing and publishing them runs in the background
+        setIsProcessing(true);
+        const job = await waitForJob(result.job_id);
+        setIsProcessing(false);
+        if (job.status === "failed") {
+          throw new Error(job.error || "Dataset processing failed");
+        }
+      }
+
       if (result?.success) {
         setUploadProgress({ progress: 100, status: "completed" });
         setUploadStatus({
@@ -451,6 +463,7 @@ const UploadFile = () => {
       }
     } catch (error) {
       console.error("Upload error:", error);
+      setIsProcessing(false);
       setUploadProgress({ progress: 0, status: "error" });
       setUploadStatus({
         show: true,
@@ -885,7 +898,7 @@ const UploadFile = () => {
                 hover:from-cyan-600 hover:to-cyan-500 transition-colors
                 focus:outline-none focus:ring-2 focus:ring-cyan-500/40"
             >
-              {isUploading ? "Uploading..." : "Upload"}
+              {isUploading ? (isProcessing ? "Processing..." : "Uploading...") : "Upload"}
             </button>
           </form>
         </div>
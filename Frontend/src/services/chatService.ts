@@ -14,7 +14,12 @@ export interface ChatResponse {
   session_id: string;
 }
 
-export const sendChatMessage = async (message: string, uid: string) => {
+// Omit sessionId to start a new conversation; send back the returned session_id to continue it
+export const sendChatMessage = async (
+  message: string,
+  uid: string,
+  sessionId: string | null = null
+): Promise<ChatResponse> => {
   const response = await fetch(`${API_URL}/chat`, {
     method: "POST",
     headers: {
@@ -23,7 +28,7 @@ export const sendChatMessage = async (message: string, uid: string) => {
     body: JSON.stringify({
       message,
       uid,
-      session_id: null,
+      session_id: sessionId,
     }),
   });
 
@@ -1,4 +1,5 @@
 import { API_BASE_URL } from "../config";
+import { waitForJob } from "./uploadService";
 
 export interface Dataset {
   _id: string;
@@ -35,6 +36,7 @@ interface UploadResponse {
   success: boolean;
   message: string;
   files: string[];
+  job_id?: string;
 }
 
 const API_URL = API_BASE_URL;
@@ -177,7 +179,16 @@ export const uploadDatasetFiles = async (
       throw new Error(errorData.detail || "Failed to upload files");
     }
 
-    return await response.json();
+    const result: UploadResponse = await response.json();
+    if (!result.job_id) {
+      return result;
+    }
+    // New files are stored and the dataset updated by a background job
+    const job = await waitForJob(result.job_id);
+    if (job.status === "failed") {
+      throw new Error(job.error || "Failed to update dataset files");
+    }
+    return { ...result, files: (job.result?.files as string[]) || [] };
   } catch (error) {
     console.error("Upload Error:", error);
     throw error;
@@ -13,8 +13,32 @@ export interface UploadResponse {
   success: boolean;
   message: string;
   files: string[];
+  job_id?: string;
 }
 
+export interface JobStatus {
+  job_id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  attempts: number;
+  error: string | null;
+  result: Record<string, unknown> | null;
+}
+
+const JOB_POLL_INTERVAL = 2000;
+
+// Uploaded files are stored and published by a background job; this resolves
+// once the job has succeeded or failed for good (failed attempts are retried)
+export const waitForJob = async (jobId: string): Promise<JobStatus> => {
+  for (;;) {
+    const response = await axios.get<JobStatus>(`${API_URL}/jobs/${jobId}`);
+    if (response.data.status === "succeeded" || response.data.status === "failed") {
+      return response.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL));
+  }
+};
+
 export const uploadDataset = async (
   rawFiles: FileList | null,
   vectorizedFiles: FileList | null,
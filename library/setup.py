@@ -2,12 +2,10 @@ from setuptools import setup, find_packages
 
 setup(
     name="vecem",
-    version="0.2.0",  # updated version
+    version="0.5.0",  # updated version
     packages=find_packages(),
     install_requires=[
-        "requests>=2.25.0",
-        "azure-storage-blob>=12.0.0",
-        "azure-core>=1.26.0"
+        "requests>=2.25.0"
     ],
     author="vecem",
     author_email="vectorembeddings@example.com",
@@ -0,0 +1,117 @@
+import hashlib
+import io
+import zipfile
+import pytest
+from vecem import downloader
+from vecem.downloader import ChecksumMismatchError, VecemDataset
+
+API = "https://api.example.com"
+FILES = {"a.csv": b"id,text\n1,hello\n", "b.csv": b"id,text\n2,world\n"}
+
+def sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for path, content in files.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", json_body=None):
+        self.status_code = status_code
+        self.body = body
+        self.json_body = json_body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.json_body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 7):
+            yield self.body[start:start + 7]
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    """Answer the API and blob requests the downloader makes from ``routes``."""
+    routes = {}
+    monkeypatch.setattr(downloader, "CACHE_DIR", tmp_path / "cache")
+
+    def get(url, headers=None, stream=False, timeout=None):
+        response = routes.get(url, FakeResponse(404))
+        if headers and "Range" in headers:
+            start, end = map(int, headers["Range"].removeprefix("bytes=").split("-"))
+            return FakeResponse(206, response.body[start:end + 1])
+        return response
+
+    monkeypatch.setattr(downloader.requests, "get", get)
+    return routes
+
+def serve_archive(server, archive, files, **grant):
+    server[f"{API}/datasets/bob/reviews/raw/download"] = FakeResponse(json_body={
+        "url": "https://blobs.example.com/archive.zip",
+        "size": len(archive),
+        "sha256": sha(archive),
+        "files": [{"path": path, "sha256": sha(content), "size": len(content)} for path, content in files.items()],
+        **grant
+    })
+    server["https://blobs.example.com/archive.zip"] = FakeResponse(body=archive)
+
+def test_verified_archive_is_extracted_and_cached(server, tmp_path):
+    archive = make_archive(FILES)
+    serve_archive(server, archive, FILES)
+
+    dataset_dir = VecemDataset("bob/reviews/raw", api_url=API).download(tmp_path / "out")
+
+    assert {path: (tmp_path / "out" / "reviews_raw" / path).read_bytes() for path in FILES} == FILES
+    assert (downloader.CACHE_DIR / f"{sha(archive)}.zip").read_bytes() == archive
+    assert dataset_dir.endswith("reviews_raw")
+
+def test_corrupted_archive_is_rejected_and_not_cached(server, tmp_path):
+    archive = make_archive(FILES)
+    serve_archive(server, archive, FILES)
+    middle = len(archive) // 2
+    server["https://blobs.example.com/archive.zip"] = FakeResponse(body=archive[:middle] + bytes([archive[middle] ^ 1]) + archive[middle + 1:])
+
+    with pytest.raises(ChecksumMismatchError, match="SHA-256"):
+        VecemDataset("bob/reviews/raw", api_url=API).download(tmp_path / "out")
+    assert not list(downloader.CACHE_DIR.iterdir())
+
+def test_member_that_differs_from_its_recorded_checksum_is_rejected(server, tmp_path):
+    # The archive itself matches its grant, but not the files recorded at upload
+    archive = make_archive({**FILES, "b.csv": b"id,text\n2,tampered\n"})
+    serve_archive(server, archive, FILES)
+
+    with pytest.raises(ChecksumMismatchError, match="b.csv"):
+        VecemDataset("bob/reviews/raw", api_url=API).download(tmp_path / "out", use_cache=False)
+
+def test_shards_are_verified_before_they_are_placed(server, tmp_path):
+    stream = FILES["a.csv"] + FILES["b.csv"]
+    half = len(FILES["a.csv"])
+    shards = [
+        {"index": 0, "size": half, "sha256": sha(stream[:half]), "files": [{"path": "a.csv", "offset": 0, "size": half, "url": "https://blobs.example.com/a"}]},
+        {"index": 1, "size": len(stream) - half, "sha256": sha(stream[half:]), "files": [{"path": "b.csv", "offset": 0, "size": len(stream) - half, "url": "https://blobs.example.com/b"}]}
+    ]
+    server[f"{API}/datasets/bob/reviews/raw/shards"] = FakeResponse(json_body={
+        "files": [{"path": path, "sha256": sha(content), "size": len(content)} for path, content in FILES.items()],
+        "shards": shards
+    })
+    server["https://blobs.example.com/a"] = FakeResponse(body=FILES["a.csv"])
+    server["https://blobs.example.com/b"] = FakeResponse(body=FILES["b.csv"])
+    dataset = VecemDataset("bob/reviews/raw", api_url=API)
+
+    dataset.download(tmp_path / "out", use_cache=False, max_workers=2)
+    assert (tmp_path / "out" / "reviews_raw" / "b.csv").read_bytes() == FILES["b.csv"]
+
+    server["https://blobs.example.com/b"] = FakeResponse(body=FILES["b.csv"].replace(b"world", b"WORLD"))
+    with pytest.raises(ChecksumMismatchError, match="Shard 1"):
+        dataset.download(tmp_path / "again", use_cache=False)
+
+def test_api_url_is_required(monkeypatch):
+    monkeypatch.setattr(downloader, "VECEM_API_URL", "")
+    with pytest.raises(ValueError, match="VECEM_API_URL"):
+        VecemDataset("bob/reviews/raw")
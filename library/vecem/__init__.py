@@ -1,4 +1,4 @@
-from .downloader import load_dataset, VecemDataset
+from .downloader import load_dataset, VecemDataset, ChecksumMismatchError
 
-__version__ = "0.2.0"
-__all__ = ["load_dataset", "VecemDataset"]
+__version__ = "0.5.0"
+__all__ = ["load_dataset", "VecemDataset", "ChecksumMismatchError"]
@@ -1,8 +1,14 @@
 import os
+from pathlib import Path
 
-# Load Azure Storage configuration from environment variables
-AZURE_STORAGE_CONNECTION_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
-if not AZURE_STORAGE_CONNECTION_STRING:
-    raise ValueError("AZURE_STORAGE_CONNECTION_STRING environment variable is required")
+# Vecem API that issues short-lived download URLs; required unless api_url is passed
+VECEM_API_URL = os.getenv('VECEM_API_URL', '').rstrip('/')
 
-CONTAINER_NAME = os.getenv('AZURE_CONTAINER_NAME', 'datasets')
+# Seconds to wait for the API and for each chunk of a blob download
+REQUEST_TIMEOUT = float(os.getenv('VECEM_REQUEST_TIMEOUT', '60'))
+
+# Verified archives are cached here by SHA-256
+CACHE_DIR = Path(os.getenv('VECEM_CACHE_DIR', Path.home() / '.cache' / 'vecem'))
+
+# Shards fetched at once when a dataset is stored in the sharded layout
+SHARD_WORKERS = int(os.getenv('VECEM_SHARD_WORKERS', '8'))
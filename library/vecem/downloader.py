@@ -1,12 +1,52 @@
 import os
+import hashlib
 import requests
 import zipfile
-from typing import Optional, Union, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Tuple, Union, List
 from pathlib import Path
 import tempfile
+from .config import VECEM_API_URL, REQUEST_TIMEOUT, CACHE_DIR, SHARD_WORKERS
+
+CHUNK_SIZE = 1024 * 1024
+
+class ChecksumMismatchError(Exception):
+    """Downloaded data does not match the checksums recorded at upload time"""
+
+def _fetch_verified(parts: List[Tuple[str, dict]], target: Path, expected_size: Optional[int], expected_sha256: Optional[str], label: str) -> None:
+    """Stream each ``(url, headers)`` request in turn to ``target``, hashing as it is written and stopping at the first mismatch"""
+    digest = hashlib.sha256()
+    written = 0
+    partial = target.with_name(target.name + ".part")
+    try:
+        with open(partial, "wb") as out:
+            for url, headers in parts:
+                response = requests.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    written += len(chunk)
+                    if expected_size is not None and written > expected_size:
+                        raise ChecksumMismatchError(f"{label} is larger than the expected {expected_size} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+
+        if expected_size is not None and written != expected_size:
+            raise ChecksumMismatchError(f"{label} is {written} bytes, expected {expected_size}")
+        if expected_sha256 and digest.hexdigest() != expected_sha256:
+            raise ChecksumMismatchError(f"{label} SHA-256 does not match the dataset metadata")
+        os.replace(partial, target)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+def _member_target(dataset_dir: Path, path: str) -> Path:
+    target = (dataset_dir / path).resolve()
+    if dataset_dir.resolve() not in target.parents:
+        raise ValueError(f"Refusing to write {path} outside {dataset_dir}")
+    return target
 
 class VecemDataset:
-    def __init__(self, dataset_path: str):
+    def __init__(self, dataset_path: str, api_url: Optional[str] = None):
         """Initialize VecemDataset with a path like 'username/datasetname/type'"""
         parts = dataset_path.strip('/').split('/')
         if len(parts) != 3:
@@ -15,49 +55,248 @@ class VecemDataset:
         self.username = parts[0]
         self.dataset_name = parts[1]
         self.file_type = parts[2]
-        self.base_url = "https://vecem.blob.core.windows.net/datasets"
-    
-    def download(self, output_dir: Optional[Union[str, Path]] = None) -> str:
-        """Download and extract the dataset to the specified directory"""
+        api_url = api_url or VECEM_API_URL
+        if not api_url:
+            raise ValueError("VECEM_API_URL environment variable is required (or pass api_url) to reach the Vecem API")
+        self.api_url = api_url.rstrip('/')
+
+    def get_download_grant(self) -> dict:
+        """Ask the Vecem API for a short-lived download URL and the archive's checksums"""
+        grant_url = f"{self.api_url}/datasets/{self.username}/{self.dataset_name}/{self.file_type}/download"
+        response = requests.get(grant_url, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 404:
+            raise FileNotFoundError(f"Dataset not found: {self.username}/{self.dataset_name}/{self.file_type}")
+        response.raise_for_status()
+        return response.json()
+
+    def get_download_url(self) -> str:
+        """Ask the Vecem API for a short-lived, read-only URL to the dataset archive"""
+        return self.get_download_grant()["url"]
+
+    def _fetch_archive(self, grant: dict, target: Path) -> None:
+        """Stream the archive to ``target``, hashing as it is written and stopping at the first mismatch"""
+        _fetch_verified([(grant["url"], {})], target, grant.get("size"), grant.get("sha256"), "Archive")
+
+    def _extract(self, archive: Path, dataset_dir: Path, files: List[dict], members: Optional[set] = None) -> None:
+        """Extract members, verifying each against its recorded SHA-256 and size while writing"""
+        expected = {entry["path"]: entry for entry in files}
+        with zipfile.ZipFile(archive, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir() or (members is not None and info.filename not in members):
+                    continue
+                target = _member_target(dataset_dir, info.filename)
+                target.parent.mkdir(parents=True, exist_ok=True)
+
+                digest = hashlib.sha256()
+                with zip_ref.open(info) as source, open(target, "wb") as out:
+                    while chunk := source.read(CHUNK_SIZE):
+                        digest.update(chunk)
+                        out.write(chunk)
+
+                entry = expected.get(info.filename)
+                if entry and (digest.hexdigest() != entry["sha256"] or info.file_size != entry["size"]):
+                    raise ChecksumMismatchError(f"{info.filename} does not match its recorded checksum")
+
+    def get_shard_manifest(self) -> dict:
+        """Ask the Vecem API for the dataset's shard layout, with a short-lived URL per shard"""
+        manifest_url = f"{self.api_url}/datasets/{self.username}/{self.dataset_name}/{self.file_type}/shards"
+        response = requests.get(manifest_url, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 404:
+            raise FileNotFoundError(f"Dataset not found: {self.username}/{self.dataset_name}/{self.file_type}")
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_shard(self, shard: dict, use_cache: bool, scratch: Path) -> Path:
+        if use_cache:
+            target = CACHE_DIR / "shards" / shard["sha256"]
+            # Cached shards were verified before being moved into place
+            if target.exists() and target.stat().st_size == shard["size"]:
+                return target
+            target.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            target = scratch / f"{shard['index']:05d}"
+        # A shard is the concatenation of ranges of the dataset's files
+        parts = [
+            (segment["url"], {"Range": f"bytes={segment['offset']}-{segment['offset'] + segment['size'] - 1}"})
+            for segment in shard["files"]
+            if segment["size"]
+        ]
+        _fetch_verified(parts, target, shard["size"], shard["sha256"], f"Shard {shard['index']}")
+        return target
+
+    def _map_shards(self, shards: Iterable[dict], fn: Callable[[dict, Path], object], use_cache: bool, max_workers: int) -> list:
+        """Fetch shards in parallel and call ``fn(shard, path)`` on each as soon as it is on disk"""
+        with tempfile.TemporaryDirectory() as scratch:
+            def fetch(shard: dict):
+                path = self._fetch_shard(shard, use_cache, Path(scratch))
+                try:
+                    return fn(shard, path)
+                finally:
+                    if not use_cache:
+                        path.unlink(missing_ok=True)
+
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                return list(pool.map(fetch, shards))
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def _download_shards(self, manifest: dict, dataset_dir: Path, members: Optional[set], use_cache: bool, max_workers: int) -> None:
+        """Write every wanted file segment straight into place as its shard arrives"""
+        sizes = {entry["path"]: entry["size"] for entry in manifest["files"] if members is None or entry["path"] in members}
+        targets = {path: _member_target(dataset_dir, path) for path in sizes}
+        # Files are created at full size up front so shards can fill them in any order
+        for path, target in targets.items():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as out:
+                out.truncate(sizes[path])
+
+        def place(shard: dict, path: Path) -> None:
+            with open(path, "rb") as source:
+                for segment in shard["files"]:
+                    if segment["path"] not in targets:
+                        source.seek(segment["size"], os.SEEK_CUR)
+                        continue
+                    with open(targets[segment["path"]], "r+b") as out:
+                        out.seek(segment["offset"])
+                        remaining = segment["size"]
+                        while remaining:
+                            chunk = source.read(min(CHUNK_SIZE, remaining))
+                            if not chunk:
+                                raise ChecksumMismatchError(f"Shard {shard['index']} ended before {segment['path']}")
+                            out.write(chunk)
+                            remaining -= len(chunk)
+
+        wanted = [shard for shard in manifest["shards"] if any(segment["path"] in targets for segment in shard["files"])]
+        self._map_shards(wanted, place, use_cache, max_workers)
+
+    def read_rows(self, path: str, start: int = 0, stop: Optional[int] = None, use_cache: bool = True, max_workers: int = SHARD_WORKERS) -> List[str]:
+        """Read rows ``[start, stop)`` of a line-oriented file, fetching only the shards that hold them
+
+        Rows are lines, so a CSV header is row 0. Requires the sharded layout.
+        """
+        manifest = self.get_shard_manifest()
+        if not manifest["shards"]:
+            raise ValueError("Dataset is stored as a single archive; use download() instead")
+        segments = [
+            (shard, segment)
+            for shard in manifest["shards"]
+            for segment in shard["files"]
+            if segment["path"] == path
+        ]
+        if not segments:
+            raise FileNotFoundError(f"{path} is not part of this dataset")
+        if "rows" not in segments[0][1]:
+            raise ValueError(f"{path} is not a line-oriented file")
+
+        if stop is None:
+            stop = segments[-1][1]["rows"][1]
+        # Each segment lists the rows that end inside it
+        chosen = [i for i, (_, segment) in enumerate(segments) if segment["rows"][1] > start and segment["rows"][0] < stop]
+        if not chosen:
+            return []
+        first = chosen[0]
+        while first > 0 and segments[first][1].get("continues_row"):
+            first -= 1
+        selected = segments[first:chosen[-1] + 1]
+
+        def read_segment(shard: dict, shard_path: Path) -> bytes:
+            position = 0
+            for segment in shard["files"]:
+                if segment["path"] == path:
+                    with open(shard_path, "rb") as source:
+                        source.seek(position)
+                        return source.read(segment["size"])
+                position += segment["size"]
+            return b""
+
+        data = b"".join(self._map_shards([shard for shard, _ in selected], read_segment, use_cache, max_workers))
+        lines = data.split(b"\n")
+        if data.endswith(b"\n"):
+            lines.pop()
+        first_row = selected[0][1]["rows"][0]
+        return [line.decode("utf-8") for line in lines[max(start - first_row, 0):stop - first_row]]
+
+    def download(
+        self,
+        output_dir: Optional[Union[str, Path]] = None,
+        use_cache: bool = True,
+        files: Optional[List[str]] = None,
+        max_workers: int = SHARD_WORKERS
+    ) -> str:
+        """Download and extract the dataset to the specified directory
+
+        Sharded datasets are fetched ``max_workers`` shards at a time and,
+        with ``files``, only the shards holding those files. Archives and
+        shards are kept in VECEM_CACHE_DIR under their SHA-256, so later
+        downloads of unchanged data skip the network entirely.
+        """
         if output_dir is None:
             output_dir = os.getcwd()
         
         output_dir = Path(output_dir)
         dataset_dir = output_dir / f"{self.dataset_name}_{self.file_type}"
         os.makedirs(dataset_dir, exist_ok=True)
-        
-        # Create a temporary file for the zip
-        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_zip:
-            url = f"{self.base_url}/{self.username}/{self.dataset_name}/{self.file_type}.zip"
-            
-            # Download to temporary file
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_zip.write(chunk)
-            
+        members = set(files) if files else None
+
+        try:
+            manifest = self.get_shard_manifest()
+        except FileNotFoundError:
+            # Servers without the sharded layout; the archive grant reports missing datasets
+            manifest = None
+        if manifest and manifest["shards"]:
+            if members is not None:
+                unknown = members - {entry["path"] for entry in manifest["files"]}
+                if unknown:
+                    raise FileNotFoundError(f"Not part of this dataset: {', '.join(sorted(unknown))}")
+            self._download_shards(manifest, dataset_dir, members, use_cache, max_workers)
+            return str(dataset_dir)
+
+        grant = self.get_download_grant()
+        cacheable = use_cache and bool(grant.get("sha256"))
+        if cacheable:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            archive = CACHE_DIR / f"{grant['sha256']}.zip"
+        else:
+            temp_zip = tempfile.NamedTemporaryFile(suffix='.zip', delete=False)
             temp_zip.close()
-            
-            # Extract the zip file
-            with zipfile.ZipFile(temp_zip.name, 'r') as zip_ref:
-                zip_ref.extractall(dataset_dir)
-            
+            archive = Path(temp_zip.name)
+
+        try:
+            # Cached archives were verified before being moved into place
+            if not (cacheable and archive.exists() and archive.stat().st_size == grant.get("size")):
+                self._fetch_archive(grant, archive)
+            self._extract(archive, dataset_dir, grant.get("files") or [], members)
+        except ChecksumMismatchError:
+            if archive.exists():
+                archive.unlink()
+            raise
+        finally:
             # Clean up the temporary zip file
-            os.unlink(temp_zip.name)
+            if not cacheable and archive.exists():
+                archive.unlink()
         
         return str(dataset_dir)
 
-def load_dataset(dataset_path: str, output_dir: Optional[Union[str, Path]] = None) -> str:
+def load_dataset(
+    dataset_path: str,
+    output_dir: Optional[Union[str, Path]] = None,
+    api_url: Optional[str] = None,
+    use_cache: bool = True,
+    files: Optional[List[str]] = None
+) -> str:
     """
     Helper function to quickly download a dataset.
     
     Args:
         dataset_path: Path in format 'username/datasetname/type'
         output_dir: Directory to save the dataset (optional)
+        api_url: Vecem API base URL (optional, defaults to VECEM_API_URL)
+        use_cache: Reuse verified archives and shards from VECEM_CACHE_DIR (default True)
+        files: Only download these paths within the dataset (optional)
     
     Returns:
         Path to the downloaded file
     """
-    dataset = VecemDataset(dataset_path)
-    return dataset.download(output_dir)
+    dataset = VecemDataset(dataset_path, api_url=api_url)
+    return dataset.download(output_dir, use_cache=use_cache, files=files)